@@ -0,0 +1,82 @@
+"""
+Indirizzo Ethereum da chiave privata senza web3/eth_account.
+
+Importare web3 o eth_account per una sola derivazione costa ~0,3-0,9 s a ogni avvio (eth_keyfile,
+py_ecc, pydantic...). Qui: moltiplicazione scalare secp256k1 in coordinate Jacobiane (pochi ms)
+e keccak-256 di pycryptodome (già dipendenza di eth-hash), checksum EIP-55.
+"""
+
+from Crypto.Hash import keccak
+
+_P = 2 ** 256 - 2 ** 32 - 977
+_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+_G = (
+    0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+    0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8,
+)
+
+
+def _keccak(data: bytes) -> bytes:
+    return keccak.new(digest_bits=256, data=data).digest()
+
+
+def _double(x: int, y: int, z: int):
+    if not y:
+        return 0, 0, 0
+    ysq = y * y % _P
+    s = 4 * x * ysq % _P
+    m = 3 * x * x % _P
+    nx = (m * m - 2 * s) % _P
+    ny = (m * (s - nx) - 8 * ysq * ysq) % _P
+    return nx, ny, 2 * y * z % _P
+
+
+def _add(p, q):
+    x1, y1, z1 = p
+    x2, y2, z2 = q
+    if not y1:
+        return q
+    if not y2:
+        return p
+    z1sq, z2sq = z1 * z1 % _P, z2 * z2 % _P
+    u1, u2 = x1 * z2sq % _P, x2 * z1sq % _P
+    s1, s2 = y1 * z2sq * z2 % _P, y2 * z1sq * z1 % _P
+    if u1 == u2:
+        return _double(x1, y1, z1) if s1 == s2 else (0, 0, 1)
+    h, r = u2 - u1, s2 - s1
+    h2 = h * h % _P
+    h3 = h * h2 % _P
+    u1h2 = u1 * h2 % _P
+    nx = (r * r - h3 - 2 * u1h2) % _P
+    ny = (r * (u1h2 - nx) - s1 * h3) % _P
+    return nx, ny, h * z1 * z2 % _P
+
+
+def public_key(private_key: int) -> bytes:
+    """Chiave pubblica non compressa senza prefisso 04 (64 byte)."""
+    if not 0 < private_key < _N:
+        raise ValueError("chiave privata fuori range secp256k1")
+    result, addend = (0, 0, 1), (_G[0], _G[1], 1)
+    k = private_key
+    while k:
+        if k & 1:
+            result = _add(result, addend)
+        addend = _double(*addend)
+        k >>= 1
+    x, y, z = result
+    zinv = pow(z, -1, _P)
+    zinv2 = zinv * zinv % _P
+    return (x * zinv2 % _P).to_bytes(32, "big") + (y * zinv2 * zinv % _P).to_bytes(32, "big")
+
+
+def to_checksum_address(address: str) -> str:
+    """Indirizzo con checksum EIP-55."""
+    hex_addr = address.lower().removeprefix("0x")
+    digest = _keccak(hex_addr.encode()).hex()
+    return "0x" + "".join(c.upper() if int(d, 16) >= 8 else c for c, d in zip(hex_addr, digest))
+
+
+def address_from_private_key(private_key: str) -> str:
+    """Indirizzo (checksum EIP-55) della chiave privata esadecimale, con o senza 0x."""
+    key = int(private_key.strip().removeprefix("0x"), 16)
+    return to_checksum_address(_keccak(public_key(key))[-20:].hex())
@@ -0,0 +1,4 @@
+"""
+Benchmark CLAIMBOT (nessun endpoint reale, nessun fondo).
+Uso dalla root del progetto: python -m bench.<nome>
+"""
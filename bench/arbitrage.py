@@ -0,0 +1,84 @@
+"""
+Benchmark execute_arbitrage: gambe in sequenza (vecchio) vs in parallelo, su CLOB finto locale.
+Misura la finestra di esposizione: distanza tra l'arrivo al CLOB dei due ordini (YES e NO).
+Uso: python -m bench.arbitrage [--rounds 20] [--latency 0.15] [--jitter 0.05]
+"""
+
+import argparse
+import statistics
+import time
+from types import SimpleNamespace
+
+from bench.fake_clob import FakeClob, make_executor
+
+YES, NO = "1001", "1002"
+
+
+def sequential_arbitrage(ex, opportunity, yes_size: float, no_size: float) -> bool:
+    """execute_arbitrage originale: gamba YES, poi gamba NO."""
+    side = "BUY" if opportunity.action == "buy_both" else "SELL"
+    yes_order = ex.place_limit_order(token_id=opportunity.yes_token_id, side=side, size=yes_size, price=opportunity.yes_price)
+    no_order = ex.place_limit_order(token_id=opportunity.no_token_id, side=side, size=no_size, price=opportunity.no_price)
+    return yes_order is not None and no_order is not None
+
+
+def _arrival_gap_ms(clob: FakeClob, start: int) -> float:
+    at = [o["at"] for o in clob.orders[start:start + 2]]
+    return abs(at[1] - at[0]) * 1000 if len(at) == 2 else float("nan")
+
+
+def _run(ex, clob: FakeClob, fn, rounds: int):
+    gaps, totals = [], []
+    opp = SimpleNamespace(action="buy_both", yes_token_id=YES, no_token_id=NO, yes_price=0.48, no_price=0.49)
+    for _ in range(rounds):
+        start = len(clob.orders)
+        t0 = time.perf_counter()
+        fn(ex, opp, 10.0, 10.0)
+        totals.append((time.perf_counter() - t0) * 1000)
+        gaps.append(_arrival_gap_ms(clob, start))
+    return gaps, totals
+
+
+def _fmt(values):
+    return f"mediana {statistics.median(values):8.1f} ms | max {max(values):8.1f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rounds", type=int, default=20)
+    ap.add_argument("--latency", type=float, default=0.15, help="latenza simulata per richiesta (s)")
+    ap.add_argument("--jitter", type=float, default=0.05)
+    args = ap.parse_args()
+
+    clob = FakeClob(latency=args.latency, jitter=args.jitter)
+    ex = make_executor(clob.start())
+    try:
+        # Warm-up: tick size / neg risk / fee rate in cache nel client, connessioni aperte
+        for token in (YES, NO):
+            ex.place_limit_order(token, "BUY", 10.0, 0.5)
+
+        seq_gaps, seq_totals = _run(ex, clob, sequential_arbitrage, args.rounds)
+        par_gaps, par_totals = _run(ex, clob, lambda e, o, y, n: e.execute_arbitrage(o, y, n), args.rounds)
+        print(f"Latenza CLOB simulata: {args.latency * 1000:.0f} ms + jitter {args.jitter * 1000:.0f} ms, {args.rounds} round")
+        print(f"Sequenziale  distanza tra le gambe: {_fmt(seq_gaps)} — totale {_fmt(seq_totals)}")
+        print(f"Parallelo    distanza tra le gambe: {_fmt(par_gaps)} — totale {_fmt(par_totals)}")
+
+        # Gamba NO rifiutata: la YES va annullata. YES nel book con 40% già eseguito (cancel del resto
+        # + FAK sulle quote eseguite), poi YES eseguita del tutto (solo FAK)
+        opp = SimpleNamespace(action="buy_both", yes_token_id=YES, no_token_id=NO, yes_price=0.48, no_price=0.49)
+        clob.reject.add(NO)
+        for status, fill in (("live", 0.0), ("live", 0.4), ("matched", 1.0)):
+            clob.status, clob.fills[YES] = status, fill
+            cancelled = len(clob.cancelled)
+            report = ex.execute_arbitrage(opp, 10.0, 10.0)
+            yes = report.legs[0]
+            print(f"Gamba NO rifiutata, YES {status} eseguita {fill:.0%}: unwind={yes.unwind} eseguite={yes.filled:g} "
+                  f"scoperte={yes.exposure:g}, cancel sul CLOB {len(clob.cancelled) - cancelled}")
+        clob.reject.clear()
+        clob.status = "live"
+    finally:
+        clob.stop()
+
+
+if __name__ == "__main__":
+    main()
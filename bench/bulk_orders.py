@@ -0,0 +1,57 @@
+"""
+Benchmark vendita di molte posizioni: place_limit_order in sequenza (vecchio try_claim_via_clob_sell)
+vs place_orders_bulk (firma in pool di processi + POST /orders a blocchi), su CLOB finto locale.
+Uso: python -m bench.bulk_orders [--orders 200] [--latency 0.15] [--sequential 20]
+"""
+
+import argparse
+import time
+
+from bench.fake_clob import FakeClob, make_executor
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--orders", type=int, default=200)
+    ap.add_argument("--latency", type=float, default=0.15, help="latenza simulata per richiesta (s)")
+    ap.add_argument("--sequential", type=int, default=20, help="ordini da misurare in sequenza (poi stima su --orders)")
+    args = ap.parse_args()
+
+    from py_clob_client.clob_types import OrderArgs
+
+    clob = FakeClob(latency=args.latency)
+    ex = make_executor(clob.start())
+    tokens = [str(10_000 + i) for i in range(args.orders)]
+    try:
+        n_seq = min(args.sequential, len(tokens))
+        t0 = time.perf_counter()
+        for token in tokens[:n_seq]:
+            ex.place_limit_order(token, "SELL", 10.0, 0.99)
+        seq = (time.perf_counter() - t0) / max(1, n_seq)
+
+        requests_before = sum(clob.requests.values())
+        orders = [OrderArgs(token_id=t, price=0.99, size=10.0, side="SELL") for t in tokens]
+        t0 = time.perf_counter()
+        results = ex.place_orders_bulk(orders)
+        bulk = time.perf_counter() - t0
+        requests = sum(clob.requests.values()) - requests_before
+
+        # stessi token: tick size / neg risk / fee dalla cache di _order_options, restano le POST /orders
+        requests_before = sum(clob.requests.values())
+        t0 = time.perf_counter()
+        again = ex.place_orders_bulk(orders)
+        bulk_again = time.perf_counter() - t0
+        requests_again = sum(clob.requests.values()) - requests_before
+
+        print(f"Latenza CLOB simulata: {args.latency * 1000:.0f} ms, {args.orders} ordini SELL")
+        print(f"Sequenziale: {seq * 1000:.0f} ms/ordine → stima {seq * args.orders:.1f} s per {args.orders} ordini")
+        print(f"Bulk:        {bulk:.2f} s, {requests} richieste HTTP, ok {sum(r['ok'] for r in results)}/{len(results)}")
+        print(f"Bulk ripetuto: {bulk_again:.2f} s, {requests_again} richieste HTTP, ok {sum(r['ok'] for r in again)}/{len(again)}")
+        print(f"Richieste per endpoint: {clob.requests}")
+    finally:
+        ex._get_order_signer().close()
+        clob.stop()
+
+
+if __name__ == "__main__":
+    main()
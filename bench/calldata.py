@@ -0,0 +1,74 @@
+"""
+Micro-benchmark calldata redeemPositions: encoder precompilato vs contratto Web3 per chiamata.
+Uso: python -m bench.calldata [--sizes 10,1000,100000] [--legacy-max 2000]
+Il percorso Web3 è lento: oltre --legacy-max ID il tempo è stimato dal campione.
+"""
+
+import argparse
+import os
+import time
+
+from claims import (
+    CTF_ADDRESS,
+    USDC_ADDRESS,
+    REDEEM_INDEX_SETS,
+    REDEEM_POSITIONS_ABI,
+    build_redeem_tx,
+    build_redeem_txs,
+    get_redeem_encoder,
+)
+
+
+def legacy_build_redeem_tx(condition_id: str):
+    """Percorso originale: nuovo Web3 + contratto + checksum per ogni conditionId."""
+    from web3 import Web3
+
+    w3 = Web3()
+    if not condition_id.startswith("0x"):
+        condition_id = "0x" + condition_id
+    cond_hex = condition_id[2:].lower().rjust(64, "0")[:64]
+    ctf = w3.eth.contract(address=Web3.to_checksum_address(CTF_ADDRESS), abi=REDEEM_POSITIONS_ABI)
+    fn = ctf.functions.redeemPositions(
+        Web3.to_checksum_address(USDC_ADDRESS),
+        b"\x00" * 32,
+        bytes.fromhex(cond_hex),
+        REDEEM_INDEX_SETS,
+    )
+    data_hex = fn._encode_transaction_data()
+    if not data_hex.startswith("0x"):
+        data_hex = "0x" + data_hex
+    return {"to": CTF_ADDRESS, "data": data_hex, "value": "0"}
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes", default="10,1000,100000")
+    ap.add_argument("--legacy-max", type=int, default=2000)
+    args = ap.parse_args()
+
+    get_redeem_encoder()  # costo una tantum escluso dalle misure
+    sample = ["0x" + os.urandom(32).hex() for _ in range(min(64, args.legacy_max))]
+    for cid in sample:
+        assert build_redeem_tx(cid)["data"] == legacy_build_redeem_tx(cid)["data"], cid
+
+    print(f"{'N':>8} | {'web3 (s)':>12} | {'encode_hex (s)':>14} | {'batch (s)':>10} | {'speedup':>8}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        cids = ["0x" + os.urandom(32).hex() for _ in range(n)]
+        m = min(n, args.legacy_max)
+        t_legacy, _ = _timed(lambda ids: [legacy_build_redeem_tx(c) for c in ids], cids[:m])
+        t_legacy *= n / m
+        t_single, _ = _timed(lambda ids: [build_redeem_tx(c) for c in ids], cids)
+        t_batch, _ = _timed(build_redeem_txs, cids)
+        est = "*" if m < n else " "
+        print(f"{n:>8} | {t_legacy:>11.4f}{est} | {t_single:>14.4f} | {t_batch:>10.4f} | {t_legacy / max(t_single, 1e-9):>7.0f}x")
+    print("* stimato dal campione di --legacy-max ID")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Valore recuperato con quota relayer scarsa: ordine Data API vs piano per valore (claim_planner).
+Uso: python -m bench.claim_priority [--positions 5000] [--requests 5] [--per-batch 50] [--min-value 0.5]
+
+Valori delle posizioni a coda lunga (pareto: poche posizioni grandi, tanta polvere, ~metà perdenti
+a 0), nell'ordine casuale in cui li restituisce la Data API. Misura anche il costo di
+aggregazione + piano per ciclo.
+"""
+
+import argparse
+import random
+import time
+
+from claim_planner import ClaimTotals, plan_claims, value_report
+from claims import execute_redeem_batches
+
+
+def _positions(n: int, per_market: int, seed: int):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        size = round(rng.paretovariate(1.2) * 2, 2)
+        won = rng.random() < 0.5
+        out.append({"conditionId": f"0x{i // per_market:064x}", "size": size, "currentValue": size if won else 0.0})
+    rng.shuffle(out)
+    return out
+
+
+def _run(condition_ids, per_batch: int, requests: int):
+    return execute_redeem_batches(condition_ids, lambda chunk: {"ok": True}, max_per_batch=per_batch, max_requests=requests)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--positions", type=int, default=5000)
+    ap.add_argument("--per-market", type=int, default=2, help="posizioni per conditionId (es. YES e NO)")
+    ap.add_argument("--requests", type=int, default=5, help="richieste relayer disponibili (quota)")
+    ap.add_argument("--per-batch", type=int, default=50)
+    ap.add_argument("--min-value", type=float, default=0.5, help="USDC minimi per conditionId")
+    ap.add_argument("--min-batch-value", type=float, default=5.0, help="USDC minimi per richiesta")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    positions = _positions(args.positions, args.per_market, args.seed)
+    t0 = time.perf_counter()
+    totals = ClaimTotals.from_positions(positions)
+    aggregate = time.perf_counter() - t0
+    cids = totals.condition_ids
+    t0 = time.perf_counter()
+    plan = plan_claims(cids, totals.value, args.requests, args.per_batch, args.min_value, args.min_batch_value)
+    planning = time.perf_counter() - t0
+
+    total = sum(totals.value.values())
+    fifo = _run(cids, args.per_batch, args.requests)
+    fifo_value = plan.value(fifo.claimed)
+    ranked = _run(plan.order, args.per_batch, args.requests)
+    values = value_report(plan, ranked)
+
+    print(f"{len(positions)} posizioni, {len(cids)} conditionId, {total:.2f} USDC claimabili; "
+          f"quota {args.requests} richieste × {args.per_batch} claim")
+    print(f"Aggregazione {aggregate * 1000:.1f} ms, piano {planning * 1000:.1f} ms")
+    print(f"Ordine Data API: {fifo_value:10.2f} USDC ({fifo_value / args.requests:.2f} USDC/richiesta)")
+    print(f"Piano per valore: {values.claimed:9.2f} USDC ({values.claimed / args.requests:.2f} USDC/richiesta) — "
+          f"{values.claimed / fifo_value if fifo_value else float('inf'):.1f}x")
+    print(f"  {values.summary()}")
+    print("OK" if values.claimed >= fifo_value else "FALLITO")
+
+
+if __name__ == "__main__":
+    main()
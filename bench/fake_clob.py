@@ -0,0 +1,251 @@
+"""
+CLOB Polymarket locale (finto) per benchmark e prove: nessun ordine reale, nessuna firma verificata.
+
+Endpoint: /tick-size, /neg-risk, /fee-rate, /midpoint, /midpoints, /book, /books, /balance-allowance,
+POST /auth/api-key, GET /auth/derive-api-key, POST /order, POST /orders, GET /data/orders, GET /data/order/<id>, DELETE /order, DELETE /orders,
+DELETE /cancel-market-orders.
+Gli ordini accettati con stato "live" restano aperti (`open_orders`) finché non vengono cancellati; `fills[token]` è la
+frazione già eseguita (size_matched) degli ordini live su quel token. Gli ordini FAK si eseguono subito sul book fisso di
+_book (fino alla liquidità dei livelli raggiunti dal prezzo) o vengono rifiutati. Ogni risposta può avere una latenza (simula il proxy)
+o un guasto (bench.faults: 5xx, 429) e gli ordini sui token in `reject` vengono rifiutati ({"success": false}).
+Gli ordini ricevuti restano in `orders` con l'istante di arrivo (time.monotonic).
+
+Fa anche da proxy HTTP di sé stesso: un client con proxy="http://<nome>:x@127.0.0.1:<porta>"
+e host CLOB qualsiasi (es. http://clob.test) arriva qui, e il <nome> (Proxy-Authorization)
+viene registrato in `by_proxy` e nel campo "proxy" degli ordini. Gli ordini dai proxy in `regional`
+ricevono 403 "Trading restricted in your region" (come un'uscita proxy in un paese bloccato).
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+from bench.faults import Faults
+
+REGIONAL_ERROR = "Trading restricted in your region, please refer to available regions - https://docs.polymarket.com/developers/CLOB/geoblock"
+
+
+class FakeClob:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, status: str = "live", faults: Optional[Faults] = None):
+        self.faults = faults or Faults(latency=latency, jitter=jitter)
+        # Stato restituito per gli ordini accettati: "live" (nel book) o "matched" (eseguito)
+        self.status = status
+        self.reject: Set[str] = set()
+        self.regional: Set[str] = set()
+        self.orders: List[Dict] = []
+        self.cancelled: List[str] = []
+        self.open_orders: Dict[str, Dict] = {}
+        self.all_orders: Dict[str, Dict] = {}
+        self.fills: Dict[str, float] = {}
+        self.requests: Dict[str, int] = {}
+        self.by_proxy: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _book(self, token_id: str) -> Dict:
+        return {
+            "market": "0x" + "00" * 32, "asset_id": token_id, "timestamp": str(int(time.time() * 1000)),
+            "bids": [{"price": "0.48", "size": "100"}, {"price": "0.49", "size": "50"}],
+            "asks": [{"price": "0.52", "size": "100"}, {"price": "0.51", "size": "50"}],
+            "min_order_size": "5", "tick_size": "0.01", "neg_risk": False, "hash": "", "last_trade_price": "0.5",
+        }
+
+    def _accept(self, order: Dict, proxy: Optional[str] = None) -> Dict:
+        token_id = str((order.get("order") or {}).get("tokenId") or "")
+        with self._lock:
+            self.orders.append({"token_id": token_id, "at": time.monotonic(), "body": order, "proxy": proxy})
+        if token_id in self.reject:
+            return {"success": False, "errorMsg": "not enough balance / allowance", "orderID": "", "status": ""}
+        order_id = "0x" + os.urandom(32).hex()
+        o = order.get("order") or {}
+        maker, taker = int(o.get("makerAmount") or 0), int(o.get("takerAmount") or 0)
+        side = "BUY" if o.get("side") in ("BUY", 0, "0") else "SELL"
+        size, cost = (taker, maker) if side == "BUY" else (maker, taker)
+        price = cost / size if size else 0.0
+        status = self.status
+        if order.get("orderType") == "FAK":
+            book = self._book(token_id)
+            levels = book["asks"] if side == "BUY" else book["bids"]
+            crossing = [float(l["size"]) for l in levels if (float(l["price"]) <= price + 1e-9 if side == "BUY" else float(l["price"]) >= price - 1e-9)]
+            matched = min(size / 1e6, sum(crossing))
+            if matched <= 0:
+                return {"success": False, "errorMsg": "no orders found to match with FAK order", "orderID": "", "status": ""}
+            status = "matched"
+        else:
+            matched = size / 1e6 if status == "matched" else size / 1e6 * self.fills.get(token_id, 0.0)
+        record = {
+            "id": order_id, "status": status.upper(), "market": "0x" + "00" * 32, "asset_id": token_id, "side": side,
+            "price": f"{price:g}", "original_size": f"{size / 1e6:g}", "size_matched": f"{matched:g}",
+        }
+        with self._lock:
+            self.all_orders[order_id] = record
+            if status == "live":
+                self.open_orders[order_id] = record
+        return {"success": True, "errorMsg": "", "orderID": order_id, "status": status}
+
+    def _cancel(self, order_ids) -> Dict:
+        canceled, not_canceled = [], {}
+        with self._lock:
+            for order_id in order_ids:
+                record = self.open_orders.pop(order_id, None)
+                if record is not None:
+                    record["status"] = "CANCELED"
+                    canceled.append(order_id)
+                    self.cancelled.append(order_id)
+                else:
+                    not_canceled[order_id] = "order not found or already canceled"
+        return {"canceled": canceled, "not_canceled": not_canceled}
+
+    def handle(self, method: str, path: str, query: Dict, body, proxy: Optional[str] = None) -> Dict:
+        with self._lock:
+            self.requests[f"{method} {path}"] = self.requests.get(f"{method} {path}", 0) + 1
+            if proxy is not None:
+                self.by_proxy[proxy] = self.by_proxy.get(proxy, 0) + 1
+        token_id = (query.get("token_id") or [""])[0]
+        if method == "GET" and path == "/tick-size":
+            return {"minimum_tick_size": "0.01"}
+        if method == "GET" and path == "/neg-risk":
+            return {"neg_risk": False}
+        if method == "GET" and path == "/fee-rate":
+            return {"base_fee": 0}
+        if (method, path) in (("POST", "/auth/api-key"), ("GET", "/auth/derive-api-key")):
+            return {"apiKey": "bench-key", "secret": "YmVuY2g=", "passphrase": "bench"}
+        if method == "GET" and path == "/balance-allowance":
+            return {"balance": "25000000", "allowances": {}}
+        if method == "GET" and path == "/midpoint":
+            return {"mid": "0.5"}
+        if method == "POST" and path == "/midpoints":
+            return {p["token_id"]: "0.5" for p in body}
+        if method == "GET" and path == "/book":
+            return self._book(token_id)
+        if method == "POST" and path == "/books":
+            return [self._book(p["token_id"]) for p in body]
+        if method == "POST" and path == "/order":
+            return self._accept(body, proxy)
+        if method == "POST" and path == "/orders":
+            return [self._accept(o, proxy) for o in body]
+        if method == "GET" and path == "/data/orders":
+            # Pagine da 500 come il CLOB; cursore = offset in base64, "LTE=" = fine
+            start = int(base64.b64decode((query.get("next_cursor") or ["MA=="])[0]).decode() or 0)
+            with self._lock:
+                orders = list(self.open_orders.values())
+            page = orders[start:start + 500]
+            end = start + len(page)
+            cursor = base64.b64encode(str(end).encode()).decode() if end < len(orders) else "LTE="
+            return {"data": page, "next_cursor": cursor, "limit": 500, "count": len(page)}
+        if method == "GET" and path.startswith("/data/order/"):
+            with self._lock:
+                return dict(self.all_orders[path[len("/data/order/"):]])
+        if method == "DELETE" and path == "/order":
+            with self._lock:
+                record = self.open_orders.pop(body.get("orderID"), None)
+                if record is not None:
+                    record["status"] = "CANCELED"
+                self.cancelled.append(body.get("orderID"))
+            return {"canceled": [body.get("orderID")], "not_canceled": {}}
+        if method == "DELETE" and path == "/orders":
+            return self._cancel(body)
+        if method == "DELETE" and path == "/cancel-market-orders":
+            with self._lock:
+                ids = [i for i, o in self.open_orders.items() if o["asset_id"] == body.get("asset_id")]
+            return self._cancel(ids)
+        raise KeyError(path)
+
+    def start(self) -> str:
+        clob = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _proxy_user(self) -> Optional[str]:
+                auth = self.headers.get("Proxy-Authorization") or ""
+                if not auth.startswith("Basic "):
+                    return None
+                return base64.b64decode(auth[6:]).decode().split(":", 1)[0]
+
+            def _serve(self, method: str):
+                url = urlparse(self.path)
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                body = json.loads(raw) if raw else None
+                proxy = self._proxy_user()
+                headers = {}
+                fault = clob.faults.apply()
+                if fault is not None:
+                    code, reply, headers = fault
+                elif method == "POST" and url.path in ("/order", "/orders") and proxy in clob.regional:
+                    with clob._lock:
+                        clob.by_proxy[proxy] = clob.by_proxy.get(proxy, 0) + 1
+                    reply, code = {"error": REGIONAL_ERROR}, 403
+                else:
+                    try:
+                        reply, code = clob.handle(method, url.path, parse_qs(url.query), body, proxy), 200
+                    except KeyError:
+                        reply, code = {"error": "not found"}, 404
+                data = json.dumps(reply).encode()
+                self.send_response(code)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def do_DELETE(self):
+                self._serve("DELETE")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def make_executor(host: str, private_key: Optional[str] = None, proxy_url: Optional[str] = None):
+    """
+    OrderExecutor collegato al CLOB finto (senza derivazione credenziali né rete reale).
+    proxy_url: proxy riservato all'executor (come OrderExecutor(proxy_url=...)).
+    """
+    from py_clob_client.client import ClobClient
+    from py_clob_client.clob_types import ApiCreds
+
+    from executor import OrderExecutor
+    from http_clients import registry
+    from market_cache import MarketDataCache
+    from orders import OrderTracker
+
+    ex = OrderExecutor.__new__(OrderExecutor)
+    ex.api_key, ex.api_secret, ex.api_passphrase = "bench", "YmVuY2g=", "bench"
+    ex.private_key = private_key or "0x" + os.urandom(32).hex()
+    ex.signature_type = 0
+    ex._creds_from_cache = False
+    ex.market_cache = MarketDataCache()
+    ex.http_client = registry.get("clob", proxy_url) if proxy_url else None
+    ex.market_stream = None
+    ex.orders = OrderTracker()
+    ex.user_stream = None
+    ex.client = ClobClient(
+        host=host,
+        chain_id=137,
+        key=ex.private_key,
+        creds=ApiCreds(api_key="bench", api_secret="YmVuY2g=", api_passphrase="bench"),
+    )
+    return ex
@@ -0,0 +1,106 @@
+"""
+Data API Polymarket locale (finta): GET /positions?user=&limit=&offset=&redeemable=true.
+
+Ogni wallet ha `positions` posizioni deterministiche (stesso indirizzo → stessi conditionId,
+`per_market` posizioni per mercato); con redeemable=false si aggiungono `open_positions`
+posizioni non ancora risolte. Latenza e guasti (5xx, 429) da bench.faults.Faults.
+Come la Data API vera, i claim già inviati restano "redeemable" finché l'indexer non li vede:
+il ledger del bot deve saltarli. Con `etags=True` ogni pagina ha un ETag (hash del contenuto) e
+una richiesta con If-None-Match uguale riceve 304 senza corpo (contati in `not_modified`).
+"""
+
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from bench.faults import Faults
+
+
+def condition_id(user: str, market: int) -> str:
+    return "0x" + hashlib.sha256(f"{user.lower()}:{market}".encode()).hexdigest()
+
+
+class FakeDataApi:
+    def __init__(self, positions: int = 500, per_market: int = 1, open_positions: int = 0, faults: Optional[Faults] = None,
+                 etags: bool = False):
+        self.positions = positions
+        self.per_market = max(1, per_market)
+        self.open_positions = open_positions
+        self.faults = faults or Faults()
+        self.etags = etags
+        self.requests = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def wallet_positions(self, user: str, redeemable: bool = True) -> List[Dict]:
+        out = []
+        total = self.positions + (0 if redeemable else self.open_positions)
+        for i in range(total):
+            market = i // self.per_market
+            out.append({
+                "proxyWallet": user, "asset": str(10 ** 20 + i), "conditionId": condition_id(user, market),
+                "size": 10.0 + i % 7, "avgPrice": 0.5, "currentValue": (10.0 + i % 7) if i < self.positions else 0.0,
+                "redeemable": i < self.positions, "outcomeIndex": i % self.per_market,
+                "title": f"Mercato bench #{market}", "slug": f"bench-{market}",
+            })
+        return out
+
+    def page(self, query: Dict) -> List[Dict]:
+        user = (query.get("user") or [""])[0]
+        limit = int((query.get("limit") or ["100"])[0])
+        offset = int((query.get("offset") or ["0"])[0])
+        redeemable = (query.get("redeemable") or ["false"])[0] == "true"
+        return self.wallet_positions(user, redeemable)[offset:offset + limit]
+
+    def start(self) -> str:
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                with api._lock:
+                    api.requests += 1
+                fault, headers = api.faults.apply(), {}
+                if fault is not None:
+                    code, reply, headers = fault
+                elif url.path == "/positions":
+                    code, reply = 200, api.page(parse_qs(url.query))
+                else:
+                    code, reply = 404, {"error": "not found"}
+                data = json.dumps(reply).encode()
+                if code == 200 and api.etags:
+                    headers["ETag"] = '"' + hashlib.sha1(data).hexdigest() + '"'
+                    if self.headers.get("If-None-Match") == headers["ETag"]:
+                        code, data = 304, b""
+                        with api._lock:
+                            api.not_modified += 1
+                self.send_response(code)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # pagina in prefetch annullata dal bot (pagina precedente incompleta)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
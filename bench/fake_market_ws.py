@@ -0,0 +1,137 @@
+"""
+Canale WebSocket "market" del CLOB locale (finto) che rigioca messaggi registrati.
+
+La registrazione è una lista di messaggi grezzi (una riga JSON per messaggio, come arrivano dal
+WebSocket reale: oggetto o lista di eventi). A ogni sottoscrizione ({"assets_ids": [...], "type":
+"market"}) il server rigioca dall'inizio i messaggi che riguardano i token richiesti; le
+sottoscrizioni successive ({"operation": "subscribe"}) rigiocano quelli dei nuovi token.
+"PING" → "PONG". drop_after=N chiude la connessione dopo N messaggi (prova di riconnessione).
+
+synthetic_recording() genera una sessione realistica (snapshot, variazioni di prezzo nei due
+formati, tick size, ultimi scambi) quando non c'è una registrazione reale.
+"""
+
+import json
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+
+def _event_assets(ev: Dict) -> Set[str]:
+    if ev.get("price_changes") is not None:
+        return {str(c.get("asset_id")) for c in ev["price_changes"]}
+    return {str(ev.get("asset_id"))}
+
+
+def message_assets(raw: str) -> Set[str]:
+    data = json.loads(raw)
+    out: Set[str] = set()
+    for ev in data if isinstance(data, list) else [data]:
+        out |= _event_assets(ev)
+    return out
+
+
+def synthetic_recording(tokens: Iterable[str], updates: int = 2000, levels: int = 20, seed: int = 7) -> List[str]:
+    """Messaggi grezzi: snapshot per ogni token (in una lista, come il server reale), poi variazioni."""
+    rng = random.Random(seed)
+    tokens = list(tokens)
+    market = "0x" + "ab" * 32
+    ts = 1_760_000_000_000
+    snaps = []
+    for t in tokens:
+        mid = rng.randint(20, 80)
+        bids = [{"price": f"{(mid - 1 - i) / 100:g}", "size": str(rng.randint(10, 500))} for i in range(levels) if mid - 1 - i > 0]
+        asks = [{"price": f"{(mid + 1 + i) / 100:g}", "size": str(rng.randint(10, 500))} for i in range(levels) if mid + 1 + i < 100]
+        snaps.append({"event_type": "book", "asset_id": t, "market": market, "bids": bids[::-1], "asks": asks[::-1],
+                      "timestamp": str(ts), "hash": "0x" + rng.randbytes(20).hex()})
+    out = [json.dumps(snaps)]
+    for n in range(updates):
+        ts += rng.randint(1, 50)
+        t = rng.choice(tokens)
+        kind = rng.random()
+        if kind < 0.03:
+            out.append(json.dumps({"event_type": "last_trade_price", "asset_id": t, "market": market, "price": "0.5",
+                                   "side": "BUY", "size": "10", "fee_rate_bps": "0", "timestamp": str(ts)}))
+            continue
+        if kind < 0.035:
+            out.append(json.dumps({"event_type": "tick_size_change", "asset_id": t, "market": market,
+                                   "old_tick_size": "0.01", "new_tick_size": "0.001", "timestamp": str(ts)}))
+            continue
+        changes = []
+        for _ in range(rng.randint(1, 3)):
+            side = rng.choice(("BUY", "SELL"))
+            px = rng.randint(1, 99) / 100
+            size = "0" if rng.random() < 0.3 else str(rng.randint(1, 800))
+            changes.append({"asset_id": t, "price": f"{px:g}", "size": size, "side": side})
+        if n % 2:
+            msg = {"event_type": "price_change", "market": market, "price_changes": changes, "timestamp": str(ts)}
+        else:
+            msg = {"event_type": "price_change", "asset_id": t, "market": market, "timestamp": str(ts),
+                   "changes": [{k: v for k, v in c.items() if k != "asset_id"} for c in changes]}
+        out.append(json.dumps(msg))
+    return out
+
+
+class FakeMarketWs:
+    def __init__(self, recording: List[str], delay: float = 0.0, drop_after: Optional[int] = None):
+        self.recording = recording
+        self.delay = delay
+        self.drop_after = drop_after
+        self.connections = 0
+        self.sent = 0
+        self.pings = 0
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _replay(self, ws, assets: Set[str], budget: List[int]) -> bool:
+        for raw in self.recording:
+            if not (message_assets(raw) & assets):
+                continue
+            if budget[0] == 0:
+                return False
+            ws.send(raw)
+            budget[0] -= 1
+            with self._lock:
+                self.sent += 1
+            if self.delay:
+                time.sleep(self.delay)
+        return True
+
+    def _handler(self, ws) -> None:
+        from websockets.exceptions import ConnectionClosed
+
+        with self._lock:
+            self.connections += 1
+            # La prima connessione può essere interrotta (drop_after), le successive no
+            budget = [self.drop_after if self.drop_after is not None and self.connections == 1 else -1]
+        try:
+            for raw in ws:
+                if raw == "PING":
+                    with self._lock:
+                        self.pings += 1
+                    ws.send("PONG")
+                    continue
+                msg = json.loads(raw)
+                if msg.get("operation") == "unsubscribe":
+                    continue
+                if not self._replay(ws, {str(a) for a in msg.get("assets_ids") or ()}, budget):
+                    ws.close()
+                    return
+        except ConnectionClosed:
+            pass
+
+    def start(self) -> str:
+        from websockets.sync.server import serve
+
+        self._server = serve(self._handler, "127.0.0.1", 0, compression=None)
+        port = self._server.socket.getsockname()[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return f"ws://127.0.0.1:{port}/ws/market"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._thread.join(timeout=5)
@@ -0,0 +1,119 @@
+"""
+Relayer Polymarket locale (finto) per py_builder_relayer_client (Safe) e claim-proxy (Proxy):
+GET /deployed, GET /nonce, GET /relay-payload, POST /submit, GET /transaction.
+
+Nessuna firma verificata. Ogni /submit riuscito riceve un transactionHash nuovo (passato a
+`on_submit`, es. FakeRpcNode.set_receipt per la riconciliazione del ledger) e conta i redeem dal
+campo metadata ("Redeem N positions"). Un batch che contiene un conditionId in `poison` fallisce
+con "execution reverted" (il bot deve isolarlo con la bisezione). Latenza, 5xx e 429 da bench.faults.
+"""
+
+import json
+import os
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Set
+from urllib.parse import parse_qs
+
+from bench.faults import Faults
+
+_METADATA = re.compile(r"(\d+)")
+
+
+class FakeRelayer:
+    def __init__(self, faults: Optional[Faults] = None, on_submit: Optional[Callable[[str], None]] = None):
+        self.faults = faults or Faults()
+        self.on_submit = on_submit
+        self.poison: Set[str] = set()
+        self.submits = 0
+        self.redeems = 0
+        self.reverted = 0
+        self.requests: Dict[str, int] = {}
+        self.transactions: Dict[str, Dict] = {}
+        self._nonces: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _submit(self, body: Dict):
+        data = str(body.get("data") or "").lower()
+        if any(cid.lower().removeprefix("0x") in data for cid in self.poison):
+            with self._lock:
+                self.reverted += 1
+            return 400, {"error": "execution reverted: batch simulation failed"}
+        match = _METADATA.search(str(body.get("metadata") or ""))
+        tx_id, tx_hash = str(uuid.uuid4()), "0x" + os.urandom(32).hex()
+        with self._lock:
+            sender = str(body.get("from") or "").lower()
+            self._nonces[sender] = self._nonces.get(sender, 0) + 1
+            self.submits += 1
+            self.redeems += int(match.group(1)) if match else 1
+            self.transactions[tx_id] = {"transactionID": tx_id, "transactionHash": tx_hash, "state": "STATE_MINED"}
+        if self.on_submit is not None:
+            self.on_submit(tx_hash)
+        return 200, {"transactionID": tx_id, "transactionHash": tx_hash, "state": "STATE_NEW"}
+
+    def handle(self, method: str, path: str, query: Dict, body) -> tuple:
+        path = "/" + path.lstrip("/")
+        with self._lock:
+            self.requests[f"{method} {path}"] = self.requests.get(f"{method} {path}", 0) + 1
+        address = (query.get("address") or [""])[0].lower()
+        if method == "GET" and path == "/deployed":
+            return 200, {"deployed": True}
+        if method == "GET" and path == "/nonce":
+            with self._lock:
+                return 200, {"nonce": str(self._nonces.get(address, 0))}
+        if method == "GET" and path == "/relay-payload":
+            with self._lock:
+                return 200, {"address": "0x" + "11" * 20, "nonce": str(self._nonces.get(address, 0))}
+        if method == "POST" and path == "/submit":
+            return self._submit(body or {})
+        if method == "GET" and path == "/transaction":
+            tx = self.transactions.get((query.get("id") or [""])[0])
+            return (200, [tx]) if tx else (404, {"error": "transaction not found"})
+        return 404, {"error": "not found"}
+
+    def start(self) -> str:
+        relayer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _serve(self, method: str):
+                # Il client concatena URL base e percorso: "//nonce" non va letto come host
+                path, _, query = self.path.partition("?")
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                fault, headers = relayer.faults.apply(), {}
+                if fault is not None:
+                    code, reply, headers = fault
+                else:
+                    code, reply = relayer.handle(method, path, parse_qs(query), json.loads(raw) if raw else None)
+                data = json.dumps(reply).encode()
+                self.send_response(code)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}/"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,220 @@
+"""
+Nodo JSON-RPC locale (finto) per il watcher eventi CTF e la riconciliazione del ledger.
+Supporta eth_blockNumber, eth_getLogs (address/topics/intervallo, con limite di blocchi come
+i nodi pubblici), eth_getTransactionReceipt e richieste batch. Latenza e guasti (5xx, 429)
+configurabili con bench.faults.Faults.
+
+Uso: python -m bench.fake_rpc [--markets 200] [--blocks-per-poll 20]
+Simula risoluzioni di mercati posseduti e misura il ritardo di rilevamento del watcher.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from bench.faults import Faults
+from claims import CTF_ADDRESS
+from resolutions import CONDITION_RESOLUTION_TOPIC, PAYOUT_REDEMPTION_TOPIC, ResolutionWatcher, match_claimable
+
+
+def _word(n: int) -> str:
+    return f"{n:064x}"
+
+
+class FakeRpcNode:
+    """Catena in memoria: blocchi, log CTF e receipt. Thread-safe (server HTTP multi-thread)."""
+
+    def __init__(self, max_block_range: int = 1000, start_block: int = 50_000_000, faults: Optional[Faults] = None):
+        self.faults = faults or Faults()
+        self.block = start_block
+        self.max_block_range = max_block_range
+        self.logs: List[Dict] = []
+        self.receipts: Dict[str, Dict] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # --- simulazione catena ---
+
+    def mine(self, n: int = 1) -> int:
+        with self._lock:
+            self.block += n
+            return self.block
+
+    def resolve(self, condition_id: str, payouts: List[int]) -> None:
+        """Log ConditionResolution nel prossimo blocco (visibile dopo mine())."""
+        data = "0x" + _word(len(payouts)) + _word(0x40) + _word(len(payouts)) + "".join(_word(p) for p in payouts)
+        self._add_log([CONDITION_RESOLUTION_TOPIC, condition_id.lower(), "0x" + _word(0), "0x" + _word(0)], data)
+
+    def redeem(self, redeemer: str, condition_id: str, payout: int, tx_hash: Optional[str] = None) -> str:
+        """Log PayoutRedemption + receipt riuscita; ritorna il tx hash."""
+        tx_hash = tx_hash or "0x" + os.urandom(32).hex()
+        data = "0x" + condition_id.lower().replace("0x", "") + _word(0x60) + _word(payout) + _word(1) + _word(1)
+        redeemer_topic = "0x" + redeemer.lower().replace("0x", "").rjust(64, "0")
+        self._add_log([PAYOUT_REDEMPTION_TOPIC, redeemer_topic, "0x" + _word(0), "0x" + _word(0)], data, tx_hash)
+        self.set_receipt(tx_hash, True)
+        return tx_hash
+
+    def set_receipt(self, tx_hash: str, ok: bool) -> None:
+        with self._lock:
+            self.receipts[tx_hash] = {"transactionHash": tx_hash, "blockNumber": hex(self.block + 1), "status": "0x1" if ok else "0x0"}
+
+    def _add_log(self, topics: List[str], data: str, tx_hash: Optional[str] = None) -> None:
+        with self._lock:
+            self.logs.append({
+                "address": CTF_ADDRESS.lower(),
+                "topics": topics,
+                "data": data,
+                "blockNumber": hex(self.block + 1),
+                "transactionHash": tx_hash or "0x" + os.urandom(32).hex(),
+            })
+
+    # --- JSON-RPC ---
+
+    def _get_logs(self, flt: Dict):
+        start, end = int(flt["fromBlock"], 16), int(flt["toBlock"], 16)
+        if end - start + 1 > self.max_block_range:
+            raise ValueError(f"block range too large (max {self.max_block_range})")
+        address = (flt.get("address") or "").lower()
+        topics = flt.get("topics") or []
+        out = []
+        for log in self.logs:
+            if not start <= int(log["blockNumber"], 16) <= end:
+                continue
+            if address and log["address"] != address:
+                continue
+            ok = True
+            for i, want in enumerate(topics):
+                if want is None:
+                    continue
+                wants = want if isinstance(want, list) else [want]
+                if i >= len(log["topics"]) or log["topics"][i].lower() not in [w.lower() for w in wants]:
+                    ok = False
+                    break
+            if ok:
+                out.append(log)
+        return out
+
+    def handle(self, req: Dict) -> Dict:
+        method, params = req.get("method"), req.get("params") or []
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            try:
+                if method == "eth_blockNumber":
+                    result = hex(self.block)
+                elif method == "eth_getLogs":
+                    result = self._get_logs(params[0])
+                elif method == "eth_getTransactionReceipt":
+                    result = self.receipts.get(params[0])
+                else:
+                    return {"jsonrpc": "2.0", "id": req.get("id"), "error": {"code": -32601, "message": f"{method} not found"}}
+            except ValueError as e:
+                return {"jsonrpc": "2.0", "id": req.get("id"), "error": {"code": -32005, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": req.get("id"), "result": result}
+
+    # --- server HTTP ---
+
+    def start(self) -> str:
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"null")
+                fault, headers = node.faults.apply(), {}
+                if fault is not None:
+                    code, reply, headers = fault
+                else:
+                    code = 200
+                    reply = [node.handle(r) for r in body] if isinstance(body, list) else node.handle(body)
+                raw = json.dumps(reply).encode()
+                self.send_response(code)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+async def _demo(args) -> None:
+    import httpx
+
+    node = FakeRpcNode(max_block_range=args.node_max_range)
+    url = node.start()
+    owner = "0x" + os.urandom(20).hex()
+    held = {"0x" + os.urandom(32).hex(): {i % 2} for i in range(args.markets)}
+    try:
+        async with httpx.AsyncClient() as client:
+            watcher = ResolutionWatcher(url, owner=owner, confirmations=0, max_block_range=args.watch_range, client=client)
+            await watcher.poll()  # cursore sulla testa corrente
+            found, lat = set(), []
+            pending = list(held)
+            # Storico lungo (es. worker fermo): finestre dimezzate quando il nodo rifiuta l'intervallo
+            node.mine(args.backlog_blocks)
+            t0 = time.perf_counter()
+            await watcher.poll()
+            t_backlog = time.perf_counter() - t0
+            while pending:
+                for cid in pending[:5]:
+                    # Metà dei mercati risolti a favore dell'outcome posseduto
+                    win = list(held[cid])[0] if len(pending) % 2 else 1 - list(held[cid])[0]
+                    node.resolve(cid, [1 if i == win else 0 for i in range(2)])
+                    node.resolve("0x" + os.urandom(32).hex(), [1, 0])  # mercato non posseduto
+                resolved_at = time.perf_counter()
+                del pending[:5]
+                node.mine(args.blocks_per_poll)
+                batch = await watcher.poll()
+                new = set(match_claimable(batch.resolutions, held)) - found
+                if new:
+                    lat.append(time.perf_counter() - resolved_at)
+                found |= new
+            # Redeem eseguito dal wallet → PayoutRedemption visto dal watcher
+            redeemed = next(iter(found), None)
+            if redeemed:
+                node.redeem(owner, redeemed, 10**6)
+                node.mine(1)
+                batch = await watcher.poll()
+                assert [r.condition_id for r in batch.redemptions] == [redeemed], batch.redemptions
+        print(f"Mercati posseduti: {len(held)} — rilevati claimabili: {len(found)}")
+        print(f"Backlog {args.backlog_blocks} blocchi (nodo max {args.node_max_range}/query): {t_backlog * 1000:.1f} ms")
+        if lat:
+            lat.sort()
+            print(f"Ritardo rilevamento per poll: mediana {lat[len(lat) // 2] * 1000:.2f} ms, max {lat[-1] * 1000:.2f} ms")
+        print(f"Chiamate RPC: {node.calls}")
+    finally:
+        node.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--markets", type=int, default=200)
+    ap.add_argument("--blocks-per-poll", type=int, default=20)
+    ap.add_argument("--backlog-blocks", type=int, default=20_000)
+    ap.add_argument("--watch-range", type=int, default=5000, help="max_block_range del watcher")
+    ap.add_argument("--node-max-range", type=int, default=2000, help="limite blocchi per eth_getLogs del nodo")
+    asyncio.run(_demo(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
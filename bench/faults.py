@@ -0,0 +1,76 @@
+"""
+Guasti simulati per i server finti (bench/fake_*): latenza con jitter, errori 5xx a caso e 429
+oltre un certo numero di richieste al secondo (token bucket, con Retry-After).
+
+Da riga di comando: Faults.parse("latency=0.15,jitter=0.05,errors=0.02,rps=20")
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+_KEYS = {"latency": "latency", "jitter": "jitter", "errors": "error_rate", "rps": "rate_limit", "burst": "burst"}
+
+
+@dataclass
+class Faults:
+    latency: float = 0.0      # s per risposta
+    jitter: float = 0.0       # s aggiunti a caso (uniforme 0..jitter)
+    error_rate: float = 0.0   # probabilità di 500/502/503
+    rate_limit: float = 0.0   # richieste/s oltre cui si risponde 429 (0 = nessun limite)
+    burst: float = 0.0        # richieste a raffica prima del 429 (default: rate_limit)
+    injected: Dict[int, int] = field(default_factory=dict)
+    served: int = 0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._tokens = self.burst or self.rate_limit
+        self._at = time.monotonic()
+
+    @classmethod
+    def parse(cls, spec: str) -> "Faults":
+        """"latency=0.1,errors=0.01,rps=50" → Faults (chiavi: latency, jitter, errors, rps, burst)."""
+        kwargs = {}
+        for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+            key, _, value = part.partition("=")
+            if key.strip() not in _KEYS:
+                raise ValueError(f"guasto sconosciuto: {key} (validi: {', '.join(_KEYS)})")
+            kwargs[_KEYS[key.strip()]] = float(value)
+        return cls(**kwargs)
+
+    def _take(self) -> bool:
+        if self.rate_limit <= 0:
+            return True
+        now = time.monotonic()
+        capacity = self.burst or self.rate_limit
+        self._tokens = min(capacity, self._tokens + (now - self._at) * self.rate_limit)
+        self._at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def apply(self) -> Optional[Tuple[int, Dict, Dict[str, str]]]:
+        """
+        Attende la latenza simulata; ritorna (status, body, header) se la richiesta va fatta
+        fallire, altrimenti None (risposta normale).
+        """
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.served += 1
+            if not self._take():
+                self.injected[429] = self.injected.get(429, 0) + 1
+                return 429, {"error": "Too Many Requests: quota exceeded"}, {"Retry-After": "1"}
+            if self.error_rate and random.random() < self.error_rate:
+                code = random.choice((500, 502, 503))
+                self.injected[code] = self.injected.get(code, 0) + 1
+                return code, {"error": "simulated upstream error"}, {}
+        return None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"served": self.served, "injected": {str(k): v for k, v in sorted(self.injected.items())}}
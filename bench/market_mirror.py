@@ -0,0 +1,132 @@
+"""
+Book locale via WebSocket (market_stream) contro un canale market finto che rigioca una registrazione:
+- correttezza: a fine replay ogni book locale coincide con quello ricostruito in modo ingenuo
+  (dict prezzo → size) dagli stessi messaggi, anche con una disconnessione a metà;
+- latenza: midpoint/orderbook dal book locale vs GET /midpoint e /book sul CLOB finto.
+Uso: python -m bench.market_mirror [--tokens 20] [--updates 5000] [--latency 0.15]
+     python -m bench.market_mirror --recording sessione.jsonl   (una riga per messaggio grezzo)
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from bench.fake_clob import FakeClob, make_executor
+from bench.fake_market_ws import FakeMarketWs, message_assets, synthetic_recording
+
+
+def reference_books(recording, tokens):
+    """{token: (bids, asks)} con bids/asks = {prezzo: size}, applicando i messaggi nel modo più semplice."""
+    books = {}
+    for raw in recording:
+        data = json.loads(raw)
+        for ev in data if isinstance(data, list) else [data]:
+            kind = ev.get("event_type")
+            if kind == "book" and ev["asset_id"] in tokens:
+                books[ev["asset_id"]] = (
+                    {float(l["price"]): float(l["size"]) for l in ev["bids"] if float(l["size"]) > 0},
+                    {float(l["price"]): float(l["size"]) for l in ev["asks"] if float(l["size"]) > 0},
+                )
+            elif kind == "price_change":
+                changes = ev.get("price_changes") or [dict(c, asset_id=ev["asset_id"]) for c in ev.get("changes", ())]
+                for c in changes:
+                    if c["asset_id"] not in books:
+                        continue
+                    side = books[c["asset_id"]][0 if c["side"] == "BUY" else 1]
+                    if float(c["size"]) > 0:
+                        side[float(c["price"])] = float(c["size"])
+                    else:
+                        side.pop(float(c["price"]), None)
+    return books
+
+
+def _wait_synced(stream, tokens, expected_messages, timeout=30.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if stream.stats()["ready"] == len(tokens) and stream.messages >= expected_messages:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _timeit(fn, n):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tokens", type=int, default=20)
+    ap.add_argument("--updates", type=int, default=5000)
+    ap.add_argument("--recording", help="file con i messaggi grezzi registrati (uno per riga)")
+    ap.add_argument("--drop-after", type=int, default=500, help="messaggi prima di chiudere la prima connessione")
+    ap.add_argument("--latency", type=float, default=0.15, help="latenza REST simulata (s)")
+    args = ap.parse_args()
+
+    from market_stream import MarketStream
+
+    if args.recording:
+        with open(args.recording, "r", encoding="utf-8") as f:
+            recording = [line.strip() for line in f if line.strip()]
+        tokens = sorted(set().union(*(message_assets(r) for r in recording)) - {"None"})
+    else:
+        tokens = [str(900_000 + i) for i in range(args.tokens)]
+        recording = synthetic_recording(tokens, updates=args.updates)
+    expected = reference_books(recording, set(tokens))
+
+    ws = FakeMarketWs(recording, drop_after=args.drop_after or None)
+    clob = FakeClob(latency=args.latency)
+    ex = make_executor(clob.start())
+    url = ws.start()
+    stream = MarketStream(tokens, url=url, ping_interval=0.5)
+    ex.market_stream = stream
+    ok = True
+    try:
+        t0 = time.perf_counter()
+        stream.start()
+        # Dopo la riconnessione il replay riparte: messaggi attesi = interrotti + registrazione completa
+        relevant = sum(1 for r in recording if message_assets(r) & set(tokens))
+        total = relevant + min(args.drop_after or 0, relevant)
+        synced = _wait_synced(stream, tokens, total)
+        replay = time.perf_counter() - t0
+
+        mismatched = []
+        for t in tokens:
+            bids, asks = expected[t]
+            with stream._lock:
+                book = stream._books.get(t)
+                got_bids = dict(zip(book.bid_px, book.bid_sz)) if book else {}
+                got_asks = dict(zip(book.ask_px, book.ask_sz)) if book else {}
+            if got_bids != bids or got_asks != asks:
+                mismatched.append(t)
+        st = stream.stats()
+        print(f"Replay: {len(recording)} messaggi, {len(tokens)} token, {replay:.2f} s "
+              f"(connessioni {ws.connections}, riconnessioni {st['reconnects']}, PING {ws.pings})")
+        print(f"Snapshot {st['snapshots']}, variazioni {st['deltas']}, book sincronizzati {st['ready']}/{len(tokens)}")
+        print(f"Book diversi dalla ricostruzione di riferimento: {len(mismatched)}")
+        ok = synced and not mismatched and ws.connections >= (2 if args.drop_after else 1)
+
+        token = tokens[0]
+        mirror_mid = _timeit(lambda: ex.get_midpoint_price(token), 2000)
+        mirror_book = _timeit(lambda: ex.get_orderbook(token), 2000)
+        rest_mid = _timeit(lambda: ex._fetch_midpoint(token), 10)
+        rest_book = _timeit(lambda: ex._fetch_orderbook(token), 10)
+        print(f"Midpoint:  book locale {mirror_mid * 1e6:.1f} µs — REST {rest_mid * 1000:.0f} ms")
+        print(f"Orderbook: book locale {mirror_book * 1e6:.1f} µs — REST {rest_book * 1000:.0f} ms")
+        print(f"Token non sottoscritto → REST: midpoint {ex.get_midpoint_price('123')}")
+    finally:
+        stream.stop()
+        ws.stop()
+        clob.stop()
+    print("OK" if ok else "FALLITO")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Metriche Prometheus (modulo metrics): costo sul percorso caldo e scrape di /metrics.
+- ns per inc/observe (con etichetta), a thread singolo e con più thread in contesa;
+- lo stesso ciclo con l'endpoint /metrics avviato ma senza scrape (deve costare uguale);
+- ordini su CLOB finto: contatori/istogrammi devono riportare esattamente gli ordini inviati;
+- scrape HTTP: tempo di generazione e validità di ogni riga nel formato testo 0.0.4.
+Uso: python -m bench.metrics_overhead [--ops 200000] [--threads 4] [--orders 50]
+"""
+
+import argparse
+import contextlib
+import io
+import re
+import sys
+import threading
+import time
+
+from bench.fake_clob import FakeClob, make_executor
+
+_SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\]|\\.)*",?)*\})? [-+0-9.eEInfa]+$')
+
+
+def _per_op(fn, ops: int) -> float:
+    t0 = time.perf_counter()
+    fn(ops)
+    return (time.perf_counter() - t0) / ops * 1e9
+
+
+def _loops(ops: int):
+    from metrics import CLAIMS, STAGE_SECONDS
+
+    def baseline(n):
+        f = lambda amount=1.0, **labels: None
+        for _ in range(n):
+            f(via="relayer")
+
+    def inc(n):
+        for _ in range(n):
+            CLAIMS.inc(via="relayer")
+
+    def observe(n):
+        for _ in range(n):
+            STAGE_SECONDS.observe(0.042, stage="balance")
+
+    return {"chiamata vuota": baseline, "Counter.inc": inc, "Histogram.observe": observe}
+
+
+def _threaded(fn, ops: int, threads: int) -> float:
+    per = ops // threads
+    workers = [threading.Thread(target=fn, args=(per,)) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - t0) / (per * threads) * 1e9
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--ops", type=int, default=200_000)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--orders", type=int, default=50)
+    ap.add_argument("--latency", type=float, default=0.005, help="latenza CLOB simulata per richiesta (s)")
+    args = ap.parse_args()
+
+    import httpx
+
+    import metrics
+
+    loops = _loops(args.ops)
+    print(f"Percorso caldo ({args.ops} operazioni):")
+    for label, fn in loops.items():
+        print(f"  {label:20s} {_per_op(fn, args.ops):6.0f} ns/op — {args.threads} thread {_threaded(fn, args.ops, args.threads):6.0f} ns/op")
+
+    server = metrics.start_http_server(0, "127.0.0.1")
+    url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+    print("Con endpoint /metrics attivo, nessuno scrape:")
+    for label, fn in loops.items():
+        print(f"  {label:20s} {_per_op(fn, args.ops):6.0f} ns/op")
+
+    from py_clob_client.clob_types import OrderArgs
+
+    clob = FakeClob(latency=args.latency)
+    ex = make_executor(clob.start())
+    ok = True
+    try:
+        placed_before = metrics.ORDERS.samples()
+        with contextlib.redirect_stdout(io.StringIO()):
+            singles = sum(ex.place_limit_order("71000", "BUY", 10.0, 0.4) is not None for _ in range(args.orders))
+            bulk = ex.place_orders_bulk([OrderArgs(token_id="71001", price=0.4, size=10.0, side="SELL")] * args.orders)
+        placed = singles + sum(r["ok"] for r in bulk)
+
+        t0 = time.perf_counter()
+        text = metrics.registry.render()
+        render_ms = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        resp = httpx.get(url)
+        scrape_ms = (time.perf_counter() - t0) * 1000
+        lines = [l for l in resp.text.splitlines() if l and not l.startswith("#")]
+        invalid = [l for l in lines if not _SAMPLE.match(l)]
+        values = {l.rsplit(" ", 1)[0]: float(l.rsplit(" ", 1)[1]) for l in lines}
+        before = {s[1]["outcome"]: s[2] for s in placed_before}
+        reported = values.get('polybot_orders_total{outcome="placed"}', 0) - before.get("placed", 0)
+        posts = values.get('polybot_stage_duration_seconds_count{stage="order_post"}', 0)
+
+        print(f"Ordini: {placed} piazzati ({args.orders} singoli + {args.orders} in blocco), metriche {reported:.0f}; "
+              f"istogramma order_post {posts:.0f} osservazioni")
+        print(f"/metrics: HTTP {resp.status_code}, {len(lines)} campioni, {len(text) / 1024:.1f} KiB, "
+              f"render {render_ms:.2f} ms, scrape {scrape_ms:.1f} ms, righe non valide {len(invalid)}")
+        for l in invalid[:5]:
+            print(f"  ✗ {l}")
+        ok = (resp.status_code == 200 and not invalid and reported == placed and posts == args.orders
+              and 'polybot_requests_total{destination="clob"}' in values)
+    finally:
+        ex._get_order_signer().close()
+        clob.stop()
+        server.shutdown()
+    print("OK" if ok else "FALLITO")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
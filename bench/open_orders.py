@@ -0,0 +1,104 @@
+"""
+Ordini aperti: GET /data/orders a ogni lettura (vecchio get_open_orders) vs vista locale
+(orders.OrderTracker), e cancel uno per uno vs una sola richiesta, su CLOB finto locale.
+Gli eseguiti arrivano come eventi "order" UPDATE del canale user (rigiocati su UserStream):
+a fine prova la vista locale deve coincidere con gli ordini aperti sul CLOB senza riconciliare.
+Uso: python -m bench.open_orders [--orders 300] [--reads 200] [--latency 0.15]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+
+from bench.fake_clob import FakeClob, make_executor
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--orders", type=int, default=300)
+    ap.add_argument("--reads", type=int, default=200, help="letture della lista ordini aperti")
+    ap.add_argument("--cancel", type=int, default=20, help="ordini da cancellare uno per uno (il vecchio modo)")
+    ap.add_argument("--latency", type=float, default=0.15, help="latenza simulata per richiesta (s)")
+    args = ap.parse_args()
+
+    from py_clob_client.clob_types import OrderArgs
+
+    from orders import UserStream
+
+    clob = FakeClob(latency=args.latency)
+    ex = make_executor(clob.start())
+    tokens = [str(70_000 + i) for i in range(args.orders // 10 or 1)]
+    orders = [OrderArgs(token_id=tokens[i % len(tokens)], price=0.3 + 0.01 * (i % 5), size=10.0,
+                        side="BUY" if i % 2 else "SELL") for i in range(args.orders)]
+    ok = True
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ex.place_orders_bulk(orders)
+            ex.get_open_orders(refresh=True)
+        n_reads = min(args.reads, 20)
+
+        # Vecchio: ogni lettura = GET /data/orders autenticato
+        t0 = time.perf_counter()
+        for _ in range(n_reads):
+            ex.client.get_orders()
+        poll = (time.perf_counter() - t0) / n_reads
+
+        # Nuovo: vista locale (riconciliata ogni ORDERS_POLL_SECONDS / ORDERS_RECONCILE_SECONDS)
+        before = clob.requests.get("GET /data/orders", 0)
+        t0 = time.perf_counter()
+        for _ in range(args.reads):
+            ex.get_open_orders()
+        local = (time.perf_counter() - t0) / args.reads
+        gets = clob.requests.get("GET /data/orders", 0) - before
+
+        some = ex.orders.all()[0]
+        t0 = time.perf_counter()
+        for _ in range(10_000):
+            ex.orders.get(some.id)
+            ex.orders.for_token(some.token_id, "BUY")
+        lookup = (time.perf_counter() - t0) / 10_000
+
+        # Eseguiti: spariscono dal CLOB e arrivano come UPDATE sul canale user
+        stream = UserStream(ex.orders, ex.client.creds)
+        filled = [o for o in ex.orders.all() if o.side == "SELL"][:25]
+        for o in filled:
+            clob.open_orders.pop(o.id, None)
+            stream.handle_message(json.dumps([{
+                "event_type": "order", "type": "UPDATE", "id": o.id, "asset_id": o.token_id, "side": o.side,
+                "price": f"{o.price:g}", "original_size": f"{o.original_size:g}", "size_matched": f"{o.original_size:g}",
+            }]))
+
+        # Cancel: uno per uno vs una richiesta (per predicato e per token)
+        with contextlib.redirect_stdout(io.StringIO()):
+            singles = [o.id for o in ex.orders.all()][:args.cancel]
+            t0 = time.perf_counter()
+            for order_id in singles:
+                ex.cancel_order(order_id)
+            one_by_one = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            by_pred = ex.cancel_orders_where(lambda o: o.side == "BUY" and o.price >= 0.32)
+            bulk = time.perf_counter() - t0
+            by_token = ex.cancel_orders_for_token(tokens[0])
+
+        expected = set(clob.open_orders)
+        mirrored = {o.id for o in ex.orders.all()}
+        print(f"{args.orders} ordini su {len(tokens)} token, latenza CLOB simulata {args.latency * 1000:.0f} ms")
+        print(f"Lista ordini aperti: GET /data/orders {poll * 1000:.0f} ms — vista locale {local * 1e6:.1f} µs "
+              f"({gets} GET in {args.reads} letture)")
+        print(f"Ricerca per id + per (token, lato): {lookup * 1e6:.2f} µs")
+        print(f"Cancel: {len(singles)} uno per uno {one_by_one:.2f} s — "
+              f"{len(by_pred['canceled'])} per predicato in 1 richiesta {bulk:.2f} s; per token {len(by_token['canceled'])}")
+        print(f"Vista locale {len(mirrored)} ordini, CLOB {len(expected)}: differenze {len(mirrored ^ expected)}")
+        ok = mirrored == expected and len(by_pred["canceled"]) > 0
+    finally:
+        ex._get_order_signer().close()
+        clob.stop()
+    print("OK" if ok else "FALLITO")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cicli su un wallet con molte posizioni già claimate ma ancora elencate dalla Data API:
+snapshot + delta (positions.PositionSnapshot, pagine con ETag) vs rielaborazione completa.
+Uso: python -m bench.position_diff [--positions 5000] [--cycles 5] [--no-etags]
+
+Server finti in un processo separato (bench.standins): il tempo CPU misurato è solo quello del bot.
+Il primo ciclo claima tutto; dal secondo le posizioni restano in elenco (indexer in ritardo) e il
+ledger le vede confermate via RPC. "Completo" = ClaimCycle nuovo a ogni ciclo (com'era prima).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from bench.standins import StandIns
+from bench.suite import _configure_env, _wallet
+
+
+async def _cycles(make_cycle, cycles: int, fresh: bool, standins):
+    rows = []
+    cycle = None if fresh else make_cycle()
+    try:
+        for _ in range(cycles):
+            if fresh:
+                cycle = make_cycle()
+            before = standins.stats()["data_api"]
+            out = io.StringIO()
+            wall, cpu = time.perf_counter(), time.process_time()
+            with contextlib.redirect_stdout(out):
+                await cycle.run_cycle()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            after = standins.stats()["data_api"]
+            rows.append({
+                "wall": wall, "cpu": cpu, "lines": out.getvalue().count("\n"),
+                "requests": after["requests"] - before["requests"],
+                "not_modified": after["not_modified"] - before["not_modified"],
+            })
+            if fresh:
+                await cycle.aclose()
+                cycle = None
+    finally:
+        if cycle is not None:
+            await cycle.aclose()
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--positions", type=int, default=5000)
+    ap.add_argument("--cycles", type=int, default=5)
+    ap.add_argument("--no-etags", action="store_true", help="la Data API finta non manda ETag")
+    args = ap.parse_args()
+
+    with StandIns(positions=args.positions, etags=not args.no_etags, data_api="latency=0.01", relayer="latency=0.01") as s:
+        _configure_env(s.urls)
+        import check_cash
+        from bench.fake_clob import make_executor
+
+        ex = make_executor(s.urls["clob"])
+        results = {}
+        for i, (name, fresh) in enumerate((("completo", True), ("delta", False))):
+            wallet = _wallet(100 + i)  # wallet diversi: il ledger in memoria è condiviso
+            make_cycle = lambda: check_cash._make_cycle(ex, wallet, True, False, 0)
+            results[name] = asyncio.run(_cycles(make_cycle, args.cycles, fresh, s))
+        ex._get_order_signer().close()
+
+    print(f"{args.positions} posizioni redeemable per wallet, {args.cycles} cicli, "
+          f"ETag {'no' if args.no_etags else 'sì'}")
+    print(f"{'modo':10s} {'ciclo':>5s} {'wall ms':>9s} {'CPU ms':>8s} {'righe log':>10s} {'GET':>5s} {'304':>5s}")
+    for name, rows in results.items():
+        for i, r in enumerate(rows, 1):
+            print(f"{name:10s} {i:5d} {r['wall'] * 1000:9.0f} {r['cpu'] * 1000:8.1f} {r['lines']:10d} "
+                  f"{r['requests']:5d} {r['not_modified']:5d}")
+    steady = {name: rows[2:] or rows[-1:] for name, rows in results.items()}
+    cpu = {name: sum(r["cpu"] for r in rows) / len(rows) for name, rows in steady.items()}
+    lines = {name: sum(r["lines"] for r in rows) / len(rows) for name, rows in steady.items()}
+    print(f"A regime (dal 3° ciclo): CPU {cpu['completo'] * 1000:.1f} → {cpu['delta'] * 1000:.1f} ms "
+          f"({cpu['completo'] / max(cpu['delta'], 1e-9):.0f}x), righe di log {lines['completo']:.0f} → {lines['delta']:.0f}")
+    print("OK" if cpu["delta"] < cpu["completo"] and lines["delta"] <= lines["completo"] else "FALLITO")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Stress test instradamento proxy: molti OrderExecutor, ognuno con il suo proxy, piazzano ordini
+in parallelo nello stesso processo, mentre un altro thread continua a cambiare il client CLOB
+di default di py_clob_client (come faceva il vecchio fallback per paese).
+Il CLOB finto fa da proxy di sé stesso e registra da quale proxy arriva ogni richiesta: ogni
+ordine deve arrivare dal proxy del proprio executor (firmatario dell'ordine → executor → proxy).
+Uso: python -m bench.proxy_routing [--executors 8] [--orders 40] [--threads 32]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.fake_clob import FakeClob, make_executor
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--executors", type=int, default=8)
+    ap.add_argument("--orders", type=int, default=40, help="ordini singoli per executor")
+    ap.add_argument("--bulk", type=int, default=30, help="ordini in blocco per executor (place_orders_bulk)")
+    ap.add_argument("--threads", type=int, default=32)
+    ap.add_argument("--latency", type=float, default=0.005)
+    ap.add_argument("--jitter", type=float, default=0.01)
+    args = ap.parse_args()
+
+    from py_clob_client.clob_types import OrderArgs
+
+    from http_clients import install_clob_client, registry
+
+    clob = FakeClob(latency=args.latency, jitter=args.jitter)
+    port = clob.start().rsplit(":", 1)[1]
+    proxy = lambda name: f"http://{name}:x@127.0.0.1:{port}"
+    executors = {f"exec-{i}": make_executor("http://clob.test", proxy_url=proxy(f"exec-{i}")) for i in range(args.executors)}
+    expected = {ex.client.signer.address().lower(): name for name, ex in executors.items()}
+
+    # Client di default "sbagliato" cambiato di continuo da un altro thread
+    stop = threading.Event()
+    intruders = [registry.get("clob", proxy(f"intruder-{k}")) for k in range(2)]
+
+    def _swap_default():
+        k = 0
+        while not stop.is_set():
+            install_clob_client(intruders[k % 2])
+            k += 1
+            time.sleep(0.0005)
+
+    jobs = []
+    for n, (name, ex) in enumerate(executors.items()):
+        tokens = [str(100_000 * (n + 1) + i) for i in range(args.orders)]
+        jobs += [(ex.place_limit_order, (t, "BUY", 10.0, 0.5)) for t in tokens]
+        jobs += [(ex.get_midpoint_price, (t,)) for t in tokens[:5]]
+        bulk = [OrderArgs(token_id=str(100_000 * (n + 1) + 50_000 + i), price=0.99, size=5.0, side="SELL")
+                for i in range(args.bulk)]
+        jobs.append((ex.place_orders_bulk, (bulk,)))
+
+    swapper = threading.Thread(target=_swap_default, daemon=True)
+    swapper.start()
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=args.threads) as pool:
+            futures = [pool.submit(fn, *a) for fn, a in jobs]
+            errors = [f.exception() for f in futures if f.exception() is not None]
+    finally:
+        stop.set()
+        swapper.join()
+        clob.stop()
+    elapsed = time.perf_counter() - t0
+
+    wrong = 0
+    for order in clob.orders:
+        signer = str(order["body"]["order"].get("signer") or "").lower()
+        if expected.get(signer) != order["proxy"]:
+            wrong += 1
+    total = args.executors * (args.orders + args.bulk)
+    intruder_hits = sum(v for k, v in clob.by_proxy.items() if k.startswith("intruder"))
+    print(f"{args.executors} executor × ({args.orders} ordini + {args.bulk} in blocco), {args.threads} thread: {elapsed:.2f} s")
+    print(f"Ordini arrivati: {len(clob.orders)}/{total} — dal proxy sbagliato: {wrong}")
+    print(f"Richieste via client di default (intruso): {intruder_hits}; eccezioni: {len(errors)}")
+    print("Richieste per proxy: " + ", ".join(f"{k} {v}" for k, v in sorted(clob.by_proxy.items())))
+    ok = wrong == 0 and intruder_hits == 0 and not errors and len(clob.orders) == total
+    print("OK" if ok else "FALLITO")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
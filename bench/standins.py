@@ -0,0 +1,108 @@
+"""
+Tutti i server finti (Data API, CLOB, relayer, nodo RPC) in un processo separato: nel processo
+misurato resta solo il bot, così tempi CPU e allocazioni (tracemalloc) non contano i server.
+
+    with StandIns(positions=400, clob="latency=0.05", relayer="latency=0.2,rps=5") as s:
+        s.urls["clob"], s.urls["data_api"], s.urls["relayer"], s.urls["rpc"]
+        s.stats()                       # richieste e guasti iniettati per server
+        s.configure("clob", regional=["bench"], faults="latency=0.05,errors=0.01")
+
+Guasti nel formato di bench.faults.Faults.parse. Il relayer registra una receipt riuscita sul nodo
+RPC per ogni tx inviata (la riconciliazione del ledger le vede confermate).
+"""
+
+import multiprocessing
+from typing import Dict, Iterable, Optional
+
+NAMES = ("data_api", "clob", "relayer", "rpc")
+
+
+def _serve(conn, config: Dict) -> None:
+    from bench.fake_clob import FakeClob
+    from bench.fake_data_api import FakeDataApi
+    from bench.fake_relayer import FakeRelayer
+    from bench.fake_rpc import FakeRpcNode
+    from bench.faults import Faults
+
+    rpc = FakeRpcNode(faults=Faults.parse(config.get("rpc", "")))
+    servers = {
+        "data_api": FakeDataApi(config.get("positions", 500), faults=Faults.parse(config.get("data_api", "")),
+                                etags=config.get("etags", False)),
+        "clob": FakeClob(faults=Faults.parse(config.get("clob", ""))),
+        "relayer": FakeRelayer(Faults.parse(config.get("relayer", "")), on_submit=lambda h: rpc.set_receipt(h, True)),
+        "rpc": rpc,
+    }
+    conn.send({name: s.start() for name, s in servers.items()})
+    try:
+        while True:
+            cmd, args = conn.recv()
+            if cmd == "stop":
+                break
+            if cmd == "configure":
+                server = servers[args["name"]]
+                if args.get("faults") is not None:
+                    server.faults = Faults.parse(args["faults"])
+                for attr in ("regional", "reject", "poison"):
+                    if args.get(attr) is not None:
+                        setattr(server, attr, set(args[attr]))
+                conn.send(True)
+            elif cmd == "stats":
+                clob, relayer, data_api = servers["clob"], servers["relayer"], servers["data_api"]
+                with clob._lock:
+                    clob_stats = {"requests": dict(clob.requests), "by_proxy": dict(clob.by_proxy), "orders": len(clob.orders)}
+                conn.send({
+                    "data_api": {"requests": data_api.requests, "not_modified": data_api.not_modified},
+                    "clob": clob_stats,
+                    "relayer": {"requests": dict(relayer.requests), "submits": relayer.submits,
+                                "redeems": relayer.redeems, "reverted": relayer.reverted},
+                    "rpc": {"requests": dict(rpc.calls)},
+                    "faults": {name: s.faults.stats() for name, s in servers.items()},
+                })
+    finally:
+        for s in servers.values():
+            s.stop()
+
+
+class StandIns:
+    def __init__(self, positions: int = 500, etags: bool = False, **faults: str):
+        self.config = {"positions": positions, "etags": etags, **{n: faults.get(n, "") for n in NAMES}}
+        self.urls: Dict[str, str] = {}
+        self._conn = None
+        self._proc: Optional[multiprocessing.Process] = None
+
+    def start(self) -> Dict[str, str]:
+        ctx = multiprocessing.get_context("spawn")
+        self._conn, child = ctx.Pipe()
+        self._proc = ctx.Process(target=_serve, args=(child, self.config), daemon=True, name="bench-standins")
+        self._proc.start()
+        self.urls = self._conn.recv()
+        return self.urls
+
+    def configure(self, name: str, faults: Optional[str] = None, regional: Optional[Iterable[str]] = None,
+                  reject: Optional[Iterable[str]] = None, poison: Optional[Iterable[str]] = None) -> None:
+        args = {"name": name, "faults": faults, "regional": regional, "reject": reject, "poison": poison}
+        self._conn.send(("configure", {k: list(v) if isinstance(v, (set, tuple)) else v for k, v in args.items()}))
+        self._conn.recv()
+
+    def stats(self) -> Dict:
+        self._conn.send(("stats", None))
+        return self._conn.recv()
+
+    def stop(self) -> None:
+        if self._proc is None:
+            return
+        try:
+            self._conn.send(("stop", None))
+        except OSError:
+            pass
+        self._proc.join(5)
+        if self._proc.is_alive():
+            self._proc.terminate()
+        self._proc = None
+
+    def __enter__(self) -> "StandIns":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,129 @@
+"""
+Benchmark avvio a freddo (ogni scenario in un processo Python nuovo, come un riavvio su Render):
+- import: executor, py_clob_client, web3;
+- indirizzo da PRIVATE_KEY: web3 (Web3().eth.account) vs addresses;
+- pronto per il loop, su CLOB finto con latenza (simula il proxy), senza POLYMARKET_API_*:
+  classico (derivazione credenziali + get_balance di prova), con cache credenziali, FAST_START
+  (client al primo uso, import in background, nessuna chiamata di prova; il primo balance
+  arriva in parallelo al ciclo).
+Uso: python -m bench.startup [--latency 0.3] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.fake_clob import FakeClob
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT = """
+import json, sys, time
+t = time.perf_counter()
+import {module}
+print(json.dumps({{"s": time.perf_counter() - t}}))
+"""
+
+_ADDRESS = """
+import json, os, time
+pk = "0x" + "11" * 32
+t = time.perf_counter()
+if {web3}:
+    from web3 import Web3
+    Web3().eth.account.from_key(pk).address
+else:
+    from addresses import address_from_private_key
+    address_from_private_key(pk)
+print(json.dumps({{"s": time.perf_counter() - t}}))
+"""
+
+# Come check_cash.main (indirizzo, proxy, OrderExecutor, prova di connessione), senza il loop
+_READY = """
+import json, os, threading, time
+t = time.perf_counter()
+fast = os.environ.get("FAST_START") == "1"
+if fast:
+    from http_clients import preload_clob_client
+    threading.Thread(target=preload_clob_client, daemon=True).start()
+from http_clients import install_clob_client, registry
+install_clob_client(registry.get("clob"))
+from executor import OrderExecutor
+pk = os.environ["PRIVATE_KEY"]
+if fast:
+    from addresses import address_from_private_key
+    address_from_private_key(pk)
+else:
+    from web3 import Web3
+    Web3().eth.account.from_key(pk).address
+t_ex = time.perf_counter()
+ex = OrderExecutor("", "", "", pk, lazy_client=fast)
+t_ex = time.perf_counter() - t_ex
+if not fast:
+    ex.get_balance()
+ready = time.perf_counter() - t
+ex.get_balance()  # primo ciclo: balance (in FAST_START qui si crea il client)
+print(json.dumps({{"ready": ready, "executor": t_ex, "balance": time.perf_counter() - t}}))
+"""
+
+
+def _child(code: str, env=None) -> dict:
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env={**os.environ, **(env or {})},
+                         capture_output=True, text=True, check=True)
+    res = json.loads(out.stdout.strip().splitlines()[-1])
+    res["wall"] = time.perf_counter() - t0
+    return res
+
+
+def _median(runs, key):
+    return statistics.median(r[key] for r in runs)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--latency", type=float, default=0.3, help="latenza CLOB simulata per richiesta (s)")
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    print("Import (processo nuovo, mediana):")
+    for module in ("executor", "py_clob_client.client", "web3", "addresses"):
+        runs = [_child(_IMPORT.format(module=module)) for _ in range(args.runs)]
+        print(f"  {module:24s} {_median(runs, 's') * 1000:7.0f} ms")
+
+    print("Indirizzo da chiave privata:")
+    for label, web3 in (("web3", True), ("addresses", False)):
+        runs = [_child(_ADDRESS.format(web3=web3)) for _ in range(args.runs)]
+        print(f"  {label:24s} {_median(runs, 's') * 1000:7.0f} ms (import compreso)")
+
+    clob = FakeClob(latency=args.latency)
+    host = clob.start()
+    cache = os.path.join(tempfile.mkdtemp(prefix="startup-bench-"), "creds.json")
+    base = {"CLOB_HOST": host, "PRIVATE_KEY": "0x" + os.urandom(32).hex(), "CLOB_CREDS_CACHE": cache,
+            "POLY_SAFE_ADDRESS": "", "SAFE_ADDRESS": "", "PROXY_URL": "", "PROXY_HOST": ""}
+    try:
+        print(f"Pronto per il loop (CLOB finto, {args.latency * 1000:.0f} ms per richiesta):")
+        scenarios = [
+            ("classico, senza cache", {"CLOB_CREDS_CACHE": "", "FAST_START": "0"}),
+            ("cache credenziali", {"FAST_START": "0"}),
+            ("FAST_START + cache", {"FAST_START": "1"}),
+        ]
+        _child(_READY.format(), {**base, "FAST_START": "0"})  # popola la cache
+        for label, env in scenarios:
+            before = dict(clob.requests)
+            runs = [_child(_READY.format(), {**base, **env}) for _ in range(args.runs)]
+            auth = sum(v - before.get(k, 0) for k, v in clob.requests.items() if k.split(" ", 1)[1].startswith("/auth"))
+            print(f"  {label:24s} pronto {_median(runs, 'ready') * 1000:6.0f} ms "
+                  f"(OrderExecutor {_median(runs, 'executor') * 1000:4.0f} ms), primo balance "
+                  f"{_median(runs, 'balance') * 1000:6.0f} ms, processo {_median(runs, 'wall') * 1000:6.0f} ms, "
+                  f"richieste /auth {auth / args.runs:.0f}")
+    finally:
+        clob.stop()
+
+
+if __name__ == "__main__":
+    main()
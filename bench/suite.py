@@ -0,0 +1,288 @@
+"""
+Suite di benchmark end-to-end contro server finti (bench.standins, in un processo separato):
+Data API /positions, CLOB, relayer e nodo Polygon RPC, ognuno con latenza, 5xx e 429 propri.
+
+Scenari (--scenarios):
+- cycle: check_cash.run_one_cycle completo (balance ∥ posizioni → batch relayer → ledger/RPC),
+  ogni ciclo su un wallet nuovo con --positions posizioni claimabili;
+- order: place_limit_order diretto;
+- order_fallback: place_limit_order con PROXY_URL la cui uscita di default e le prime due uscite
+  per paese ricevono 403 regional (pool proxy nuovo a ogni ordine: caso peggiore);
+- arbitrage: execute_arbitrage (due gambe in parallelo).
+Per scenario: throughput, latenza p50/p99 (più la prima esecuzione, a freddo), richieste ai server
+per operazione, guasti iniettati, memoria allocata (picco per operazione e trattenuta, tracemalloc,
+in un passaggio separato per non falsare i tempi).
+
+--json salva i risultati; --baseline confronta con un file salvato prima: peggioramenti oltre
+--tolerance (default 25%) su p50/p99/throughput/memoria fanno uscire con codice 1.
+Uso: python -m bench.suite [--runs 20] [--positions 400] [--relayer latency=0.2,rps=20]
+     [--clob latency=0.05,jitter=0.02,errors=0.01] [--json out.json] [--baseline base.json]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+from bench.standins import NAMES, StandIns
+
+SCENARIOS = ("cycle", "order", "order_fallback", "arbitrage")
+# Uscite che rispondono 403 regional in order_fallback: default (utente "bench") e i primi due paesi
+REGIONAL_EXITS = ("bench", "bench_cr.ch", "bench_cr.no")
+
+
+def _pct(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def _configure_env(urls: Dict[str, str]) -> None:
+    """Prima di importare i moduli del bot: endpoint finti, quota illimitata, niente file di stato."""
+    os.environ.update({
+        "DATA_API_BASE": urls["data_api"], "RELAYER_URL": urls["relayer"], "RPC_URL": urls["rpc"],
+        "CLOB_HOST": urls["clob"], "PRIVATE_KEY": "0x" + "5a" * 32,
+        "BUILDER_API_KEY": "bench", "BUILDER_SECRET": "YmVuY2g=", "BUILDER_PASSPHRASE": "bench",
+        "RELAYER_MAX_REQUESTS_PER_DAY": str(10 ** 9), "RELAYER_QUOTA_BURST": str(10 ** 9), "RELAYER_QUOTA_STATE": "",
+        "CLAIM_LEDGER_PATH": "", "PROXY_POOL_STATE": "", "CLOB_CREDS_CACHE": "",
+        "POLY_SAFE_ADDRESS": "", "SAFE_ADDRESS": "", "PROXY_URL": "", "PROXY_HOST": "", "METRICS_PORT": "",
+    })
+
+
+def _wallet(i: int) -> str:
+    return "0x" + hashlib.sha256(f"bench-wallet-{i}".encode()).hexdigest()[:40]
+
+
+class _Scenario:
+    def __init__(self, op: Callable[[int], object], units: str = "op", done: Callable[[], None] = lambda: None):
+        self.op = op
+        self.units = units
+        self.done = done
+        self.pauses = 0  # cicli finiti in pausa quota relayer (429 → attesa del reset)
+
+
+def _cycle(urls, standins) -> _Scenario:
+    import check_cash
+    from bench.fake_clob import make_executor
+
+    ex = make_executor(urls["clob"])
+
+    def op(i):
+        if check_cash.run_one_cycle(ex, _wallet(i), True, False, 0):
+            scenario.pauses += 1
+
+    scenario = _Scenario(op, "cicli")
+    return scenario
+
+
+def _order(urls, standins) -> _Scenario:
+    from bench.fake_clob import make_executor
+
+    ex = make_executor(urls["clob"])
+    return _Scenario(lambda i: ex.place_limit_order("81000", "BUY", 10.0, 0.4), "ordini", ex._get_order_signer().close)
+
+
+def _order_fallback(urls, standins) -> _Scenario:
+    import executor
+    from bench.fake_clob import make_executor
+    from http_clients import install_clob_client, registry
+
+    port = urls["clob"].rsplit(":", 1)[1]
+    proxy_url = f"http://bench:x@127.0.0.1:{port}"
+    os.environ["PROXY_URL"] = proxy_url
+    install_clob_client(registry.get("clob", proxy_url))
+    standins.configure("clob", regional=REGIONAL_EXITS)
+    ex = make_executor("http://clob.test")
+
+    def op(i):
+        executor._proxy_pool = None  # pool nuovo: nessuna uscita buona nota, si riparte dal 403
+        if ex.place_limit_order("81001", "BUY", 10.0, 0.4) is None:
+            raise RuntimeError("ordine non piazzato con il fallback per paese")
+
+    def done():
+        os.environ["PROXY_URL"] = ""
+        executor._proxy_pool = None
+        install_clob_client(registry.get("clob"))
+        standins.configure("clob", regional=())
+        ex._get_order_signer().close()
+
+    return _Scenario(op, "ordini", done)
+
+
+def _arbitrage(urls, standins) -> _Scenario:
+    from bench.fake_clob import make_executor
+
+    ex = make_executor(urls["clob"])
+    opp = SimpleNamespace(action="buy_both", yes_token_id="82001", no_token_id="82002", yes_price=0.48, no_price=0.49)
+
+    def op(i):
+        if not ex.execute_arbitrage(opp, 10.0, 10.0):
+            raise RuntimeError("arbitraggio non eseguito")
+
+    return _Scenario(op, "arbitraggi", ex._get_order_signer().close)
+
+
+_SETUP = {"cycle": _cycle, "order": _order, "order_fallback": _order_fallback, "arbitrage": _arbitrage}
+
+
+def _requests(stats: Dict) -> int:
+    total = stats["data_api"]["requests"]
+    for name in ("clob", "relayer", "rpc"):
+        total += sum(stats[name]["requests"].values())
+    return total
+
+
+def _injected(stats: Dict) -> Dict[str, int]:
+    out = {}
+    for name in NAMES:
+        for code, n in stats["faults"][name]["injected"].items():
+            out[f"{name}:{code}"] = n
+    return out
+
+
+def _run(name: str, urls, standins, runs: int, alloc_runs: int) -> Dict:
+    scenario = _SETUP[name](urls, standins)
+    errors = 0
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            scenario.op(0)
+            first = time.perf_counter() - t0
+            before = standins.stats()
+            latencies = []
+            t_start = time.perf_counter()
+            for i in range(1, runs + 1):
+                t0 = time.perf_counter()
+                try:
+                    scenario.op(i)
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+            wall = time.perf_counter() - t_start
+            after = standins.stats()
+
+            # Memoria: passaggio separato (tracemalloc rallenta ogni allocazione)
+            tracemalloc.start()
+            peaks = []
+            start_mem = tracemalloc.get_traced_memory()[0]
+            for i in range(runs + 1, runs + 1 + alloc_runs):
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                try:
+                    scenario.op(i)
+                except Exception:
+                    pass
+                peaks.append(tracemalloc.get_traced_memory()[1] - base)
+            retained = (tracemalloc.get_traced_memory()[0] - start_mem) / max(1, alloc_runs)
+            tracemalloc.stop()
+    finally:
+        scenario.done()
+
+    injected_before = _injected(before)
+    injected = {k: v - injected_before.get(k, 0) for k, v in _injected(after).items() if v - injected_before.get(k, 0)}
+    result = {
+        "runs": runs, "errors": errors, "units": scenario.units,
+        "throughput": runs / wall if wall else 0.0,
+        "first_ms": first * 1000,
+        "p50_ms": _pct(latencies, 50) * 1000, "p99_ms": _pct(latencies, 99) * 1000,
+        "alloc_peak_kib": (sorted(peaks)[len(peaks) // 2] / 1024) if peaks else 0.0,
+        "alloc_retained_kib": retained / 1024,
+        "requests_per_op": (_requests(after) - _requests(before)) / runs,
+        "injected": injected,
+        "pauses": scenario.pauses,
+    }
+    if name == "cycle":
+        result["claims_per_s"] = (after["relayer"]["redeems"] - before["relayer"]["redeems"]) / wall if wall else 0.0
+    if name == "order_fallback":
+        regional = sum(after["clob"]["by_proxy"].get(p, 0) - before["clob"]["by_proxy"].get(p, 0) for p in REGIONAL_EXITS)
+        result["regional_403_per_op"] = regional / runs
+    return result
+
+
+# Metriche confrontate con --baseline: (chiave, True se più alto è meglio)
+_COMPARED = (("throughput", True), ("p50_ms", False), ("p99_ms", False), ("alloc_peak_kib", False))
+
+
+def _regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    out = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key, higher_is_better in _COMPARED:
+            old, new = base.get(key), res.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                out.append(f"{name}.{key}: {old:.2f} → {new:.2f} ({change:+.0%})")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--runs", type=int, default=20, help="esecuzioni misurate per scenario (dopo una a freddo)")
+    ap.add_argument("--alloc-runs", type=int, default=3, help="esecuzioni sotto tracemalloc per scenario")
+    ap.add_argument("--positions", type=int, default=400, help="posizioni claimabili per wallet (cycle)")
+    ap.add_argument("--data-api", default="latency=0.04,jitter=0.02", help="guasti Data API (bench.faults)")
+    ap.add_argument("--clob", default="latency=0.05,jitter=0.02", help="guasti CLOB")
+    ap.add_argument("--relayer", default="latency=0.2,jitter=0.05", help="guasti relayer")
+    ap.add_argument("--rpc", default="latency=0.02", help="guasti nodo RPC")
+    ap.add_argument("--json", help="salva i risultati in questo file")
+    ap.add_argument("--baseline", help="risultati precedenti (--json) da confrontare")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in _SETUP]
+    if unknown:
+        ap.error(f"scenari sconosciuti: {', '.join(unknown)} (validi: {', '.join(SCENARIOS)})")
+
+    faults = {"data_api": args.data_api, "clob": args.clob, "relayer": args.relayer, "rpc": args.rpc}
+    results = {}
+    with StandIns(positions=args.positions, **faults) as standins:
+        _configure_env(standins.urls)
+        print("Server finti: " + ", ".join(f"{n} [{faults[n] or 'nessun guasto'}]" for n in NAMES))
+        print(f"{'scenario':16s} {'op/s':>7s} {'p50 ms':>8s} {'p99 ms':>8s} {'freddo ms':>10s} "
+              f"{'picco KiB':>10s} {'tratt. KiB':>10s} {'rich./op':>8s}  note")
+        for name in scenarios:
+            res = results[name] = _run(name, standins.urls, standins, args.runs, args.alloc_runs)
+            notes = []
+            if "claims_per_s" in res:
+                notes.append(f"{res['claims_per_s']:.0f} claim/s")
+            if "regional_403_per_op" in res:
+                notes.append(f"{res['regional_403_per_op']:.1f} 403 regional/op")
+            if res["pauses"]:
+                notes.append(f"{res['pauses']} in pausa quota relayer")
+            if res["errors"]:
+                notes.append(f"{res['errors']} falliti")
+            if res["injected"]:
+                notes.append("guasti " + ", ".join(f"{k}×{v}" for k, v in sorted(res["injected"].items())))
+            print(f"{name:16s} {res['throughput']:7.2f} {res['p50_ms']:8.1f} {res['p99_ms']:8.1f} {res['first_ms']:10.0f} "
+                  f"{res['alloc_peak_kib']:10.0f} {res['alloc_retained_kib']:10.1f} {res['requests_per_op']:8.1f}  "
+                  + "; ".join(notes), flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Risultati salvati in {args.json}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = _regressions(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"  ⚠️  Regressione {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"Nessuna regressione oltre il {args.tolerance:.0%} rispetto a {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
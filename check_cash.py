@@ -6,6 +6,7 @@ Loop autonomo: controlla cash, cerca claim, esegue claim, aspetta 10 min, ripete
 Uso: python3 check_cash.py
 """
 
+import asyncio
 import os
 import sys
 import time
@@ -15,23 +16,61 @@ from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 
+from cycle import fmt_duration as _fmt_duration
+
 # Force unbuffered output per Render/Replit (vedi log immediatamente)
 sys.stdout.reconfigure(line_buffering=True) if hasattr(sys.stdout, 'reconfigure') else None
 sys.stderr.reconfigure(line_buffering=True) if hasattr(sys.stderr, 'reconfigure') else None
 
-# Rate limit Relayer: quota giornaliera (es. 100 richieste/24h). Per non sforare:
-# intervallo = 24h / max_richieste → es. 86400/100 = 864 s ≈ 14.4 min. Usiamo 15 min per sicurezza.
+# Rate limit Relayer: quota giornaliera (es. 100 richieste/24h, finestra mobile).
+# Gestita da quota.RelayerQuota (token bucket persistito): le richieste si spendono solo quando
+# ci sono claim in attesa, quindi il loop può controllare la Data API (gratuita) più spesso.
 RELAYER_MAX_REQUESTS_PER_DAY = int(os.getenv("RELAYER_MAX_REQUESTS_PER_DAY", "100"))
-SECONDS_PER_DAY = 24 * 3600
-# Secondi tra un ciclo e l'altro: se non impostato, calcolato da quota (100/24h → ~15 min)
-_default_wait = max(600, (SECONDS_PER_DAY + RELAYER_MAX_REQUESTS_PER_DAY - 1) // RELAYER_MAX_REQUESTS_PER_DAY)
-LOOP_WAIT_SECONDS = int(os.getenv("CLAIM_LOOP_WAIT_SECONDS", str(_default_wait)))
+# Richieste spendibili "a raffica" (default: 1/4 della quota giornaliera)
+RELAYER_QUOTA_BURST = int(os.getenv("RELAYER_QUOTA_BURST", "0")) or None
+RELAYER_QUOTA_STATE = os.getenv(
+    "RELAYER_QUOTA_STATE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".relayer_quota.json")
+)
+# Secondi tra un controllo posizioni e l'altro (senza claim in attesa non si consuma quota)
+LOOP_WAIT_SECONDS = int(os.getenv("CLAIM_LOOP_WAIT_SECONDS", "300"))
 # Se 1/true: esegue un solo ciclo e esce (per test)
 RUN_ONCE = os.getenv("RUN_ONCE", "").strip().lower() in ("1", "true", "yes")
-# Flag globale per tracciare se c'è rate limit attivo
-_rate_limit_active = False
-# Timestamp (epoch) quando la quota Relayer si resetta (impostato quando riceviamo 429)
-_rate_limit_reset_at = None
+# Paginazione Data API /positions: posizioni per pagina e pagine scaricate in anticipo (in parallelo)
+POSITIONS_PAGE_SIZE = int(os.getenv("CLAIM_POSITIONS_PAGE_SIZE", "100"))
+POSITIONS_PREFETCH = int(os.getenv("CLAIM_POSITIONS_PREFETCH", "2"))
+# Batch relayer: max claim per richiesta e stima gas (un batch troppo grande supera gas/payload)
+REDEEM_MAX_PER_BATCH = int(os.getenv("CLAIM_MAX_PER_BATCH", "50"))
+REDEEM_GAS_PER_CALL = int(os.getenv("CLAIM_GAS_PER_REDEEM", "150000"))
+REDEEM_MAX_BATCH_GAS = int(os.getenv("CLAIM_MAX_BATCH_GAS", "10000000"))
+# Piano claim per valore (claim_planner): i mercati che valgono di più vanno al relayer per primi.
+# Soglie in USDC sotto cui non si spende quota: per mercato e per richiesta relayer (0 = claim tutto)
+CLAIM_MIN_VALUE = float(os.getenv("CLAIM_MIN_VALUE", "0") or 0)
+CLAIM_MIN_BATCH_VALUE = float(os.getenv("CLAIM_MIN_BATCH_VALUE", "0") or 0)
+# Timeout (s) delle fasi del ciclo: balance CLOB, fetch posizioni, singola richiesta relayer
+TIMEOUT_BALANCE = float(os.getenv("CLAIM_TIMEOUT_BALANCE", "30"))
+TIMEOUT_POSITIONS = float(os.getenv("CLAIM_TIMEOUT_POSITIONS", "120"))
+TIMEOUT_RELAYER = float(os.getenv("CLAIM_TIMEOUT_RELAYER", "180"))
+# Ledger claim: conditionId già inviati (pending) o confermati non vengono rimandati al relayer
+CLAIM_LEDGER_PATH = os.getenv(
+    "CLAIM_LEDGER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".claim_ledger.jsonl")
+)
+CLAIM_LEDGER_PENDING_TTL = float(os.getenv("CLAIM_LEDGER_PENDING_TTL", "3600"))
+CLAIM_LEDGER_CONFIRMED_TTL = float(os.getenv("CLAIM_LEDGER_CONFIRMED_TTL", "86400"))
+# Nodo Polygon per riconciliare i claim pending (receipt); senza, i pending scadono dopo il TTL
+RPC_URL = os.getenv("RPC_URL", "").strip()
+# Eventi CTF on-chain (richiede RPC_URL): ogni quanti secondi leggere i log ConditionResolution
+# tra un controllo Data API e l'altro (0 = disattivato, resta solo il polling Data API)
+EVENTS_POLL_SECONDS = float(os.getenv("CLAIM_EVENTS_POLL_SECONDS", "15"))
+EVENTS_CONFIRMATIONS = int(os.getenv("CLAIM_EVENTS_CONFIRMATIONS", "3"))
+EVENTS_CHECKPOINT = os.getenv(
+    "CLAIM_EVENTS_CHECKPOINT", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".resolution_cursor.json")
+)
+# Avvio rapido: py_clob_client importato in background, ClobClient creato al primo uso (il balance
+# del primo ciclo, in parallelo al fetch posizioni) e niente chiamata di prova get_balance all'avvio
+FAST_START = os.getenv("FAST_START", "").strip().lower() in ("1", "true", "yes")
+# Endpoint Prometheus /metrics (modulo metrics): porta HTTP, vuoto/0 = disattivato
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0") or 0)
+METRICS_ADDR = os.getenv("METRICS_ADDR", "0.0.0.0").strip() or "0.0.0.0"
 
 
 def _get_proxy_url() -> str:
@@ -58,181 +97,279 @@ def _setup_proxy() -> None:
     os.environ["HTTP_PROXY"] = proxy_url
     os.environ["HTTPS_PROXY"] = proxy_url
     os.environ["ALL_PROXY"] = proxy_url
-    import httpx
-    import py_clob_client.http_helpers.helpers as _h
-    _h._http_client = httpx.Client(http2=True, proxy=proxy_url, timeout=30.0)
+    from http_clients import install_clob_client, registry
+    install_clob_client(registry.get("clob", proxy_url))
+
+
+_quota = None
+
+
+def _get_quota():
+    """Quota Relayer condivisa tra i cicli (stato su RELAYER_QUOTA_STATE)."""
+    global _quota
+    if _quota is None:
+        from quota import RelayerQuota
+        _quota = RelayerQuota(RELAYER_MAX_REQUESTS_PER_DAY, burst=RELAYER_QUOTA_BURST, path=RELAYER_QUOTA_STATE)
+        from metrics import RELAYER_QUOTA
+        RELAYER_QUOTA.set_function(_quota.available, builder="default")
+    return _quota
+
+
+_ledger = None
+
+
+def _get_ledger():
+    """Ledger claim condiviso tra i cicli (file CLAIM_LEDGER_PATH)."""
+    global _ledger
+    if _ledger is None:
+        from ledger import ClaimLedger
+        _ledger = ClaimLedger(
+            CLAIM_LEDGER_PATH or None,
+            pending_ttl=CLAIM_LEDGER_PENDING_TTL,
+            confirmed_ttl=CLAIM_LEDGER_CONFIRMED_TTL,
+        )
+    return _ledger
+
+
+def _get_claim_state():
+    """Sorgente on-chain per la riconciliazione del ledger (None se RPC_URL non è impostato)."""
+    if not RPC_URL:
+        return None
+    from ledger import JsonRpcClaimState
+    return JsonRpcClaimState(RPC_URL)
 
 
-def run_one_cycle(ex, poly_safe: str, proxy_url: str, try_relayer: bool, try_clob_sell: bool, signature_type: int = 0) -> int:
+def _make_cycle(ex, poly_safe: str, try_relayer: bool, try_clob_sell: bool, signature_type: int = 0):
+    from cycle import ClaimCycle
+    return ClaimCycle(
+        ex,
+        poly_safe,
+        try_relayer,
+        try_clob_sell,
+        signature_type,
+        quota=_get_quota(),
+        ledger=_get_ledger(),
+        claim_state=_get_claim_state(),
+        page_size=POSITIONS_PAGE_SIZE,
+        prefetch=POSITIONS_PREFETCH,
+        max_per_batch=REDEEM_MAX_PER_BATCH,
+        gas_per_redeem=REDEEM_GAS_PER_CALL,
+        max_batch_gas=REDEEM_MAX_BATCH_GAS,
+        min_value=CLAIM_MIN_VALUE,
+        min_batch_value=CLAIM_MIN_BATCH_VALUE,
+        balance_timeout=TIMEOUT_BALANCE,
+        positions_timeout=TIMEOUT_POSITIONS,
+        relayer_timeout=TIMEOUT_RELAYER,
+    )
+
+
+def run_one_cycle(ex, poly_safe: str, try_relayer: bool, try_clob_sell: bool, signature_type: int = 0) -> int:
     """Un singolo ciclo: balance, fetch claim, esegui claim (relayer o CLOB).
+    Wrapper sincrono di cycle.ClaimCycle.run_cycle. Ogni chiamata crea un ClaimCycle nuovo e lo
+    chiude alla fine: il daemon Node riparte a freddo a ogni ciclo e lo snapshot delle posizioni
+    non sopravvive (ogni ciclo rielabora tutto). Per un loop usare main(), che tiene un solo ciclo
+    e il daemon caldo. Il proxy è quello già installato sui client HTTP (_setup_proxy).
     Returns: seconds to wait before next cycle (0 = use default LOOP_WAIT_SECONDS).
     """
-    print(f"  [cycle] Balance e claim...", flush=True)
-    from claims import (
-        fetch_redeemable_positions,
-        get_unique_condition_ids,
-        build_redeem_tx,
-        execute_redeem_via_relayer,
-        try_claim_via_clob_sell,
+    async def _once():
+        cycle = _make_cycle(ex, poly_safe, try_relayer, try_clob_sell, signature_type)
+        try:
+            return await cycle.run_cycle()
+        finally:
+            await cycle.aclose()
+
+    return asyncio.run(_once())
+
+
+def _print_http_stats() -> None:
+    """Riuso connessioni dei client HTTP condivisi (handshake risparmiati) e retry/circuiti per destinazione."""
+    from http_clients import format_stats, registry
+    line = format_stats(registry.stats())
+    if line:
+        print(f"  🔌 HTTP: {line}", flush=True)
+    import retries
+    line = retries.format_stats(retries.engine.stats())
+    if line:
+        print(f"  🔁 Retry: {line}", flush=True)
+
+
+def _make_watcher(poly_safe: str):
+    """Watcher eventi CTF (None se RPC_URL manca o CLAIM_EVENTS_POLL_SECONDS=0)."""
+    if not RPC_URL or EVENTS_POLL_SECONDS <= 0:
+        return None
+    from resolutions import ResolutionWatcher
+    return ResolutionWatcher(
+        RPC_URL,
+        owner=poly_safe,
+        checkpoint_path=EVENTS_CHECKPOINT or None,
+        confirmations=EVENTS_CONFIRMATIONS,
     )
 
-    balance = ex.get_balance()
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Cash: {balance:.2f} USDC", flush=True)
-
-    # Per i claim NON serve proxy: Relayer e Data API sono accessibili direttamente
-    positions = fetch_redeemable_positions(poly_safe, proxy_url=None)
-    if not positions:
-        print("  Claim disponibili: 0", flush=True)
-        return 0
-
-    condition_ids = get_unique_condition_ids(positions)
-    print(f"  Claim disponibili: {len(condition_ids)} mercato/i — {len(positions)} posizioni")
-    for pos in positions[:15]:
-        title = (pos.get("title") or pos.get("slug") or "—")[:55]
-        size = pos.get("size") or pos.get("currentValue") or 0
-        print(f"    • {title}: {size:.2f} share")
-    if len(positions) > 15:
-        print(f"    ... e altre {len(positions) - 15}")
-    
-    # Batch execution: tutte le transazioni in un'unica chiamata al relayer
-    # Non serve più limitare perché facciamo 1 chiamata invece di N
-    # Il relayer supporta batch fino a molte transazioni insieme
-
-    # 1) Tenta claim via Relayer (richiede Builder API + Safe wallet)
-    claimed_relayer = 0
-    ok_count = 0
-    builder_key = (os.getenv("BUILDER_API_KEY") or os.getenv("BUILDER_KEY") or "").strip()
-    builder_secret = (os.getenv("BUILDER_SECRET") or os.getenv("BUILDER_API_SECRET") or "").strip()
-    builder_pp = (os.getenv("BUILDER_PASSPHRASE") or os.getenv("BUILDER_PASS_PHRASE") or "").strip()
-    pk = (os.getenv("PRIVATE_KEY") or "").strip()
-    if pk and not pk.startswith("0x"):
-        pk = "0x" + pk
-
-    if try_relayer and builder_key and builder_secret and builder_pp and pk:
-        # Account Magic (Proxy): il Relayer Python non supporta Proxy → usa script Node con PROXY
-        if signature_type == 1:
-            import subprocess
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            node_script = os.path.join(script_dir, "claim-proxy", "claim-proxy.mjs")
-            if os.path.isfile(node_script):
-                print("  Tentativo claim via Relayer PROXY (Node)...")
-                try:
-                    # Node va al relayer/RPC SENZA proxy: Relayer e RPC sono accessibili direttamente
-                    # Il proxy serve solo per CLOB API (balance/trading), non per claim
-                    node_env = {k: v for k, v in os.environ.items() if k not in ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "http_proxy", "https_proxy", "all_proxy")}
-                    r = subprocess.run(
-                        ["node", node_script] + condition_ids,
-                        cwd=script_dir,
-                        env=node_env,
-                        capture_output=True,
-                        text=True,
-                        timeout=120,
-                    )
-                    # Mostra sempre stdout e stderr per debug
-                    output = (r.stdout or "") + "\n" + (r.stderr or "")
-                    if r.returncode == 0:
-                        # Batch execution: un'unica transazione per tutti i claim
-                        claimed_relayer = len(condition_ids)
-                        # Se il batch è riuscito, resetta il flag rate limit
-                        global _rate_limit_active
-                        if claimed_relayer > 0:
-                            _rate_limit_active = False
-                            print(f"  ✓ Batch claim riusciti: {claimed_relayer} mercati", flush=True)
-                        if r.stdout:
-                            for line in r.stdout.strip().split("\n"):
-                                if line.strip():
-                                    print(f"  {line}")
-                    else:
-                        # Controlla se è rate limit 429
-                        if "429" in output or "quota exceeded" in output.lower() or "RATE_LIMIT_429" in output:
-                            reset_match = None
-                            for line in output.split("\n"):
-                                if "RATE_LIMIT_RESET_SECONDS:" in line:
-                                    try:
-                                        reset_sec = int(line.split(":")[-1].strip())
-                                        reset_match = reset_sec
-                                    except:
-                                        pass
-                            if reset_match and reset_match > 0:
-                                global _rate_limit_reset_at
-                                _rate_limit_reset_at = time.time() + reset_match
-                                reset_hours = reset_match // 3600
-                                reset_mins = (reset_match % 3600) // 60
-                                print(f"  ⚠️  Rate limit Relayer: quota esaurita. Reset tra ~{reset_hours}h {reset_mins}m", flush=True)
-                                print(f"  ℹ️  Prossimo tentativo tra 10 minuti (nessuna attesa lunga).", flush=True)
-                                global _rate_limit_active
-                                _rate_limit_active = True
-                                return 0  # Sempre 10 minuti, mai 3h
-                            else:
-                                print(f"  ⚠️  Rate limit Relayer. Prossimo tentativo tra 10 minuti.", flush=True)
-                                global _rate_limit_active
-                                _rate_limit_active = True
-                                return 0  # Sempre 10 minuti
-                        else:
-                            # Errore diverso dal rate limit: mostra TUTTI i dettagli
-                            print(f"  ⚠️  Errore claim Node (codice {r.returncode}):")
-                            # Mostra tutto stdout e stderr
-                            all_output = (r.stdout or "") + "\n" + (r.stderr or "")
-                            for line in all_output.strip().split("\n"):
-                                if line.strip():
-                                    # Filtra solo righe informative (non stack trace completo se troppo lungo)
-                                    if len(line) < 300 or "Claim errore" in line or "RATE_LIMIT" in line or "error" in line.lower():
-                                        print(f"    {line[:200]}")
-                            # Non fare fallback Python per Magic (modulo non installato su Replit/Render)
-                except FileNotFoundError:
-                    print("  Node non trovato. Installa Node.js e in claim-proxy/ esegui: npm install")
-                except subprocess.TimeoutExpired:
-                    print("  Timeout claim Node.")
-                except Exception as e:
-                    print(f"  Errore claim Node: {e}")
-            else:
-                print("  Script claim-proxy/claim-proxy.mjs non trovato. Per account Magic: cd claim-proxy && npm install")
-        else:
-            # Safe wallet: usa Relayer Python (batch execution)
-            print("  Tentativo batch claim via Relayer (Python)...")
-            txs = [build_redeem_tx(cid) for cid in condition_ids]
-            results = execute_redeem_via_relayer(txs, pk, builder_key, builder_secret, builder_pp)
-            # Batch execution: un unico risultato per tutte le transazioni
-            if results and len(results) > 0:
-                result = results[0]
-                if result.get("error"):
-                    print(f"  Relayer: {result['error'][:150]}", flush=True)
-                elif result.get("transactionHash"):
-                    count = result.get("count", len(condition_ids))
-                    claimed_relayer = count
-                    print(f"  ✓ Batch claim (relayer): {count} mercati, tx: {result['transactionHash']}", flush=True)
-                    # Resetta flag rate limit se riuscito
-                    global _rate_limit_active
-                    _rate_limit_active = False
+
+async def _refresh_held(cycle) -> None:
+    try:
+        n = await cycle.refresh_held()
+        print(f"  Eventi on-chain: {n} mercati posseduti sotto osservazione", flush=True)
+    except Exception as e:
+        print(f"  ⚠️  Posizioni possedute non aggiornate: {e}", flush=True)
+
+
+async def _wait_with_events(cycle, watcher, wait_seconds: float) -> None:
+    """
+    Attesa fino al prossimo controllo Data API. Con il watcher attivo, ogni EVENTS_POLL_SECONDS
+    si leggono i nuovi log CTF e i mercati appena risolti (outcome posseduto vincente) si claimano subito.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait_seconds
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        if watcher is None:
+            await asyncio.sleep(remaining)
+            continue
+        await asyncio.sleep(min(remaining, EVENTS_POLL_SECONDS))
+        try:
+            from resolutions import match_claimable
+            batch = await watcher.poll()
+            cycle.on_redemptions(batch.redemptions)
+            condition_ids = match_claimable(batch.resolutions, cycle.held)
+            if condition_ids:
+                await cycle.claim_resolved(condition_ids)
+        except Exception as e:
+            print(f"  ⚠️  Eventi on-chain: {e}", flush=True)
+
+
+async def _run_loop(ex, poly_safe: str, try_relayer: bool, try_clob_sell: bool, signature_type: int) -> None:
+    """Loop principale su un'unica event loop: client HTTP e daemon Node restano aperti tra i cicli."""
+    cycle = _make_cycle(ex, poly_safe, try_relayer, try_clob_sell, signature_type)
+    watcher = _make_watcher(poly_safe)
+    cycle_count = 0
+    try:
+        while True:
+            cycle_count += 1
+            try:
+                print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] === CICLO #{cycle_count} ===", flush=True)
+                # Mostra quanto manca al reset del rate limit (se abbiamo ricevuto un 429 in precedenza)
+                blocked = _get_quota().blocked_seconds
+                if blocked > 0:
+                    print(f"  ⏱️  Rate limit: nuovo reset tra {_fmt_duration(blocked)}", flush=True)
+                if watcher is not None:
+                    # Posizioni possedute aggiornate insieme al ciclo: servono per filtrare gli eventi
+                    wait_seconds, _ = await asyncio.gather(cycle.run_cycle(), _refresh_held(cycle))
+                else:
+                    wait_seconds = await cycle.run_cycle()
+                if wait_seconds <= 0:
+                    wait_seconds = LOOP_WAIT_SECONDS
+            except Exception as e:
+                import traceback
+                print(f"  ❌ Errore ciclo: {e}", flush=True)
+                print(f"  Traceback: {traceback.format_exc()}", flush=True)
+                wait_seconds = LOOP_WAIT_SECONDS
+            _print_http_stats()
+            if RUN_ONCE:
+                print("  RUN_ONCE=1: un solo ciclo, exit.", flush=True)
+                break
+            wait_mins = wait_seconds // 60
+            # Log sempre visibile: cosa aspettiamo e per quanto
+            if wait_mins >= 60:
+                wait_hours = wait_mins // 60
+                wait_mins_remainder = wait_mins % 60
+                print(f"  ⏳ Prossimo controllo tra {wait_hours}h {wait_mins_remainder}m ({wait_seconds}s)", flush=True)
             else:
-                print("  Relayer: nessun risultato", flush=True)
-    elif try_relayer and not (builder_key and builder_secret and builder_pp):
-        print("  Claim non eseguiti: mancano BUILDER_API_KEY, BUILDER_SECRET, BUILDER_PASSPHRASE in .env")
-
-    # 2) Fallback: claim via CLOB SELL (solo se abilitato; di solito non funziona per mercati già risolti)
-    if try_clob_sell and positions:
-        sell_results = try_claim_via_clob_sell(positions, ex)
-        ok_count = sum(1 for r in sell_results if r.get("ok"))
-        if ok_count:
-            for r in sell_results:
-                if r.get("ok"):
-                    print(f"  Claim OK (CLOB): {r.get('title', '—')}")
-
-    # Se ci sono ancora claim non eseguiti, avvisa
-    if positions and claimed_relayer == 0 and not (try_clob_sell and ok_count > 0):
-        print("  → Fai claim manuale su polymarket.com → Portfolio → clicca Claim sui mercati risolti.")
-    
-    return 0  # Usa il wait time di default
+                print(f"  ⏳ Prossimo controllo tra {wait_mins} minuti ({wait_seconds}s)", flush=True)
+            print("-" * 60, flush=True)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            await _wait_with_events(cycle, watcher, wait_seconds)
+    finally:
+        await cycle.aclose()
+
+
+def main_multi(wallets_file: str) -> None:
+    """Loop multi-wallet (CLAIM_WALLETS_FILE): un processo, un pool HTTP e un daemon Node per tutti i wallet."""
+    from multi_wallet import MultiWalletEngine, load_wallets_config
+
+    try:
+        builders, wallets = load_wallets_config(wallets_file)
+    except (OSError, ValueError) as e:
+        print(f"❌ ERRORE: config multi-wallet {wallets_file}: {e}", file=sys.stderr, flush=True)
+        sys.exit(1)
+    engine = MultiWalletEngine(
+        builders,
+        wallets,
+        quota_state=RELAYER_QUOTA_STATE,
+        ledger=_get_ledger(),
+        claim_state=_get_claim_state(),
+        max_concurrency=int(os.getenv("CLAIM_WALLETS_CONCURRENCY", "16")),
+        page_size=POSITIONS_PAGE_SIZE,
+        max_per_batch=REDEEM_MAX_PER_BATCH,
+        gas_per_redeem=REDEEM_GAS_PER_CALL,
+        max_batch_gas=REDEEM_MAX_BATCH_GAS,
+        min_value=CLAIM_MIN_VALUE,
+        min_batch_value=CLAIM_MIN_BATCH_VALUE,
+    )
+    print("=" * 60, flush=True)
+    print(f"--- CLAIMBOT multi-wallet: {len(wallets)} wallet, {len(builders)} builder ---", flush=True)
+    print(f"  Data/Ora avvio: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", flush=True)
+    print("=" * 60, flush=True)
+
+    cycle_count = 0
+    try:
+        while True:
+            cycle_count += 1
+            print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] === CICLO #{cycle_count} ===", flush=True)
+            try:
+                wait_seconds = engine.run_cycle() or LOOP_WAIT_SECONDS
+            except Exception as e:
+                import traceback
+                print(f"  ❌ Errore ciclo: {e}", flush=True)
+                print(f"  Traceback: {traceback.format_exc()}", flush=True)
+                wait_seconds = LOOP_WAIT_SECONDS
+            _print_http_stats()
+            if RUN_ONCE:
+                print("  RUN_ONCE=1: un solo ciclo, exit.", flush=True)
+                break
+            print(f"  ⏳ Prossimo controllo tra {_fmt_duration(wait_seconds)} ({wait_seconds}s)", flush=True)
+            print("-" * 60, flush=True)
+            time.sleep(wait_seconds)
+    except KeyboardInterrupt:
+        print("\nInterrotto.", flush=True)
+    finally:
+        engine.close()
+
+
+def _start_metrics() -> None:
+    if not METRICS_PORT:
+        return
+    from metrics import start_http_server
+    try:
+        start_http_server(METRICS_PORT, METRICS_ADDR)
+    except OSError as e:
+        print(f"  ⚠️  Endpoint metriche non avviato ({METRICS_ADDR}:{METRICS_PORT}): {e}", flush=True)
+        return
+    print(f"✓ Metriche Prometheus su http://{METRICS_ADDR}:{METRICS_PORT}/metrics", flush=True)
 
 
 def main():
     print("🚀 Avvio CLAIMBOT...", flush=True)
+    _start_metrics()
+
+    # Multi-wallet: un file di configurazione con molti account al posto di PRIVATE_KEY/POLY_SAFE_ADDRESS
+    wallets_file = os.getenv("CLAIM_WALLETS_FILE", "").strip()
+    if wallets_file:
+        main_multi(wallets_file)
+        return
     
     if not os.getenv("PRIVATE_KEY"):
         print("ERRORE: PRIVATE_KEY mancante in .env", file=sys.stderr)
         sys.exit(1)
     
     print("✓ PRIVATE_KEY trovato", flush=True)
+    if FAST_START:
+        import threading
+        from http_clients import preload_clob_client
+        threading.Thread(target=preload_clob_client, name="preload-clob", daemon=True).start()
     _setup_proxy()
     print("✓ Proxy configurato (solo per CLOB)", flush=True)
 
@@ -255,11 +392,16 @@ def main():
             api_passphrase=api_passphrase or "",
             private_key=private_key,
             signature_type=signature_type,
+            lazy_client=FAST_START,
         )
-        print("✓ OrderExecutor creato, test connessione...", flush=True)
-        # warm-up
-        balance = ex.get_balance()
-        print(f"✓ Connessione OK! Balance iniziale: {balance:.2f} USDC", flush=True)
+        if FAST_START:
+            # Il primo ciclo legge comunque il balance: lì si vedono eventuali errori di connessione
+            print("✓ OrderExecutor creato (avvio rapido: client CLOB al primo uso)", flush=True)
+        else:
+            print("✓ OrderExecutor creato, test connessione...", flush=True)
+            # warm-up
+            balance = ex.get_balance()
+            print(f"✓ Connessione OK! Balance iniziale: {balance:.2f} USDC", flush=True)
     except Exception as e:
         import traceback
         print(f"❌ Errore init: {e}", file=sys.stderr, flush=True)
@@ -270,12 +412,10 @@ def main():
     poly_safe = (os.getenv("POLY_SAFE_ADDRESS") or os.getenv("SAFE_ADDRESS") or "").strip()
     if not poly_safe:
         try:
-            from web3 import Web3
+            from addresses import address_from_private_key
             pk = (os.getenv("PRIVATE_KEY") or "").strip()
-            if pk and not pk.startswith("0x"):
-                pk = "0x" + pk
             if pk:
-                poly_safe = Web3().eth.account.from_key(pk).address
+                poly_safe = address_from_private_key(pk)
                 print(f"✓ Indirizzo derivato da PRIVATE_KEY: {poly_safe[:10]}...{poly_safe[-8:]}", flush=True)
         except Exception as e:
             print(f"⚠️  Errore derivazione indirizzo: {e}", flush=True)
@@ -285,16 +425,15 @@ def main():
     else:
         print(f"✓ Indirizzo wallet: {poly_safe[:10]}...{poly_safe[-8:]}", flush=True)
 
-    proxy_url = _get_proxy_url() or None
     try_relayer = os.getenv("CLAIM_USE_RELAYER", "1").strip().lower() in ("1", "true", "yes")
     # CLOB SELL non funziona per posizioni redeemable (mercato risolto = orderbook chiuso)
     try_clob_sell = os.getenv("CLAIM_USE_CLOB_SELL", "0").strip().lower() in ("1", "true", "yes")
 
     wait_min = LOOP_WAIT_SECONDS // 60
+    quota = _get_quota()
     print("=" * 60, flush=True)
     print("--- CLAIMBOT loop (controlla → claim → aspetta {} min) ---".format(wait_min), flush=True)
-    print(f"  Rate limit: max {RELAYER_MAX_REQUESTS_PER_DAY} richieste/24h → 1 ciclo ogni {wait_min} min (per non sforare quota)", flush=True)
-    print(f"  (All'inizio di ogni ciclo: se in attesa di reset quota, vedrai «quanto manca al nuovo rate limit»)", flush=True)
+    print(f"  Rate limit: max {RELAYER_MAX_REQUESTS_PER_DAY} richieste/24h (usate: {quota.used()}, burst {quota.burst}) → quota spesa solo con claim in attesa", flush=True)
     print(f"  Data/Ora avvio: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", flush=True)
     print(f"  Relayer: {'sì' if try_relayer else 'no'}", flush=True)
     print(f"  CLOB SELL: {'sì' if try_clob_sell else 'no'}", flush=True)
@@ -302,48 +441,10 @@ def main():
     print("=" * 60, flush=True)
     print()
 
-    cycle_count = 0
-    while True:
-        cycle_count += 1
-        try:
-            print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] === CICLO #{cycle_count} ===", flush=True)
-            # Mostra quanto manca al reset del rate limit (se abbiamo ricevuto un 429 in precedenza)
-            global _rate_limit_reset_at
-            if _rate_limit_reset_at is not None:
-                remaining = _rate_limit_reset_at - time.time()
-                if remaining > 0:
-                    h, r = divmod(int(remaining), 3600)
-                    m = r // 60
-                    print(f"  ⏱️  Rate limit: nuovo reset tra {h}h {m}m", flush=True)
-                else:
-                    _rate_limit_reset_at = None
-                    print(f"  ⏱️  Rate limit: quota dovrebbe essere resettata ora.", flush=True)
-            wait_seconds = run_one_cycle(ex, poly_safe, proxy_url, try_relayer, try_clob_sell, signature_type)
-            if wait_seconds <= 0:
-                wait_seconds = LOOP_WAIT_SECONDS
-        except KeyboardInterrupt:
-            print("\nInterrotto.", flush=True)
-            break
-        except Exception as e:
-            import traceback
-            print(f"  ❌ Errore ciclo: {e}", flush=True)
-            print(f"  Traceback: {traceback.format_exc()}", flush=True)
-            wait_seconds = LOOP_WAIT_SECONDS
-        if RUN_ONCE:
-            print("  RUN_ONCE=1: un solo ciclo, exit.", flush=True)
-            break
-        wait_mins = wait_seconds // 60
-        # Log sempre visibile: cosa aspettiamo e per quanto
-        if wait_mins >= 60:
-            wait_hours = wait_mins // 60
-            wait_mins_remainder = wait_mins % 60
-            print(f"  ⏳ Prossimo controllo tra {wait_hours}h {wait_mins_remainder}m ({wait_seconds}s)", flush=True)
-        else:
-            print(f"  ⏳ Prossimo controllo tra {wait_mins} minuti ({wait_seconds}s)", flush=True)
-        print("-" * 60, flush=True)
-        sys.stdout.flush()
-        sys.stderr.flush()
-        time.sleep(wait_seconds)
+    try:
+        asyncio.run(_run_loop(ex, poly_safe, try_relayer, try_clob_sell, signature_type))
+    except KeyboardInterrupt:
+        print("\nInterrotto.", flush=True)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 /**
  * Claim (redeem) posizioni Polymarket via Relayer con tipo PROXY (account Magic/email).
  * Uso: node claim-proxy.mjs [conditionId1] [conditionId2] ...
+ *      node claim-proxy.mjs --serve   (daemon: richieste/risposte JSON una per riga su stdin/stdout)
  * Legge .env dalla cartella padre (CLAIMBOT).
  */
 
@@ -34,25 +35,17 @@ const ctfRedeemAbi = [
   },
 ];
 
-async function main() {
-  const conditionIds = process.argv.slice(2).filter((c) => c && c.trim());
-  if (conditionIds.length === 0) {
-    console.error("Uso: node claim-proxy.mjs <conditionId1> [conditionId2] ...");
-    process.exit(1);
-  }
-
+function loadCreds() {
   const pk = (process.env.PRIVATE_KEY || "").trim();
   const key = (process.env.BUILDER_API_KEY || process.env.BUILDER_KEY || "").trim();
   const secret = (process.env.BUILDER_SECRET || "").trim();
   const passphrase = (process.env.BUILDER_PASSPHRASE || process.env.BUILDER_PASS_PHRASE || "").trim();
+  if (!pk || !key || !secret || !passphrase) return null;
+  return { privateKey: pk.startsWith("0x") ? pk : "0x" + pk, key, secret, passphrase };
+}
 
-  if (!pk || !key || !secret || !passphrase) {
-    console.error("Imposta in .env: PRIVATE_KEY, BUILDER_API_KEY, BUILDER_SECRET, BUILDER_PASSPHRASE");
-    process.exit(1);
-  }
-
-  const privateKey = pk.startsWith("0x") ? pk : "0x" + pk;
-
+// Import dinamici + RelayClient: in modalità --serve si pagano una sola volta
+async function createRelayer({ privateKey, key, secret, passphrase }) {
   const { createWalletClient, http, encodeFunctionData, zeroHash } = await import("viem");
   const { privateKeyToAccount } = await import("viem/accounts");
   const { polygon } = await import("viem/chains");
@@ -70,7 +63,10 @@ async function main() {
   const client = new RelayClient(RELAYER_URL, CHAIN_ID, wallet, builderConfig, RelayerTxType.PROXY);
 
   function createRedeemTx(conditionId) {
-    const cid = conditionId.startsWith("0x") ? conditionId : "0x" + conditionId;
+    // Stessa normalizzazione di claims._normalize_condition_id: 64 hex minuscoli (padding/troncamento)
+    const hex = String(conditionId).trim().replace(/^0x/, "").toLowerCase();
+    const cid = "0x" + hex.padStart(64, "0").slice(0, 64);
+    if (!/^0x[0-9a-f]{64}$/.test(cid)) throw new Error(`conditionId non valido: ${String(conditionId).substring(0, 80)}`);
     const data = encodeFunctionData({
       abi: ctfRedeemAbi,
       functionName: "redeemPositions",
@@ -79,59 +75,175 @@ async function main() {
     return { to: CTF_ADDRESS, data, value: "0" };
   }
 
-  // Crea TUTTE le transazioni per batch execution (una sola chiamata al relayer)
-  const allTxs = conditionIds.map(cid => createRedeemTx(cid));
-  console.log(`Batch: ${allTxs.length} claim in un'unica transazione`);
-  
+  return { client, createRedeemTx };
+}
+
+function describeError(e) {
+  // Estrai messaggio errore completo
+  let errMsg = e.message || String(e);
+  let errData = "";
+  if (e.data) {
+    try {
+      errData = typeof e.data === "string" ? e.data : JSON.stringify(e.data);
+    } catch {}
+  }
+  if (e.response?.data) {
+    try {
+      errData = typeof e.response.data === "string" ? e.response.data : JSON.stringify(e.response.data);
+    } catch {}
+  }
+  // Cattura anche error object completo
+  let errObj = "";
+  try {
+    errObj = JSON.stringify(e, Object.getOwnPropertyNames(e)).substring(0, 300);
+  } catch {}
+  return errMsg + (errData ? " | data: " + errData : "") + (errObj ? " | obj: " + errObj : "");
+}
+
+/**
+ * Redeem di tutti i conditionId in un unico batch.
+ * Ritorna { ok, count, transactionHash } oppure { ok: false, error, rateLimited, resetSeconds }.
+ */
+async function redeem(relayer, conditionIds) {
   try {
+    // Dentro il try: un conditionId non valido diventa un errore del batch, non un crash del daemon
+    const allTxs = conditionIds.map((cid) => relayer.createRedeemTx(cid));
     // Esegui TUTTE le transazioni in un'unico batch (una sola chiamata al relayer)
-    const response = await client.execute(allTxs, `Redeem ${allTxs.length} positions`);
+    const response = await relayer.client.execute(allTxs, `Redeem ${allTxs.length} positions`);
     const result = await response.wait();
-    
     if (result?.transactionHash) {
-      console.log(`✓ Batch claim OK: ${allTxs.length} mercati, tx: ${result.transactionHash}`);
-      console.log("Fatto:", allTxs.length, "/", conditionIds.length);
-      process.exit(0);
-    } else {
-      console.error("Batch claim fallito: nessun transactionHash");
-      process.exit(1);
+      return { ok: true, count: allTxs.length, transactionHash: result.transactionHash };
     }
+    return { ok: false, count: 0, error: "nessun transactionHash" };
   } catch (e) {
-    // Estrai messaggio errore completo
-    let errMsg = e.message || String(e);
-    let errData = "";
-    if (e.data) {
-      try {
-        errData = typeof e.data === "string" ? e.data : JSON.stringify(e.data);
-      } catch {}
-    }
-    if (e.response?.data) {
-      try {
-        errData = typeof e.response.data === "string" ? e.response.data : JSON.stringify(e.response.data);
-      } catch {}
-    }
-    // Cattura anche error object completo
-    let errObj = "";
-    try {
-      errObj = JSON.stringify(e, Object.getOwnPropertyNames(e)).substring(0, 300);
-    } catch {}
-    
-    const fullErr = errMsg + (errData ? " | data: " + errData : "") + (errObj ? " | obj: " + errObj : "");
-    
+    const fullErr = describeError(e);
     // Rate limit 429: quota exceeded
     if (fullErr.includes("429") || fullErr.includes("quota exceeded") || fullErr.includes("Too Many Requests")) {
       const resetMatch = fullErr.match(/resets in (\d+) seconds/);
-      const resetSeconds = resetMatch ? parseInt(resetMatch[1], 10) : 0;
-      console.log("RATE_LIMIT_429:", resetSeconds || "unknown");
-      console.log("RATE_LIMIT_RESET_SECONDS:", resetSeconds);
+      return {
+        ok: false,
+        count: 0,
+        rateLimited: true,
+        resetSeconds: resetMatch ? parseInt(resetMatch[1], 10) : null,
+        error: fullErr.substring(0, 500),
+      };
+    }
+    return { ok: false, count: 0, error: fullErr.substring(0, 500) };
+  }
+}
+
+/**
+ * Modalità daemon (--serve): una richiesta JSON per riga su stdin
+ *   {"id": 1, "conditionIds": ["0x...", ...]}
+ *   {"id": 2, "conditionIds": [...], "creds": {"privateKey", "key", "secret", "passphrase"}}
+ * una risposta JSON per riga su stdout (stesso id). I log vanno su stderr.
+ * Senza "creds" si usano quelle del .env. Un RelayClient per wallet, creato alla prima richiesta
+ * e riusato (multi-wallet: un solo processo Node per tutti gli account).
+ * Prima riga: {"ready": true} quando il daemon è pronto, oppure {"ready": false, "error": ...}.
+ */
+async function serve() {
+  const defaultCreds = loadCreds();
+  const relayers = new Map();
+
+  async function relayerFor(reqCreds) {
+    let creds = defaultCreds;
+    if (reqCreds) {
+      const pk = String(reqCreds.privateKey || "").trim();
+      creds = { ...reqCreds, privateKey: pk.startsWith("0x") ? pk : "0x" + pk };
+    }
+    if (!creds || !creds.privateKey || !creds.key || !creds.secret || !creds.passphrase) {
+      throw new Error("credenziali mancanti");
+    }
+    const cacheKey = `${creds.privateKey}|${creds.key}`;
+    if (!relayers.has(cacheKey)) relayers.set(cacheKey, await createRelayer(creds));
+    return relayers.get(cacheKey);
+  }
+
+  if (defaultCreds) {
+    try {
+      await relayerFor(null);
+    } catch (e) {
+      process.stdout.write(JSON.stringify({ ready: false, error: describeError(e).substring(0, 500) }) + "\n");
       process.exit(1);
     }
-    
-    // Mostra errore completo
-    console.log("Batch claim errore:", fullErr.substring(0, 500));
-    console.error("Batch claim errore:", fullErr.substring(0, 500));
+  }
+  process.stdout.write(JSON.stringify({ ready: true, pid: process.pid }) + "\n");
+
+  const { createInterface } = await import("readline");
+  const rl = createInterface({ input: process.stdin, crlfDelay: Infinity });
+  // Richieste servite in sequenza: il relayer non gradisce batch concorrenti dallo stesso wallet
+  for await (const line of rl) {
+    if (!line.trim()) continue;
+    let req;
+    try {
+      req = JSON.parse(line);
+    } catch {
+      process.stdout.write(JSON.stringify({ id: null, ok: false, count: 0, error: "JSON non valido" }) + "\n");
+      continue;
+    }
+    let res;
+    // Ogni richiesta ha sempre una risposta: un'eccezione qui ucciderebbe il daemon e Python
+    // lo riavvierebbe al ciclo dopo con la stessa richiesta
+    try {
+      const ids = (req.conditionIds || []).filter((c) => c && String(c).trim());
+      if (ids.length === 0) {
+        res = { ok: true, count: 0 };
+      } else {
+        let relayer = null;
+        try {
+          relayer = await relayerFor(req.creds);
+        } catch (e) {
+          res = { ok: false, count: 0, fatal: true, error: describeError(e).substring(0, 500) };
+        }
+        if (relayer) {
+          console.error(`Batch: ${ids.length} claim in un'unica transazione`);
+          res = await redeem(relayer, ids);
+        }
+      }
+    } catch (e) {
+      res = { ok: false, count: 0, error: describeError(e).substring(0, 500) };
+    }
+    process.stdout.write(JSON.stringify({ id: req?.id ?? null, ...res }) + "\n");
+  }
+  process.exit(0);
+}
+
+async function main() {
+  if (process.argv.includes("--serve")) {
+    return serve();
+  }
+  const conditionIds = process.argv.slice(2).filter((c) => c && c.trim());
+  if (conditionIds.length === 0) {
+    console.error("Uso: node claim-proxy.mjs <conditionId1> [conditionId2] ...  |  node claim-proxy.mjs --serve");
+    process.exit(1);
+  }
+
+  const creds = loadCreds();
+  if (!creds) {
+    console.error("Imposta in .env: PRIVATE_KEY, BUILDER_API_KEY, BUILDER_SECRET, BUILDER_PASSPHRASE");
+    process.exit(1);
+  }
+
+  const relayer = await createRelayer(creds);
+
+  // Crea TUTTE le transazioni per batch execution (una sola chiamata al relayer)
+  console.log(`Batch: ${conditionIds.length} claim in un'unica transazione`);
+  const res = await redeem(relayer, conditionIds);
+
+  if (res.ok) {
+    console.log(`✓ Batch claim OK: ${res.count} mercati, tx: ${res.transactionHash}`);
+    console.log("Fatto:", res.count, "/", conditionIds.length);
+    process.exit(0);
+  }
+  if (res.rateLimited) {
+    console.log("RATE_LIMIT_429:", res.resetSeconds || "unknown");
+    console.log("RATE_LIMIT_RESET_SECONDS:", res.resetSeconds || 0);
     process.exit(1);
   }
+  // Mostra errore completo
+  console.log("Batch claim errore:", res.error);
+  console.error("Batch claim errore:", res.error);
+  process.exit(1);
 }
 
 main();
@@ -0,0 +1,217 @@
+"""
+Priorità dei claim per valore: quando la quota relayer (o la dimensione dei batch) è il collo di
+bottiglia, i conditionId che valgono di più vanno inviati per primi.
+
+Senza piano i conditionId vanno al relayer nell'ordine della Data API e la polvere occupa posti
+nei batch che servirebbero alle posizioni grandi. Qui:
+- valore di un conditionId = somma dei currentValue delle sue posizioni (USDC attesi dal redeem;
+  un outcome perdente vale 0), aggregato in un solo passaggio sulle posizioni (ClaimTotals);
+- ogni richiesta relayer costa un'unità di quota qualunque cosa contenga (fino a `per_batch`
+  claim): con R richieste il valore recuperato è massimo prendendo gli R·per_batch conditionId
+  di valore più alto. Il piano li ordina per valore decrescente, così i primi batch sono i più
+  ricchi e, se la quota finisce o arriva un 429 a metà ciclo, il grosso è già stato inviato;
+- soglie: `min_value` (USDC per conditionId) e `min_batch_value` (USDC attesi per richiesta).
+  Quello che resta sotto soglia non si invia e finisce nel report del valore lasciato.
+I conditionId senza valore noto (es. dagli eventi on-chain) non vengono mai scartati e vanno in
+coda nell'ordine ricevuto.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from claims import REDEEM_GAS_PER_CALL, REDEEM_MAX_BATCH_GAS, REDEEM_MAX_PER_BATCH, redeem_batch_size
+
+
+def position_value(pos: Dict[str, Any]) -> float:
+    """USDC attesi dal redeem di una posizione: currentValue, altrimenti size × curPrice."""
+    value = pos.get("currentValue")
+    if value is not None:
+        return float(value)
+    return float(pos.get("size") or 0.0) * float(pos.get("curPrice") or 0.0)
+
+
+class ClaimTotals:
+    """
+    Valore (USDC) e share per conditionId. Si riempie in streaming con add() (una posizione alla
+    volta, mentre arrivano le pagine) o in blocco con from_positions().
+    """
+
+    def __init__(self):
+        self.value: Dict[str, float] = {}
+        self.size: Dict[str, float] = {}
+
+    def add(self, cid: str, pos: Dict[str, Any]) -> bool:
+        """Somma la posizione al suo conditionId. True se il conditionId non era ancora presente."""
+        new = cid not in self.value
+        self.value[cid] = self.value.get(cid, 0.0) + position_value(pos)
+        self.size[cid] = self.size.get(cid, 0.0) + float(pos.get("size") or 0.0)
+        return new
+
+    @classmethod
+    def from_positions(cls, positions: Iterable[Dict[str, Any]]) -> "ClaimTotals":
+        totals = cls()
+        add = totals.add
+        for pos in positions:
+            cid = (pos.get("conditionId") or pos.get("condition_id") or "").strip()
+            if cid:
+                add(cid, pos)
+        return totals
+
+    @property
+    def condition_ids(self) -> List[str]:
+        """conditionId unici nell'ordine di arrivo."""
+        return list(self.value)
+
+
+@dataclass
+class ClaimPlan:
+    """Ordine di invio al relayer e previsione del valore recuperato con la quota disponibile."""
+    order: List[str] = field(default_factory=list)        # da inviare: valore decrescente, poi valore ignoto
+    batches: List[List[str]] = field(default_factory=list)
+    below_min: List[str] = field(default_factory=list)    # sotto min_value o in un batch sotto min_batch_value
+    values: Dict[str, float] = field(default_factory=dict)
+    max_requests: Optional[int] = None
+
+    def value(self, condition_ids: Iterable[str]) -> float:
+        values = self.values
+        return sum(values.get(cid, 0.0) for cid in condition_ids)
+
+    @property
+    def known(self) -> bool:
+        """True se almeno un conditionId del piano ha un valore noto."""
+        return any(cid in self.values for cid in self.order) or bool(self.below_min)
+
+    @property
+    def planned(self) -> List[List[str]]:
+        """Batch che rientrano nella quota (se nessuna bisezione consuma richieste in più)."""
+        return self.batches if self.max_requests is None else self.batches[:max(0, self.max_requests)]
+
+    @property
+    def over_quota(self) -> List[str]:
+        return [cid for batch in self.batches[len(self.planned):] for cid in batch]
+
+    @property
+    def batch_values(self) -> List[float]:
+        return [self.value(batch) for batch in self.batches]
+
+    @property
+    def expected_per_request(self) -> float:
+        planned = self.planned
+        return sum(self.value(batch) for batch in planned) / len(planned) if planned else 0.0
+
+    def summary(self) -> str:
+        planned = self.planned
+        n = sum(len(batch) for batch in planned)
+        expected = sum(self.value(batch) for batch in planned)
+        text = (f"{n} mercati in {len(planned)} richieste, ~{expected:.2f} USDC attesi "
+                f"({self.expected_per_request:.2f} USDC/richiesta)")
+        over = self.over_quota
+        if over:
+            text += f"; {len(over)} oltre la quota ({self.value(over):.2f} USDC)"
+        if self.below_min:
+            text += f"; {len(self.below_min)} sotto soglia ({self.value(self.below_min):.2f} USDC)"
+        return text
+
+
+def plan_claims(
+    condition_ids: List[str],
+    values: Dict[str, float],
+    max_requests: Optional[int] = None,
+    per_batch: Optional[int] = None,
+    min_value: float = 0.0,
+    min_batch_value: float = 0.0,
+    max_per_batch: int = REDEEM_MAX_PER_BATCH,
+    gas_per_redeem: int = REDEEM_GAS_PER_CALL,
+    max_batch_gas: int = REDEEM_MAX_BATCH_GAS,
+) -> ClaimPlan:
+    """
+    Ordina i conditionId per valore decrescente (a parità di valore resta l'ordine ricevuto) e li
+    divide in batch come claims.plan_redeem_batches. Con le soglie a 0 non si scarta nulla: cambia
+    solo l'ordine. `plan.order` va passato così com'è a execute_redeem_batches (stessi batch);
+    quello oltre max_requests finisce lì in `skipped` e si riprova al ciclo successivo.
+    """
+    if per_batch is None:
+        per_batch = redeem_batch_size(max_per_batch, gas_per_redeem, max_batch_gas)
+    per_batch = max(1, per_batch)
+    known, unknown, below = [], [], []
+    for cid in condition_ids:
+        value = values.get(cid)
+        if value is None:
+            unknown.append(cid)
+        elif value < min_value:
+            below.append(cid)
+        else:
+            known.append(cid)
+    known.sort(key=values.__getitem__, reverse=True)
+    ranked = known + unknown
+
+    plan = ClaimPlan(below_min=below, values=values, max_requests=max_requests)
+    for i in range(0, len(ranked), per_batch):
+        batch = ranked[i:i + per_batch]
+        # Batch di sola polvere (valori noti) sotto soglia: una richiesta di quota non vale la pena.
+        # I valori sono decrescenti, quindi i batch scartati sono tutti in coda (batch pieni).
+        if min_batch_value > 0 and all(cid in values for cid in batch) and plan.value(batch) < min_batch_value:
+            below.extend(batch)
+            continue
+        plan.batches.append(batch)
+        plan.order.extend(batch)
+    return plan
+
+
+@dataclass
+class ClaimValueReport:
+    """Valore (USDC) claimato e lasciato sul wallet dopo execute_redeem_batches."""
+    claimed: float = 0.0
+    below_min: float = 0.0
+    deferred: float = 0.0   # rimandati: quota esaurita, 429 o errore fatale
+    failed: float = 0.0     # falliscono anche da soli
+    n_below_min: int = 0
+    n_deferred: int = 0
+    n_failed: int = 0
+
+    @property
+    def left(self) -> float:
+        return self.below_min + self.deferred + self.failed
+
+    def summary(self) -> str:
+        text = f"{self.claimed:.2f} USDC claimati"
+        if self.n_below_min or self.n_deferred or self.n_failed:
+            parts = []
+            if self.n_below_min:
+                parts.append(f"{self.below_min:.2f} sotto soglia ({self.n_below_min} mercati)")
+            if self.n_deferred:
+                parts.append(f"{self.deferred:.2f} rimandati ({self.n_deferred})")
+            if self.n_failed:
+                parts.append(f"{self.failed:.2f} falliti ({self.n_failed})")
+            text += f", {self.left:.2f} USDC lasciati: " + ", ".join(parts)
+        return text
+
+
+def value_report(plan: ClaimPlan, report) -> ClaimValueReport:
+    """report = claims.RedeemBatchReport dell'esecuzione di plan.order."""
+    return ClaimValueReport(
+        claimed=plan.value(report.claimed),
+        below_min=plan.value(plan.below_min),
+        deferred=plan.value(report.skipped),
+        failed=plan.value(report.failed),
+        n_below_min=len(plan.below_min),
+        n_deferred=len(report.skipped),
+        n_failed=len(report.failed),
+    )
+
+
+def allocate_requests(plans: Dict[str, ClaimPlan], tokens: int) -> Dict[str, int]:
+    """
+    Più wallet sulla stessa quota (stesso builder): le `tokens` richieste vanno ai batch di valore
+    più alto tra tutti i wallet. I batch di ogni piano sono già in ordine decrescente, quindi ogni
+    wallet riceve un prefisso dei suoi batch. Ritorna nome → richieste assegnate.
+    """
+    ranked = sorted(
+        ((value, name) for name, plan in plans.items() for value in plan.batch_values),
+        key=lambda item: item[0],
+        reverse=True,
+    )
+    out = dict.fromkeys(plans, 0)
+    for _, name in ranked[:max(0, tokens)]:
+        out[name] += 1
+    return out
@@ -0,0 +1,360 @@
+"""
+Client Python per claim-proxy/claim-proxy.mjs in modalità daemon (--serve).
+
+Il processo Node resta acceso tra un ciclo e l'altro: startup di Node, import di viem e
+dei SDK relayer e costruzione di RelayClient si pagano una volta sola. Protocollo: una
+richiesta JSON per riga su stdin, una risposta JSON per riga su stdout (vedi claim-proxy.mjs).
+Se il processo muore viene riavviato alla richiesta successiva.
+"""
+
+import asyncio
+import json
+import os
+import queue
+import subprocess
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Dict
+
+# Variabili proxy da non passare a Node: Relayer e RPC sono accessibili direttamente
+_PROXY_ENV_VARS = ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "http_proxy", "https_proxy", "all_proxy")
+
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "claim-proxy", "claim-proxy.mjs")
+
+
+@dataclass
+class ClaimProxyResult:
+    """Esito di un batch redeem via claim-proxy."""
+    ok: bool
+    count: int = 0
+    transaction_hash: Optional[str] = None
+    error: Optional[str] = None
+    rate_limited: bool = False
+    reset_seconds: Optional[int] = None
+    # Daemon morto o muto a metà richiesta: esito del batch sconosciuto, non va ritentato subito
+    fatal: bool = False
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "ClaimProxyResult":
+        reset = data.get("resetSeconds")
+        return cls(
+            ok=bool(data.get("ok")),
+            count=int(data.get("count") or 0),
+            transaction_hash=data.get("transactionHash"),
+            error=data.get("error"),
+            rate_limited=bool(data.get("rateLimited")),
+            reset_seconds=int(reset) if reset else None,
+            fatal=bool(data.get("fatal")),
+        )
+
+    def as_submit_result(self) -> Dict:
+        """Formato atteso da claims.execute_redeem_batches."""
+        return {
+            "ok": self.ok,
+            "transactionHash": self.transaction_hash,
+            "error": self.error,
+            "rate_limited": self.rate_limited,
+            "reset_seconds": self.reset_seconds,
+            "fatal": self.fatal,
+        }
+
+
+class ClaimProxyError(RuntimeError):
+    """Il daemon Node non si avvia (node mancante, credenziali, npm install non eseguito)."""
+
+
+class ClaimProxyDaemon:
+    """
+    Processo `node claim-proxy.mjs --serve` tenuto caldo.
+    Uso:
+        daemon = ClaimProxyDaemon()
+        res = daemon.redeem(condition_ids)   # ClaimProxyResult
+        daemon.close()
+    """
+
+    def __init__(
+        self,
+        script: str = DEFAULT_SCRIPT,
+        node: str = "node",
+        env: Optional[Dict[str, str]] = None,
+        start_timeout: float = 60.0,
+        request_timeout: float = 120.0,
+    ):
+        self.script = script
+        self.node = node
+        self.env = env if env is not None else {k: v for k, v in os.environ.items() if k not in _PROXY_ENV_VARS}
+        self.start_timeout = start_timeout
+        self.request_timeout = request_timeout
+        self.restarts = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _reader(self, proc: subprocess.Popen, lines: "queue.Queue[Optional[str]]") -> None:
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)  # EOF: processo terminato
+
+    def _read_json(self, timeout: float) -> Dict:
+        """Prossima riga JSON da stdout del daemon (le righe non JSON vengono ignorate)."""
+        while True:
+            try:
+                line = self._lines.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError(f"claim-proxy: nessuna risposta entro {timeout:.0f}s")
+            if line is None:
+                raise ClaimProxyError("claim-proxy terminato inaspettatamente")
+            line = line.strip()
+            if not line.startswith("{"):
+                continue
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+
+    def start(self) -> None:
+        """Avvia il daemon e attende {"ready": true}. Solleva ClaimProxyError se non parte."""
+        if self.alive:
+            return
+        if self._proc is not None:
+            self.restarts += 1
+        if not os.path.isfile(self.script):
+            raise ClaimProxyError(f"script non trovato: {self.script}")
+        self._proc = subprocess.Popen(
+            [self.node, self.script, "--serve"],
+            cwd=os.path.dirname(self.script),
+            env=self.env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=None,  # log Node direttamente sui log del worker
+            text=True,
+            bufsize=1,
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._reader, args=(self._proc, self._lines), daemon=True).start()
+        try:
+            hello = self._read_json(self.start_timeout)
+        except (TimeoutError, ClaimProxyError) as e:
+            self._kill()
+            raise ClaimProxyError(f"avvio claim-proxy fallito: {e}") from e
+        if not hello.get("ready"):
+            self._kill()
+            raise ClaimProxyError(f"avvio claim-proxy fallito: {hello.get('error') or hello}")
+
+    def redeem(self, condition_ids: List[str], creds: Optional[Dict[str, str]] = None) -> ClaimProxyResult:
+        """
+        Redeem batch di condition_ids. Se il daemon è morto lo riavvia prima di inviare.
+        creds: {"privateKey", "key", "secret", "passphrase"} per un wallet diverso da quello del .env.
+        Non ritenta dopo l'invio: se il processo muore a metà richiesta il batch potrebbe
+        essere già stato inoltrato al relayer, quindi si ritorna errore e si riprova al ciclo dopo.
+        """
+        with self._lock:
+            self.start()
+            self._next_id += 1
+            req_id = self._next_id
+            try:
+                req = {"id": req_id, "conditionIds": list(condition_ids)}
+                if creds:
+                    req["creds"] = creds
+                self._proc.stdin.write(json.dumps(req) + "\n")
+                self._proc.stdin.flush()
+                while True:
+                    data = self._read_json(self.request_timeout)
+                    if data.get("id") == req_id:
+                        return ClaimProxyResult.from_json(data)
+            except (BrokenPipeError, OSError, ClaimProxyError) as e:
+                self._kill()
+                return ClaimProxyResult(ok=False, error=f"claim-proxy: {e}", fatal=True)
+            except TimeoutError as e:
+                # Risposta persa: riavvio al prossimo ciclo per non leggere risposte sfasate
+                self._kill()
+                return ClaimProxyResult(ok=False, error=str(e), fatal=True)
+
+    def submit(self, condition_ids: List[str], creds: Optional[Dict[str, str]] = None) -> Dict:
+        """submit per claims.execute_redeem_batches: un batch = una richiesta al relayer."""
+        try:
+            return self.redeem(condition_ids, creds).as_submit_result()
+        except FileNotFoundError:
+            return {"ok": False, "error": "Node non trovato. Installa Node.js e in claim-proxy/ esegui: npm install", "fatal": True, "sent": False}
+        except ClaimProxyError as e:
+            # Daemon che non parte: la richiesta non è arrivata al relayer
+            return {"ok": False, "error": str(e), "fatal": True, "sent": False}
+
+    def _kill(self) -> None:
+        if self._proc is None:
+            return
+        if self._proc.poll() is None:
+            self._proc.kill()
+        try:
+            self._proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+
+    def close(self) -> None:
+        """Chiude stdin (il daemon esce da solo) e attende la terminazione."""
+        with self._lock:
+            if self._proc is None:
+                return
+            if self._proc.poll() is None:
+                try:
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=10)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self._kill()
+            self._proc = None
+
+    def __enter__(self) -> "ClaimProxyDaemon":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class AsyncClaimProxyDaemon:
+    """
+    Come ClaimProxyDaemon ma su asyncio (asyncio.create_subprocess_exec): le attese su Node
+    non bloccano la event loop. Va usato (e chiuso con aclose) sempre dalla stessa event loop.
+    """
+
+    def __init__(
+        self,
+        script: str = DEFAULT_SCRIPT,
+        node: str = "node",
+        env: Optional[Dict[str, str]] = None,
+        start_timeout: float = 60.0,
+        request_timeout: float = 120.0,
+    ):
+        self.script = script
+        self.node = node
+        self.env = env if env is not None else {k: v for k, v in os.environ.items() if k not in _PROXY_ENV_VARS}
+        self.start_timeout = start_timeout
+        self.request_timeout = request_timeout
+        self.restarts = 0
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._next_id = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+    async def _read_json(self, timeout: float) -> Dict:
+        """Prossima riga JSON da stdout del daemon (le righe non JSON vengono ignorate)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"claim-proxy: nessuna risposta entro {timeout:.0f}s")
+            try:
+                raw = await asyncio.wait_for(self._proc.stdout.readline(), remaining)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"claim-proxy: nessuna risposta entro {timeout:.0f}s")
+            if not raw:
+                raise ClaimProxyError("claim-proxy terminato inaspettatamente")
+            line = raw.decode("utf-8", "replace").strip()
+            if not line.startswith("{"):
+                continue
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+
+    async def _start(self) -> None:
+        if self.alive:
+            return
+        if self._proc is not None:
+            self.restarts += 1
+        if not os.path.isfile(self.script):
+            raise ClaimProxyError(f"script non trovato: {self.script}")
+        self._proc = await asyncio.create_subprocess_exec(
+            self.node, self.script, "--serve",
+            cwd=os.path.dirname(self.script),
+            env=self.env,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=None,  # log Node direttamente sui log del worker
+        )
+        try:
+            hello = await self._read_json(self.start_timeout)
+        except (TimeoutError, ClaimProxyError) as e:
+            await self._kill()
+            raise ClaimProxyError(f"avvio claim-proxy fallito: {e}") from e
+        if not hello.get("ready"):
+            await self._kill()
+            raise ClaimProxyError(f"avvio claim-proxy fallito: {hello.get('error') or hello}")
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def start(self) -> None:
+        """Avvia il daemon (se non già attivo) e attende {"ready": true}."""
+        async with self._get_lock():
+            await self._start()
+
+    async def redeem(self, condition_ids: List[str], creds: Optional[Dict[str, str]] = None) -> ClaimProxyResult:
+        """Vedi ClaimProxyDaemon.redeem."""
+        async with self._get_lock():
+            await self._start()
+            self._next_id += 1
+            req_id = self._next_id
+            req = {"id": req_id, "conditionIds": list(condition_ids)}
+            if creds:
+                req["creds"] = creds
+            try:
+                self._proc.stdin.write((json.dumps(req) + "\n").encode())
+                await self._proc.stdin.drain()
+                while True:
+                    data = await self._read_json(self.request_timeout)
+                    if data.get("id") == req_id:
+                        return ClaimProxyResult.from_json(data)
+            except (BrokenPipeError, ConnectionResetError, OSError, ClaimProxyError) as e:
+                await self._kill()
+                return ClaimProxyResult(ok=False, error=f"claim-proxy: {e}", fatal=True)
+            except TimeoutError as e:
+                await self._kill()
+                return ClaimProxyResult(ok=False, error=str(e), fatal=True)
+
+    async def submit(self, condition_ids: List[str], creds: Optional[Dict[str, str]] = None) -> Dict:
+        """submit per claims.aexecute_redeem_batches."""
+        try:
+            return (await self.redeem(condition_ids, creds)).as_submit_result()
+        except FileNotFoundError:
+            return {"ok": False, "error": "Node non trovato. Installa Node.js e in claim-proxy/ esegui: npm install", "fatal": True, "sent": False}
+        except ClaimProxyError as e:
+            # Daemon che non parte: la richiesta non è arrivata al relayer
+            return {"ok": False, "error": str(e), "fatal": True, "sent": False}
+
+    async def _kill(self) -> None:
+        if self._proc is None:
+            return
+        if self._proc.returncode is None:
+            try:
+                self._proc.kill()
+            except ProcessLookupError:
+                pass
+        try:
+            await asyncio.wait_for(self._proc.wait(), 5)
+        except asyncio.TimeoutError:
+            pass
+
+    async def aclose(self) -> None:
+        """Chiude stdin (il daemon esce da solo) e attende la terminazione."""
+        if self._proc is None:
+            return
+        if self._proc.returncode is None:
+            try:
+                self._proc.stdin.close()
+                await asyncio.wait_for(self._proc.wait(), 10)
+            except (OSError, asyncio.TimeoutError):
+                pass
+        await self._kill()
+        self._proc = None
@@ -9,11 +9,20 @@ Riferimenti documentazione:
 """
 
 import os
-from typing import List, Dict, Any, Optional
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Callable, AsyncIterator, Awaitable, Generator, Tuple
 
-# Data API
-DATA_API_BASE = "https://data-api.polymarket.com"
+from ledger import is_tx_hash
+from metrics import CLAIMS, RELAYER_REQUESTS
+
+# Data API e Relayer (sovrascrivibili per prove locali, es. bench.suite)
+DATA_API_BASE = os.getenv("DATA_API_BASE", "https://data-api.polymarket.com").rstrip("/")
+RELAYER_URL = os.getenv("RELAYER_URL", "https://relayer-v2.polymarket.com/")
 POSITIONS_PATH = "/positions"
+# Paginazione /positions: limit massimo accettato dalla Data API per pagina
+POSITIONS_PAGE_SIZE = 100
+POSITIONS_MAX_PAGE_SIZE = 500
 
 # Polygon (doc Polymarket)
 CTF_ADDRESS = "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045"
@@ -21,6 +30,14 @@ USDC_ADDRESS = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"
 # parentCollectionId = bytes32(0) for Polymarket; indexSets = [1, 2] for binary
 REDEEM_INDEX_SETS = [1, 2]
 
+# Batch relayer: stima gas per redeemPositions (2 indexSets, via Safe/Proxy) e limiti per batch
+REDEEM_GAS_PER_CALL = 150_000
+REDEEM_MAX_BATCH_GAS = 10_000_000
+REDEEM_MAX_PER_BATCH = 50
+# Payload relayer: calldata redeem (228 byte) + to/value/operation per tx
+REDEEM_TX_BYTES = 228 + 96
+REDEEM_MAX_BATCH_BYTES = 64 * 1024
+
 # ABI minimo per encode redeemPositions
 REDEEM_POSITIONS_ABI = [
     {
@@ -38,6 +55,87 @@ REDEEM_POSITIONS_ABI = [
 ]
 
 
+def _positions_params(user_address: str, limit: int, offset: int, redeemable: bool = True) -> Dict[str, Any]:
+    params = {"user": user_address, "limit": limit}
+    if redeemable:
+        params["redeemable"] = "true"
+    if offset:
+        params["offset"] = offset
+    return params
+
+
+def _conditional_headers(pages: Optional[Dict], key: Tuple) -> Optional[Dict[str, str]]:
+    """If-None-Match / If-Modified-Since per una pagina già letta (None: richiesta normale)."""
+    cached = pages.get(key) if pages is not None else None
+    if cached is None:
+        return None
+    etag, modified, _ = cached
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if modified:
+        headers["If-Modified-Since"] = modified
+    return headers
+
+
+def _page_from_response(resp, pages: Optional[Dict], key: Tuple) -> List[Dict[str, Any]]:
+    """304 → pagina in cache; altrimenti JSON, salvato in cache se il server manda ETag/Last-Modified."""
+    if resp.status_code == 304 and pages is not None and key in pages:
+        return pages[key][2]
+    data = resp.json()
+    page = data if isinstance(data, list) else []
+    if pages is not None:
+        etag, modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+        if etag or modified:
+            pages[key] = (etag, modified, page)
+        else:
+            pages.pop(key, None)
+    return page
+
+
+def _fetch_positions_page(
+    client, user_address: str, limit: int, offset: int = 0, pages: Optional[Dict] = None
+) -> List[Dict[str, Any]]:
+    """
+    Una pagina di GET /positions?redeemable=true (limit/offset), con retry (retries.DATA_API_POLICY).
+    pages: cache per le richieste condizionali (positions.PositionSnapshot.pages), None = disattivata.
+    """
+    from retries import DATA_API_POLICY, engine
+
+    url = f"{DATA_API_BASE}{POSITIONS_PATH}"
+    key = (user_address.lower(), True, limit, offset)
+    headers = _conditional_headers(pages, key)
+
+    def _get():
+        resp = client.get(url, params=_positions_params(user_address, limit, offset), headers=headers, timeout=30.0)
+        if resp.status_code != 304:
+            resp.raise_for_status()
+        return resp
+
+    return _page_from_response(engine.call("data-api", _get, policy=DATA_API_POLICY), pages, key)
+
+
+async def _afetch_positions_page(
+    client, user_address: str, limit: int, offset: int = 0, redeemable: bool = True, pages: Optional[Dict] = None
+) -> List[Dict[str, Any]]:
+    """Come _fetch_positions_page con httpx.AsyncClient (redeemable=False: tutte le posizioni)."""
+    from retries import DATA_API_POLICY, engine
+
+    url = f"{DATA_API_BASE}{POSITIONS_PATH}"
+    key = (user_address.lower(), redeemable, limit, offset)
+    headers = _conditional_headers(pages, key)
+
+    async def _get():
+        resp = await client.get(
+            url, params=_positions_params(user_address, limit, offset, redeemable), headers=headers, timeout=30.0
+        )
+        if resp.status_code != 304:
+            resp.raise_for_status()
+        return resp
+
+    return _page_from_response(await engine.acall("data-api", _get, policy=DATA_API_POLICY), pages, key)
+
+
 def fetch_redeemable_positions(
     user_address: str,
     proxy_url: Optional[str] = None,  # Non usato: Data API accessibile direttamente
@@ -47,18 +145,184 @@ def fetch_redeemable_positions(
     Recupera le posizioni claimabili (redeemable) per un indirizzo.
     Data API: GET /positions?user=<addr>&redeemable=true
     NOTA: proxy_url ignorato - Data API accessibile direttamente senza proxy.
+    Solo la prima pagina: per wallet con più di `limit` posizioni usare iter_redeemable_positions.
     """
-    import httpx
+    from http_clients import registry
+
+    # Nessun proxy: Data API accessibile direttamente (client condiviso, connessioni riusate)
+    return _fetch_positions_page(registry.get("data-api"), user_address, limit)
+
+
+def iter_redeemable_positions(
+    user_address: str,
+    page_size: int = POSITIONS_PAGE_SIZE,
+    prefetch: int = 0,
+    max_pages: Optional[int] = None,
+    client=None,
+    pages: Optional[Dict] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Come fetch_redeemable_positions ma paginato (offset) e in streaming: le posizioni
+    vengono restituite pagina per pagina, così il chiamante può già deduplicare i
+    conditionId e costruire le tx prima che arrivi l'ultima pagina.
+    prefetch: numero di pagine successive scaricate in parallelo (0 = sequenziale).
+    In memoria restano al massimo prefetch + 1 pagine, qualunque sia la dimensione del portafoglio.
+    La paginazione si ferma alla prima pagina incompleta (o dopo max_pages pagine).
+    client: httpx.Client da usare; se None il client "data-api" condiviso del registro http_clients.
+    pages: cache per richieste condizionali (ETag/Last-Modified), vedi positions.PositionSnapshot.
+    """
+    from contextlib import nullcontext
+    from http_clients import registry
+
+    page_size = max(1, min(int(page_size), POSITIONS_MAX_PAGE_SIZE))
+    with nullcontext(client if client is not None else registry.get("data-api")) as client:
+        if prefetch <= 0:
+            page_no = 0
+            while max_pages is None or page_no < max_pages:
+                page = _fetch_positions_page(client, user_address, page_size, page_no * page_size, pages)
+                yield from page
+                if len(page) < page_size:
+                    return
+                page_no += 1
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix="positions")
+        pending = deque()
+        next_page = 0
+        try:
+            while True:
+                # Finestra limitata: pagina corrente + `prefetch` pagine in volo
+                while len(pending) <= prefetch and (max_pages is None or next_page < max_pages):
+                    pending.append(pool.submit(
+                        _fetch_positions_page, client, user_address, page_size, next_page * page_size, pages
+                    ))
+                    next_page += 1
+                if not pending:
+                    return
+                page = pending.popleft().result()
+                yield from page
+                if len(page) < page_size:
+                    return
+        finally:
+            # Le pagine speculative oltre la fine vengono scartate
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+async def aiter_redeemable_positions(
+    user_address: str,
+    client,
+    page_size: int = POSITIONS_PAGE_SIZE,
+    prefetch: int = 0,
+    max_pages: Optional[int] = None,
+    redeemable: bool = True,
+    pages: Optional[Dict] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Versione asyncio di iter_redeemable_positions su un httpx.AsyncClient (del chiamante).
+    Le pagine in prefetch sono task sulla stessa event loop: nessun thread.
+    redeemable=False: tutte le posizioni del wallet (anche mercati non ancora risolti).
+    """
+    import asyncio
+
+    page_size = max(1, min(int(page_size), POSITIONS_MAX_PAGE_SIZE))
+    pending = deque()
+    next_page = 0
+    try:
+        while True:
+            while len(pending) <= max(0, prefetch) and (max_pages is None or next_page < max_pages):
+                pending.append(asyncio.ensure_future(
+                    _afetch_positions_page(client, user_address, page_size, next_page * page_size, redeemable, pages)
+                ))
+                next_page += 1
+            if not pending:
+                return
+            page = await pending.popleft()
+            for pos in page:
+                yield pos
+            if len(page) < page_size:
+                return
+    finally:
+        # Le pagine speculative oltre la fine vengono annullate
+        for task in pending:
+            task.cancel()
+
+
+def _normalize_condition_id(condition_id: str) -> str:
+    """conditionId → 64 caratteri hex minuscoli (senza 0x), come si aspetta bytes32."""
+    if condition_id.startswith("0x"):
+        condition_id = condition_id[2:]
+    return condition_id.lower().rjust(64, "0")[:64]
+
+
+class RedeemCalldataEncoder:
+    """
+    Encoder precompilato per redeemPositions(collateral, parentCollectionId, conditionId, indexSets).
+    Selector e parti statiche dell'encoding ABI (collateral, parent = bytes32(0), offset/lunghezza/valori
+    di indexSets) sono calcolati una volta sola: per ogni conditionId si inseriscono solo i suoi 32 byte.
+    Layout (head + tail ABI): selector | collateral | parent | conditionId | 0x80 | len | indexSets...
+    """
+
+    def __init__(
+        self,
+        collateral: str = USDC_ADDRESS,
+        index_sets: Optional[List[int]] = None,
+        parent_collection_id: bytes = b"\x00" * 32,
+    ):
+        from eth_utils import keccak
+
+        index_sets = REDEEM_INDEX_SETS if index_sets is None else index_sets
+        arg_types = ",".join(i["type"] for i in REDEEM_POSITIONS_ABI[0]["inputs"])
+        selector = keccak(text=f"{REDEEM_POSITIONS_ABI[0]['name']}({arg_types})")[:4]
+        collateral_word = bytes(12) + bytes.fromhex(collateral[2:] if collateral.startswith("0x") else collateral)
+        # Offset del tail dinamico (indexSets) = 4 parole statiche di head
+        tail = (4 * 32).to_bytes(32, "big") + len(index_sets).to_bytes(32, "big")
+        tail += b"".join(int(i).to_bytes(32, "big") for i in index_sets)
+
+        self.prefix = selector + collateral_word + parent_collection_id.rjust(32, b"\x00")
+        self.suffix = tail
+        self.size = len(self.prefix) + 32 + len(self.suffix)
+        self._cid_at = len(self.prefix)
+        self._prefix_hex = "0x" + self.prefix.hex()
+        self._suffix_hex = self.suffix.hex()
+
+    def encode_hex(self, condition_id: str) -> str:
+        """Calldata 0x... per un conditionId (solo concatenazione di stringhe)."""
+        return self._prefix_hex + _normalize_condition_id(condition_id) + self._suffix_hex
+
+    def encode(self, condition_id: str) -> bytes:
+        """Calldata in bytes per un conditionId."""
+        return self.prefix + bytes.fromhex(_normalize_condition_id(condition_id)) + self.suffix
+
+    def encode_batch(self, condition_ids: List[str]) -> bytearray:
+        """
+        Encoda N conditionId in un unico buffer preallocato (N * size byte):
+        il calldata i-esimo è buf[i * size:(i + 1) * size] (vedi iter_calldata).
+        """
+        size, at = self.size, self._cid_at
+        buf = bytearray((self.prefix + bytes(32) + self.suffix) * len(condition_ids))
+        for i, cid in enumerate(condition_ids):
+            start = i * size + at
+            buf[start:start + 32] = bytes.fromhex(_normalize_condition_id(cid))
+        return buf
+
+    def iter_calldata(self, buf: bytearray) -> Iterator[memoryview]:
+        """Slice (senza copia) dei singoli calldata in un buffer di encode_batch."""
+        view = memoryview(buf)
+        for start in range(0, len(view), self.size):
+            yield view[start:start + self.size]
 
-    url = f"{DATA_API_BASE}{POSITIONS_PATH}"
-    params = {"user": user_address, "redeemable": "true", "limit": limit}
-    
-    # Nessun proxy: Data API accessibile direttamente
-    with httpx.Client(http2=True, timeout=30.0) as client:
-        resp = client.get(url, params=params, timeout=30.0)
-        resp.raise_for_status()
-        data = resp.json()
-    return data if isinstance(data, list) else []
+
+_redeem_encoder: Optional[RedeemCalldataEncoder] = None
+
+
+def get_redeem_encoder() -> RedeemCalldataEncoder:
+    """Encoder redeemPositions condiviso (USDC, parent zero, indexSets [1, 2])."""
+    global _redeem_encoder
+    if _redeem_encoder is None:
+        _redeem_encoder = RedeemCalldataEncoder()
+    return _redeem_encoder
 
 
 def build_redeem_tx(condition_id: str) -> Dict[str, str]:
@@ -67,29 +331,14 @@ def build_redeem_tx(condition_id: str) -> Dict[str, str]:
     condition_id: bytes32 hex (0x...).
     Ritorna dict con to, data, value per il relayer.
     """
-    from web3 import Web3
+    return {"to": CTF_ADDRESS, "data": get_redeem_encoder().encode_hex(condition_id), "value": "0"}
 
-    w3 = Web3()
-    if not condition_id.startswith("0x"):
-        condition_id = "0x" + condition_id
-    cond_hex = condition_id[2:].lower().rjust(64, "0")[:64]
-    condition_id_bytes = bytes.fromhex(cond_hex)
-    parent_zero = b"\x00" * 32
 
-    ctf = w3.eth.contract(
-        address=Web3.to_checksum_address(CTF_ADDRESS),
-        abi=REDEEM_POSITIONS_ABI,
-    )
-    fn = ctf.functions.redeemPositions(
-        Web3.to_checksum_address(USDC_ADDRESS),
-        parent_zero,
-        condition_id_bytes,
-        REDEEM_INDEX_SETS,
-    )
-    data_hex = fn._encode_transaction_data()
-    if not data_hex.startswith("0x"):
-        data_hex = "0x" + data_hex
-    return {"to": CTF_ADDRESS, "data": data_hex, "value": "0"}
+def build_redeem_txs(condition_ids: List[str]) -> List[Dict[str, str]]:
+    """build_redeem_tx per N conditionId, con un unico encode batch."""
+    enc = get_redeem_encoder()
+    buf = enc.encode_batch(condition_ids)
+    return [{"to": CTF_ADDRESS, "data": "0x" + cd.hex(), "value": "0"} for cd in enc.iter_calldata(buf)]
 
 
 def execute_redeem_via_relayer(
@@ -98,7 +347,7 @@ def execute_redeem_via_relayer(
     builder_key: str,
     builder_secret: str,
     builder_passphrase: str,
-    relayer_url: str = "https://relayer-v2.polymarket.com/",
+    relayer_url: Optional[str] = None,
     chain_id: int = 137,
     proxy_url: Optional[str] = None,  # Non usato: Relayer accessibile direttamente
 ) -> List[Dict[str, Any]]:
@@ -127,7 +376,7 @@ def execute_redeem_via_relayer(
     except Exception as e:
         return [{"error": f"BuilderConfig: {e}"}]
 
-    client = RelayClient(relayer_url, chain_id, pk, builder_config)
+    client = RelayClient(relayer_url or RELAYER_URL, chain_id, pk, builder_config)
     
     # Batch execution: tutte le transazioni in un'unica chiamata al relayer
     # Questo riduce drasticamente le chiamate API e evita rate limit
@@ -159,16 +408,215 @@ def execute_redeem_via_relayer(
             return [{"error": err}]
 
 
-def get_unique_condition_ids(positions: List[Dict[str, Any]]) -> List[str]:
-    """Estrae conditionId unici dalla lista di posizioni (per una redeem per condition)."""
+def redeem_batch_size(
+    max_per_batch: int = REDEEM_MAX_PER_BATCH,
+    gas_per_redeem: int = REDEEM_GAS_PER_CALL,
+    max_batch_gas: int = REDEEM_MAX_BATCH_GAS,
+    max_batch_bytes: int = REDEEM_MAX_BATCH_BYTES,
+) -> int:
+    """Claim per richiesta relayer: il minimo tra max tx, gas stimato e dimensione del payload."""
+    per_batch = min(
+        max_per_batch,
+        max_batch_gas // max(1, gas_per_redeem),
+        max_batch_bytes // REDEEM_TX_BYTES,
+    )
+    return max(1, per_batch)
+
+
+def plan_redeem_batches(
+    condition_ids: List[str],
+    max_per_batch: int = REDEEM_MAX_PER_BATCH,
+    gas_per_redeem: int = REDEEM_GAS_PER_CALL,
+    max_batch_gas: int = REDEEM_MAX_BATCH_GAS,
+    max_batch_bytes: int = REDEEM_MAX_BATCH_BYTES,
+) -> List[List[str]]:
+    """
+    Divide i conditionId in batch per il relayer: ogni batch rispetta il numero massimo di tx,
+    il gas stimato (gas_per_redeem per tx) e la dimensione del payload. L'ordine resta quello
+    ricevuto (claim_planner.plan_claims lo ordina per valore).
+    """
+    per_batch = redeem_batch_size(max_per_batch, gas_per_redeem, max_batch_gas, max_batch_bytes)
+    return [condition_ids[i:i + per_batch] for i in range(0, len(condition_ids), per_batch)]
+
+
+@dataclass
+class RedeemBatchReport:
+    """Esito di execute_redeem_batches. `requests` = chiamate al relayer (quota giornaliera)."""
+    requests: int = 0
+    claimed: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    tx_hashes: List[str] = field(default_factory=list)
+    # conditionId → tx hash del batch che lo ha claimato (per il ledger)
+    claimed_tx: Dict[str, str] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    rate_limited: bool = False
+    reset_seconds: Optional[int] = None
+
+    @property
+    def claims_per_request(self) -> float:
+        return len(self.claimed) / self.requests if self.requests else 0.0
+
+
+def _is_rate_limit_error(err: str) -> bool:
+    err = err.lower()
+    return "429" in err or "quota exceeded" in err or "too many requests" in err
+
+
+# Errori causati da una tx del batch (revert, simulazione fallita): dividendo il batch si isola il
+# conditionId colpevole. 5xx, timeout, rete ed errori sconosciuti non dipendono dalle tx: dividere
+# moltiplicherebbe solo le richieste (fino a 2N-1 per un batch di N) durante un disservizio.
+_TX_ERROR_MARKERS = (
+    "revert", "simulation", "simulate", "estimategas", "estimate gas", "gas required exceeds",
+    "out of gas", "invalid opcode", "gs013",
+)
+
+
+def _is_tx_error(err: str) -> bool:
+    err = err.lower()
+    return any(marker in err for marker in _TX_ERROR_MARKERS)
+
+
+def _redeem_batches(
+    condition_ids: List[str],
+    report: "RedeemBatchReport",
+    max_per_batch: int,
+    gas_per_redeem: int,
+    max_batch_gas: int,
+    max_requests: Optional[int],
+) -> Generator[List[str], Dict[str, Any], None]:
+    """
+    Logica comune di execute_redeem_batches / aexecute_redeem_batches: generatore che
+    produce il prossimo chunk da inviare e riceve (send) il risultato di submit.
+    """
+    pending = deque(plan_redeem_batches(condition_ids, max_per_batch, gas_per_redeem, max_batch_gas))
+    while pending:
+        chunk = pending.popleft()
+        if max_requests is not None and report.requests >= max_requests:
+            report.skipped.extend(chunk)
+            continue
+        report.requests += 1
+        res = (yield chunk) or {"ok": False, "error": "Nessuna risposta dal relayer"}
+        if res.get("ok"):
+            RELAYER_REQUESTS.inc(outcome="ok")
+            CLAIMS.inc(len(chunk), via="relayer")
+            report.claimed.extend(chunk)
+            if is_tx_hash(res.get("transactionHash")):
+                report.tx_hashes.append(res["transactionHash"])
+                report.claimed_tx.update(dict.fromkeys(chunk, res["transactionHash"]))
+            continue
+        err = str(res.get("error") or "errore sconosciuto")
+        report.errors.append(err)
+        if res.get("rate_limited") or _is_rate_limit_error(err):
+            report.rate_limited = True
+            report.reset_seconds = res.get("reset_seconds")
+        RELAYER_REQUESTS.inc(outcome="rate_limited" if report.rate_limited else "error")
+        if report.rate_limited or res.get("fatal") or not (res.get("tx_error") or _is_tx_error(err)):
+            report.skipped.extend(chunk)
+            while pending:
+                report.skipped.extend(pending.popleft())
+            return
+        if len(chunk) == 1:
+            report.failed.extend(chunk)
+            continue
+        # Bisezione: le metà vanno in testa alla coda, nell'ordine originale
+        mid = len(chunk) // 2
+        pending.appendleft(chunk[mid:])
+        pending.appendleft(chunk[:mid])
+
+
+def execute_redeem_batches(
+    condition_ids: List[str],
+    submit: Callable[[List[str]], Dict[str, Any]],
+    max_per_batch: int = REDEEM_MAX_PER_BATCH,
+    gas_per_redeem: int = REDEEM_GAS_PER_CALL,
+    max_batch_gas: int = REDEEM_MAX_BATCH_GAS,
+    max_requests: Optional[int] = None,
+) -> RedeemBatchReport:
+    """
+    Invia i batch di plan_redeem_batches tramite submit(chunk) e, se un batch fallisce per colpa
+    di una tx (revert, simulazione fallita), lo divide a metà e ritenta le due metà: i conditionId
+    sani vengono comunque claimati e quelli che falliscono da soli finiscono in `failed`.
+    submit ritorna {"ok": bool, "transactionHash", "error", "rate_limited", "reset_seconds", "fatal",
+    "tx_error", "sent"}: con qualunque altro errore (429, fatal, 5xx, timeout, rete, sconosciuto) ci si
+    ferma senza bisezione e i conditionId rimanenti finiscono in `skipped` (si riprova al ciclo
+    successivo). "sent": False = nessuna richiesta HTTP partita (configurazione, Node mancante): chi
+    tiene la quota relayer non la addebita. max_requests limita le chiamate al relayer.
+    """
+    report = RedeemBatchReport()
+    steps = _redeem_batches(condition_ids, report, max_per_batch, gas_per_redeem, max_batch_gas, max_requests)
+    try:
+        chunk = next(steps)
+        while True:
+            chunk = steps.send(submit(chunk))
+    except StopIteration:
+        pass
+    return report
+
+
+async def aexecute_redeem_batches(
+    condition_ids: List[str],
+    submit: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+    max_per_batch: int = REDEEM_MAX_PER_BATCH,
+    gas_per_redeem: int = REDEEM_GAS_PER_CALL,
+    max_batch_gas: int = REDEEM_MAX_BATCH_GAS,
+    max_requests: Optional[int] = None,
+) -> RedeemBatchReport:
+    """execute_redeem_batches con submit asincrono (await submit(chunk))."""
+    report = RedeemBatchReport()
+    steps = _redeem_batches(condition_ids, report, max_per_batch, gas_per_redeem, max_batch_gas, max_requests)
+    try:
+        chunk = next(steps)
+        while True:
+            chunk = steps.send(await submit(chunk))
+    except StopIteration:
+        pass
+    return report
+
+
+def relayer_batch_submitter(
+    tx_by_condition_id: Dict[str, Dict[str, str]],
+    private_key: str,
+    builder_key: str,
+    builder_secret: str,
+    builder_passphrase: str,
+) -> Callable[[List[str]], Dict[str, Any]]:
+    """submit per execute_redeem_batches sul Relayer Python (Safe): tx già costruite per conditionId."""
+    def submit(chunk: List[str]) -> Dict[str, Any]:
+        txs = [tx_by_condition_id[cid] for cid in chunk]
+        results = execute_redeem_via_relayer(txs, private_key, builder_key, builder_secret, builder_passphrase)
+        if not results:
+            return {"ok": False, "error": "Relayer: credenziali mancanti", "fatal": True, "sent": False}
+        result = results[0]
+        err = result.get("error")
+        if err:
+            # Errori di configurazione, prima di inviare il batch: inutile dividerlo e niente quota spesa
+            fatal = err.startswith(("Relayer non disponibile", "BuilderConfig", "Relayer supporta solo Safe"))
+            return {"ok": False, "error": err, "fatal": fatal, "sent": not fatal}
+        # Senza hash on-chain (tx non ancora minata) resta solo l'ID del relayer: non è un tx hash
+        tx_hash = result.get("transactionHash")
+        return {"ok": True, "transactionHash": tx_hash if is_tx_hash(tx_hash) else None,
+                "transactionID": result.get("transactionID")}
+    return submit
+
+
+def _position_condition_id(p: Dict[str, Any]) -> str:
+    return (p.get("conditionId") or p.get("condition_id") or "").strip()
+
+
+def iter_unique_condition_ids(positions: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Come get_unique_condition_ids ma in streaming (accetta anche il generatore di iter_redeemable_positions)."""
     seen = set()
-    out = []
     for p in positions:
-        cid = (p.get("conditionId") or p.get("condition_id") or "").strip()
+        cid = _position_condition_id(p)
         if cid and cid not in seen:
             seen.add(cid)
-            out.append(cid)
-    return out
+            yield cid
+
+
+def get_unique_condition_ids(positions: List[Dict[str, Any]]) -> List[str]:
+    """Estrae conditionId unici dalla lista di posizioni (per una redeem per condition)."""
+    return list(iter_unique_condition_ids(positions))
 
 
 def try_claim_via_clob_sell(
@@ -178,9 +626,13 @@ def try_claim_via_clob_sell(
     """
     Tenta di "claimare" vendendo le quote vincenti su CLOB a 0.99 (mercato risolto ≈ 1$).
     Funziona con account Magic/Proxy. Per ogni posizione: token_id = asset, SELL size @ 0.99.
+    Gli ordini vengono firmati e inviati in blocco (executor.place_orders_bulk, POST /orders).
     Ritorna lista di {"ok": True/False, "title": str, "error": str opzionale}.
     """
-    results = []
+    from py_clob_client.clob_types import OrderArgs
+
+    results: List[Optional[Dict[str, Any]]] = []
+    orders, index = [], []
     for pos in positions:
         token_id = (pos.get("asset") or pos.get("tokenId") or "").strip()
         size = pos.get("size") or pos.get("currentValue") or 0
@@ -188,16 +640,28 @@ def try_claim_via_clob_sell(
         if not token_id or not size or float(size) < 0.01:
             results.append({"ok": False, "title": title, "error": "asset/size mancanti"})
             continue
+        # CLOB: size in quote (shares); prezzo 0.99 per outcome risolto vincente
+        orders.append(OrderArgs(token_id=token_id, price=0.99, size=float(size), side="SELL"))
+        index.append(len(results))
+        results.append({"ok": False, "title": title})
+    if not orders:
+        return results
+
+    if hasattr(executor, "place_orders_bulk"):
         try:
-            size_f = float(size)
-            # CLOB: size in quote (shares); prezzo 0.99 per outcome risolto vincente
-            out = executor.place_limit_order(
-                token_id=token_id,
-                side="SELL",
-                size=size_f,
-                price=0.99,
-            )
-            results.append({"ok": out is not None, "title": title, "order": out})
+            replies = executor.place_orders_bulk(orders)
+        except Exception as e:
+            replies = [{"ok": False, "error": str(e)} for _ in orders]
+        for i, reply in zip(index, replies):
+            results[i].update({"ok": reply["ok"], "order": reply})
+            if not reply["ok"]:
+                results[i]["error"] = reply.get("error") or "ordine rifiutato"
+        return results
+
+    for i, order in zip(index, orders):
+        try:
+            out = executor.place_limit_order(token_id=order.token_id, side="SELL", size=order.size, price=order.price)
+            results[i].update({"ok": out is not None, "order": out})
         except Exception as e:
-            results.append({"ok": False, "title": title, "error": str(e)})
+            results[i]["error"] = str(e)
     return results
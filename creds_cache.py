@@ -0,0 +1,98 @@
+"""
+Cache locale cifrata delle credenziali L2 CLOB (api key / secret / passphrase).
+
+Senza POLYMARKET_API_KEY/SECRET/PASSPHRASE ogni avvio chiamava create_or_derive_api_creds():
+firma L1 + una o due richieste via proxy prima di poter fare qualsiasi chiamata autenticata.
+Qui le credenziali derivate restano su file e si riusano ai riavvii:
+- AES-256-GCM (pycryptodome) con chiave = HMAC-SHA256(chiave privata, etichetta): leggibile solo
+  da chi ha già la chiave privata del wallet, nessuna password in più da gestire;
+- un record per (indirizzo, funder, host, chain, signature_type), legato come dati autenticati:
+  un record copiato su un altro wallet/host non si decifra;
+- file scritto in modo atomico con permessi 0600; clear() su 401 (credenziali revocate).
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+_KEY_LABEL = b"polybot/clob-l2-creds/v1"
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+class CredsCache:
+    """Credenziali L2 cifrate su `path` per la chiave privata `private_key`."""
+
+    def __init__(self, path: str, private_key: str):
+        self.path = path
+        raw_key = bytes.fromhex(private_key.strip().removeprefix("0x"))
+        self._key = hmac.new(raw_key, _KEY_LABEL, hashlib.sha256).digest()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _context(address: str, funder: str, host: str, chain_id: int, signature_type: int) -> bytes:
+        return f"{address.lower()}|{funder.lower()}|{host.rstrip('/')}|{chain_id}|{signature_type}".encode()
+
+    def _slot(self, context: bytes) -> str:
+        return hmac.new(self._key, context, hashlib.sha256).hexdigest()[:24]
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, state: Dict) -> None:
+        tmp = self.path + ".tmp"
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"  ⚠️  Cache credenziali CLOB non salvata ({self.path}): {e}")
+
+    def load(self, address: str, funder: str, host: str, chain_id: int, signature_type: int) -> Optional[Dict[str, str]]:
+        """{"api_key", "api_secret", "api_passphrase"} o None (assente, di un altro wallet o manomesso)."""
+        from Crypto.Cipher import AES
+
+        context = self._context(address, funder, host, chain_id, signature_type)
+        rec = (self._read().get("entries") or {}).get(self._slot(context))
+        if not isinstance(rec, dict):
+            return None
+        try:
+            cipher = AES.new(self._key, AES.MODE_GCM, nonce=base64.b64decode(rec["n"]))
+            cipher.update(context)
+            plain = cipher.decrypt_and_verify(base64.b64decode(rec["c"]), base64.b64decode(rec["t"]))
+            creds = json.loads(plain)
+            return {k: str(creds[k]) for k in ("api_key", "api_secret", "api_passphrase")}
+        except (KeyError, ValueError, TypeError):
+            return None
+
+    def save(self, creds: Dict[str, str], address: str, funder: str, host: str, chain_id: int, signature_type: int) -> None:
+        from Crypto.Cipher import AES
+
+        context = self._context(address, funder, host, chain_id, signature_type)
+        cipher = AES.new(self._key, AES.MODE_GCM, nonce=os.urandom(12))
+        cipher.update(context)
+        ct, tag = cipher.encrypt_and_digest(json.dumps(creds).encode())
+        with self._lock:
+            state = self._read()
+            state.setdefault("entries", {})[self._slot(context)] = {"n": _b64(cipher.nonce), "c": _b64(ct), "t": _b64(tag)}
+            state["v"] = 1
+            self._write(state)
+
+    def clear(self, address: str, funder: str, host: str, chain_id: int, signature_type: int) -> None:
+        context = self._context(address, funder, host, chain_id, signature_type)
+        with self._lock:
+            state = self._read()
+            if (state.get("entries") or {}).pop(self._slot(context), None) is not None:
+                self._write(state)
@@ -0,0 +1,457 @@
+"""
+Ciclo di claim asincrono (asyncio): balance, posizioni e relayer con I/O sovrapposto.
+
+- la balance CLOB (via proxy) gira in parallelo a fetch posizioni + claim: il ciclo dura
+  quanto la catena più lenta, non la somma di tutte le chiamate;
+- posizioni paginate su httpx.AsyncClient (prefetch come task sulla stessa loop), confrontate con
+  quelle del ciclo precedente (positions.PositionSnapshot): calldata, log e claim solo sul delta;
+- claim Magic su daemon Node asincrono (asyncio.create_subprocess_exec), avviato in
+  parallelo al fetch così il warm-up di Node non pesa sul ciclo;
+- ogni fase ha il suo timeout.
+check_cash.main e check_cash.run_one_cycle sono wrapper sincroni di ClaimCycle.run_cycle.
+"""
+
+import asyncio
+import math
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from claims import (
+    POSITIONS_PAGE_SIZE,
+    REDEEM_GAS_PER_CALL,
+    REDEEM_MAX_BATCH_GAS,
+    REDEEM_MAX_PER_BATCH,
+    aexecute_redeem_batches,
+    aiter_redeemable_positions,
+    build_redeem_tx,
+    relayer_batch_submitter,
+    try_claim_via_clob_sell,
+)
+from claim_planner import plan_claims, value_report
+from ledger import CONFIRMED, FAILED, PENDING
+from metrics import CLAIM_VALUE_LEFT, CLAIMABLE_USDC, CLAIMS, CYCLE_SECONDS, POSITION_CHANGES, STAGE_SECONDS, STAGE_TIMEOUTS
+from positions import PositionSnapshot
+
+
+class StageTimeout(TimeoutError):
+    """Una fase del ciclo (balance, posizioni, relayer) ha superato il suo timeout."""
+
+
+def fmt_duration(seconds: float) -> str:
+    h, r = divmod(int(seconds), 3600)
+    return f"{h}h {r // 60}m" if h else f"{r // 60}m {r % 60}s"
+
+
+async def _stage(name: str, aw, timeout: float, metric: Optional[str] = None):
+    t0 = time.perf_counter()
+    try:
+        return await asyncio.wait_for(aw, timeout)
+    except asyncio.TimeoutError:
+        STAGE_TIMEOUTS.inc(stage=metric or name)
+        raise StageTimeout(f"{name}: timeout dopo {timeout:.0f}s") from None
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage=metric or name)
+
+
+class ClaimCycle:
+    """
+    Stato condiviso tra i cicli (client HTTP, daemon Node, quota) + run_cycle().
+    Va usato da una sola event loop e chiuso con aclose().
+    """
+
+    def __init__(
+        self,
+        ex,
+        poly_safe: str,
+        try_relayer: bool,
+        try_clob_sell: bool,
+        signature_type: int = 0,
+        quota=None,
+        ledger=None,
+        claim_state=None,
+        page_size: int = POSITIONS_PAGE_SIZE,
+        prefetch: int = 2,
+        max_per_batch: int = REDEEM_MAX_PER_BATCH,
+        gas_per_redeem: int = REDEEM_GAS_PER_CALL,
+        max_batch_gas: int = REDEEM_MAX_BATCH_GAS,
+        min_value: float = 0.0,
+        min_batch_value: float = 0.0,
+        balance_timeout: float = 30.0,
+        positions_timeout: float = 120.0,
+        relayer_timeout: float = 180.0,
+    ):
+        self.ex = ex
+        self.poly_safe = poly_safe
+        self.try_relayer = try_relayer
+        self.try_clob_sell = try_clob_sell
+        self.signature_type = signature_type
+        self.quota = quota
+        self.ledger = ledger
+        self.claim_state = claim_state
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.max_per_batch = max_per_batch
+        self.gas_per_redeem = gas_per_redeem
+        self.max_batch_gas = max_batch_gas
+        # Soglie del piano claim per valore (claim_planner): USDC per conditionId e per richiesta
+        self.min_value = min_value
+        self.min_batch_value = min_batch_value
+        self.balance_timeout = balance_timeout
+        self.positions_timeout = positions_timeout
+        self.relayer_timeout = relayer_timeout
+
+        self.builder_key = (os.getenv("BUILDER_API_KEY") or os.getenv("BUILDER_KEY") or "").strip()
+        self.builder_secret = (os.getenv("BUILDER_SECRET") or os.getenv("BUILDER_API_SECRET") or "").strip()
+        self.builder_pp = (os.getenv("BUILDER_PASSPHRASE") or os.getenv("BUILDER_PASS_PHRASE") or "").strip()
+        pk = (os.getenv("PRIVATE_KEY") or "").strip()
+        if pk and not pk.startswith("0x"):
+            pk = "0x" + pk
+        self.pk = pk
+
+        # conditionId → outcomeIndex posseduti (per il rilevamento eventi, vedi refresh_held)
+        self.held: Dict[str, Set[int]] = {}
+        # Posizioni del ciclo precedente (si lavora sul delta) e tx di redeem già costruite per conditionId
+        self.snapshot = PositionSnapshot()
+        self._txs: Dict[str, Dict[str, str]] = {}
+        self._http = None
+        self._daemon = None
+        self._warm_task = None
+
+    @property
+    def relayer_ready(self) -> bool:
+        return bool(self.try_relayer and self.builder_key and self.builder_secret and self.builder_pp and self.pk)
+
+    def _http_client(self):
+        if self._http is None:
+            from http_clients import registry
+            # Per i claim NON serve proxy: Data API accessibile direttamente
+            self._http = registry.get_async("data-api")
+        return self._http
+
+    def _claim_proxy(self):
+        if self._daemon is None:
+            from claim_proxy import AsyncClaimProxyDaemon
+            self._daemon = AsyncClaimProxyDaemon()
+        return self._daemon
+
+    async def _balance(self) -> Optional[float]:
+        try:
+            balance = await _stage("balance", asyncio.to_thread(self.ex.get_balance), self.balance_timeout)
+        except Exception as e:
+            print(f"  ⚠️  Balance non disponibile: {e}", flush=True)
+            return None
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Cash: {balance:.2f} USDC", flush=True)
+        return balance
+
+    async def _warm_daemon(self) -> None:
+        """Avvia Node mentre si scaricano le posizioni (errori riportati poi dal submit)."""
+        try:
+            await self._claim_proxy().start()
+        except Exception:
+            pass
+
+    async def _collect_positions(self, build_txs: bool) -> Dict:
+        """
+        Posizioni in streaming confrontate con lo snapshot del ciclo precedente: calldata, stampa e
+        claim riguardano solo i conditionId aperti (nuovi, cambiati o non ancora claimati).
+        Le tx di redeem si costruiscono mentre arrivano le pagine, una volta per conditionId.
+        """
+        snapshot = self.snapshot
+        calldata_s = 0.0
+        snapshot.begin()
+        stream = aiter_redeemable_positions(
+            self.poly_safe, self._http_client(), self.page_size, self.prefetch, pages=snapshot.pages
+        )
+        try:
+            async for pos in stream:
+                cid = snapshot.observe(pos)
+                if build_txs and cid is not None and cid not in self._txs:
+                    t0 = time.perf_counter()
+                    self._txs[cid] = build_redeem_tx(cid)
+                    calldata_s += time.perf_counter() - t0
+        except BaseException:
+            snapshot.abort()
+            raise
+        delta = snapshot.commit()
+        for cid in delta.gone:
+            self._txs.pop(cid, None)
+        for kind in ("added", "removed", "changed"):
+            if getattr(delta, kind):
+                POSITION_CHANGES.inc(len(getattr(delta, kind)), kind=kind)
+        if calldata_s:
+            STAGE_SECONDS.observe(calldata_s, stage="calldata")
+        return {"n": len(snapshot), "delta": delta, "condition_ids": snapshot.open_ids()}
+
+    def _submitter(self, condition_ids, txs, amounts=None):
+        """submit asincrono per aexecute_redeem_batches (None se il relayer non è utilizzabile)."""
+        if self.signature_type == 1:
+            # Account Magic (Proxy): il Relayer Python non supporta Proxy → daemon Node con PROXY
+            from claim_proxy import DEFAULT_SCRIPT
+            if not os.path.isfile(DEFAULT_SCRIPT):
+                print("  Script claim-proxy/claim-proxy.mjs non trovato. Per account Magic: cd claim-proxy && npm install")
+                return None
+            print("  Tentativo claim via Relayer PROXY (Node)...")
+            daemon_submit = self._claim_proxy().submit
+            stage = "relayer_node"
+        else:
+            # Safe wallet: Relayer Python (sincrono) in un thread, tx già costruite durante il fetch
+            print("  Tentativo batch claim via Relayer (Python)...")
+            sync_submit = relayer_batch_submitter(
+                dict(zip(condition_ids, txs)), self.pk, self.builder_key, self.builder_secret, self.builder_pp
+            )
+            daemon_submit = lambda chunk: asyncio.to_thread(sync_submit, chunk)
+            stage = "relayer"
+        quota, ledger = self.quota, self.ledger
+
+        async def submit(chunk):
+            try:
+                res = await _stage("relayer", daemon_submit(chunk), self.relayer_timeout, stage)
+            except StageTimeout as e:
+                # Esito sconosciuto: niente bisezione né altri batch in questo ciclo.
+                # Nel ledger come pending senza hash: non si rimanda finché non scade il TTL.
+                if quota is not None:
+                    quota.spend()
+                if ledger is not None:
+                    ledger.record(chunk, PENDING, owner=self.poly_safe, amounts=amounts)
+                return {"ok": False, "error": str(e), "fatal": True}
+            # Quota addebitata solo se la richiesta è partita (non per configurazione/Node mancante)
+            if quota is not None and res.get("sent", True):
+                quota.spend()
+            if ledger is not None and res.get("ok"):
+                ledger.record(chunk, PENDING, res.get("transactionHash"), owner=self.poly_safe, amounts=amounts,
+                              relayer_id=res.get("transactionID"))
+            return res
+        return submit
+
+    async def _reconcile_ledger(self) -> None:
+        """Aggiorna i claim pending del ledger (receipt on-chain) in parallelo al fetch posizioni."""
+        try:
+            counts = await asyncio.to_thread(self.ledger.reconcile, self.claim_state)
+        except Exception as e:
+            print(f"  ⚠️  Ledger: {e}", flush=True)
+            return
+        if any(counts.values()):
+            print(
+                f"  Ledger: {counts[CONFIRMED]} claim confermati, {counts[FAILED]} falliti, "
+                f"{counts['expired']} scaduti senza conferma",
+                flush=True,
+            )
+
+    async def run_cycle(self) -> int:
+        """
+        Un ciclo: balance ∥ (posizioni → claim relayer → fallback CLOB).
+        Returns: secondi da attendere prima del prossimo ciclo (0 = intervallo di default).
+        """
+        print("  [cycle] Balance e claim...", flush=True)
+        t0 = time.perf_counter()
+        balance_task = asyncio.create_task(self._balance())
+        if self.relayer_ready and self.signature_type == 1 and self._warm_task is None:
+            self._warm_task = asyncio.create_task(self._warm_daemon())
+        try:
+            return await self._claims()
+        finally:
+            await balance_task
+            CYCLE_SECONDS.observe(time.perf_counter() - t0)
+
+    async def _redeem(self, condition_ids, txs, amounts) -> Tuple[int, Optional[int]]:
+        """
+        Claim via relayer dei conditionId (tx già costruite per i Safe).
+        Ritorna (claim riusciti, secondi di attesa se quota esaurita/rate limit, altrimenti None).
+        """
+        claimed = 0
+        submit = self._submitter(condition_ids, txs, amounts)
+        quota = self.quota
+        tokens = quota.available() if quota is not None else None
+        if submit is not None and tokens is not None and tokens <= 0:
+            wait = quota.seconds_until_available()
+            print(f"  ⏱️  Quota Relayer: {quota.used()}/{quota.capacity} richieste usate nelle 24h. Prossima richiesta tra {fmt_duration(wait)}", flush=True)
+            return 0, max(1, math.ceil(wait))
+        if submit is not None:
+            # Con quota scarsa prima i mercati che valgono di più (amounts vuoto = ordine invariato)
+            plan = plan_claims(
+                condition_ids,
+                amounts,
+                tokens,
+                min_value=self.min_value,
+                min_batch_value=self.min_batch_value,
+                max_per_batch=self.max_per_batch,
+                gas_per_redeem=self.gas_per_redeem,
+                max_batch_gas=self.max_batch_gas,
+            )
+            if plan.known:
+                print(f"  Piano claim per valore: {plan.summary()}", flush=True)
+            report = await aexecute_redeem_batches(
+                plan.order,
+                submit,
+                max_per_batch=self.max_per_batch,
+                gas_per_redeem=self.gas_per_redeem,
+                max_batch_gas=self.max_batch_gas,
+                max_requests=tokens,
+            )
+            claimed = len(report.claimed)
+            # Sotto soglia: si riconsiderano solo se le loro posizioni cambiano. Senza ledger anche i
+            # claim inviati si chiudono (altrimenti si rimanderebbero finché l'indexer non li toglie)
+            self.snapshot.close(plan.below_min)
+            if self.ledger is None:
+                self.snapshot.close(report.claimed)
+            if plan.known:
+                values = value_report(plan, report)
+                print(f"  Valore: {values.summary()}", flush=True)
+                CLAIM_VALUE_LEFT.set(values.below_min, wallet=self.poly_safe, reason="below_min")
+                CLAIM_VALUE_LEFT.set(values.deferred, wallet=self.poly_safe, reason="deferred")
+                CLAIM_VALUE_LEFT.set(values.failed, wallet=self.poly_safe, reason="failed")
+            if claimed:
+                print(
+                    f"  ✓ Batch claim riusciti: {claimed} mercati in {len(report.tx_hashes)} tx "
+                    f"({report.requests} richieste relayer, {report.claims_per_request:.1f} claim/richiesta)",
+                    flush=True,
+                )
+                for tx_hash in report.tx_hashes:
+                    print(f"    tx: {tx_hash}")
+            if report.failed:
+                print(f"  ⚠️  {len(report.failed)} conditionId falliscono anche da soli (esclusi dal batch):")
+                for cid in report.failed[:10]:
+                    print(f"    {cid}")
+            if report.rate_limited and quota is not None:
+                # Reset comunicato dal server: si riprova esattamente allo scadere
+                blocked = quota.on_rate_limited(report.reset_seconds)
+                print(f"  ⚠️  Rate limit Relayer: quota esaurita. Reset tra ~{fmt_duration(blocked)}", flush=True)
+                return claimed, max(1, math.ceil(blocked))
+            if report.skipped and quota is not None:
+                wait = quota.seconds_until_available()
+                print(f"  ⏱️  Quota Relayer: {len(report.skipped)} claim rimandati, prossima richiesta tra {fmt_duration(wait)}", flush=True)
+                if wait > 0:
+                    return claimed, max(1, math.ceil(wait))
+            if report.errors and not claimed:
+                print(f"  Relayer: {report.errors[-1][:200]}", flush=True)
+        return claimed, None
+
+    async def refresh_held(self) -> int:
+        """Aggiorna self.held da tutte le posizioni del wallet (anche non risolte). Ritorna i mercati posseduti."""
+        held: Dict[str, Set[int]] = {}
+        stream = aiter_redeemable_positions(
+            self.poly_safe, self._http_client(), self.page_size, self.prefetch, redeemable=False,
+            pages=self.snapshot.pages,
+        )
+        async for pos in stream:
+            cid = (pos.get("conditionId") or pos.get("condition_id") or "").strip().lower()
+            if cid and float(pos.get("size") or 0) > 0:
+                held.setdefault(cid, set()).add(int(pos.get("outcomeIndex") or 0))
+        self.held = held
+        return len(held)
+
+    async def claim_resolved(self, condition_ids: List[str]) -> int:
+        """
+        Claim immediato di conditionId appena risolti (dagli eventi on-chain), senza passare dalla Data API.
+        Ritorna i secondi da attendere se la quota è esaurita (0 altrimenti).
+        """
+        if not self.relayer_ready:
+            return 0
+        if self.ledger is not None:
+            condition_ids, _ = self.ledger.filter_claimable(condition_ids, owner=self.poly_safe)
+        if not condition_ids:
+            return 0
+        print(f"  ⚡ Mercati risolti on-chain: {len(condition_ids)} da claimare", flush=True)
+        txs = [build_redeem_tx(cid) for cid in condition_ids] if self.signature_type != 1 else []
+        _, wait = await self._redeem(condition_ids, txs, {})
+        return wait or 0
+
+    def on_redemptions(self, redemptions) -> int:
+        """PayoutRedemption del wallet visti on-chain → claim confermati nel ledger."""
+        if self.ledger is None or not redemptions:
+            return 0
+        for r in redemptions:
+            self.ledger.record([r.condition_id], CONFIRMED, r.tx_hash, owner=self.poly_safe)
+            self.held.pop(r.condition_id, None)
+        return len(redemptions)
+
+    async def _claims(self) -> int:
+        claimed_relayer = 0
+        ok_count = 0
+        # Safe wallet: le tx di redeem si costruiscono mentre arrivano le pagine di posizioni
+        build_txs = self.relayer_ready and self.signature_type != 1
+        reconcile_task = asyncio.create_task(self._reconcile_ledger()) if self.ledger is not None else None
+        try:
+            found = await _stage("positions", self._collect_positions(build_txs), self.positions_timeout)
+        finally:
+            if reconcile_task is not None:
+                await reconcile_task
+        snapshot, delta = self.snapshot, found["delta"]
+        n_positions, condition_ids = found["n"], found["condition_ids"]
+        if not n_positions:
+            CLAIMABLE_USDC.set(0, wallet=self.poly_safe)
+            print("  Claim disponibili: 0", flush=True)
+            return 0
+        # Log solo delle differenze: le posizioni già viste (es. claimate ma ancora in elenco) non si ristampano
+        if not delta.empty:
+            print(f"  Posizioni claimabili: {n_positions} ({delta.summary()})", flush=True)
+            for pos in delta.added[:15]:
+                title = (pos.get("title") or pos.get("slug") or "—")[:55]
+                size = pos.get("size") or pos.get("currentValue") or 0
+                print(f"    • {title}: {size:.2f} share")
+            if len(delta.added) > 15:
+                print(f"    ... e altre {len(delta.added) - 15} nuove")
+        if not condition_ids:
+            CLAIMABLE_USDC.set(0, wallet=self.poly_safe)
+            print(f"  Nessun claim aperto ({n_positions} posizioni già gestite)", flush=True)
+            return 0
+
+        # La Data API riporta ancora come redeemable i claim appena inviati: si saltano quelli nel ledger
+        if self.ledger is not None:
+            condition_ids, in_flight = self.ledger.filter_claimable(condition_ids, owner=self.poly_safe)
+            if in_flight:
+                # Confermati on-chain: chiusi nello snapshot (restano in elenco finché l'indexer non li toglie)
+                confirmed = []
+                for cid in in_flight:
+                    entry = self.ledger.get(cid, owner=self.poly_safe)
+                    if entry is not None and entry.state == CONFIRMED:
+                        confirmed.append(cid)
+                snapshot.close(confirmed)
+                print(f"  Ledger: {len(in_flight)} mercati già inviati/confermati, in attesa dell'indexer (saltati)", flush=True)
+            if not condition_ids:
+                CLAIMABLE_USDC.set(0, wallet=self.poly_safe)
+                return 0
+        amounts = snapshot.value
+        txs = [self._txs.get(cid) or build_redeem_tx(cid) for cid in condition_ids] if build_txs else []
+        CLAIMABLE_USDC.set(sum(amounts.get(cid, 0.0) for cid in condition_ids), wallet=self.poly_safe)
+        print(f"  Claim disponibili: {len(condition_ids)} mercato/i — {n_positions} posizioni", flush=True)
+
+        # Batch relayer: i conditionId vengono divisi in chunk (gas/dimensione/max per batch);
+        # un chunk che fallisce viene diviso a metà per isolare i conditionId che fanno fallire il batch.
+        # Quota esaurita / rate limit: l'attesa si restituisce a fine ciclo, dopo fallback CLOB e avviso
+        wait = None
+        if self.relayer_ready:
+            claimed_relayer, wait = await self._redeem(condition_ids, txs, amounts)
+        elif self.try_relayer and not (self.builder_key and self.builder_secret and self.builder_pp):
+            print("  Claim non eseguiti: mancano BUILDER_API_KEY, BUILDER_SECRET, BUILDER_PASSPHRASE in .env")
+
+        # 2) Fallback: claim via CLOB SELL (solo se abilitato; di solito non funziona per mercati già risolti)
+        positions = snapshot.positions_for(condition_ids) if self.try_clob_sell else []
+        if positions:
+            sell_results = await asyncio.to_thread(try_claim_via_clob_sell, positions, self.ex)
+            ok_count = sum(1 for r in sell_results if r.get("ok"))
+            if ok_count:
+                CLAIMS.inc(ok_count, via="clob")
+                for r in sell_results:
+                    if r.get("ok"):
+                        print(f"  Claim OK (CLOB): {r.get('title', '—')}")
+
+        # Se ci sono ancora claim non eseguiti, avvisa
+        if n_positions and claimed_relayer == 0 and not (self.try_clob_sell and ok_count > 0):
+            print("  → Fai claim manuale su polymarket.com → Portfolio → clicca Claim sui mercati risolti.")
+
+        return wait or 0  # 0 = wait time di default
+
+    async def aclose(self) -> None:
+        if self._warm_task is not None:
+            await self._warm_task
+            self._warm_task = None
+        if self._http is not None:
+            from http_clients import registry
+            await registry.aclose_loop()
+            self._http = None
+        if self._daemon is not None:
+            await self._daemon.aclose()
+            self._daemon = None
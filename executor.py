@@ -3,26 +3,72 @@ Execution Layer for Polymarket Bot
 Handles order placement and management using py-clob-client
 """
 
+import atexit
+import functools
 import os
+import threading
 import time
+from dataclasses import dataclass, field, replace
 
 # Timeout richieste HTTP (proxy può essere lento); rispettato dove usiamo httpx con timeout=30
 if "HTTPX_TIMEOUT" not in os.environ:
     os.environ["HTTPX_TIMEOUT"] = "30"
 from urllib.parse import urlparse, quote_plus
-from typing import Dict, Optional, List, Tuple
-from py_clob_client.client import ClobClient
-from py_clob_client.clob_types import OrderArgs
-from py_clob_client.order_builder.constants import BUY, SELL
-from py_clob_client.exceptions import PolyApiException
-from py_clob_client.headers import headers as _poly_headers
-from web3 import Web3
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
+from typing import TYPE_CHECKING, Dict, Optional, List, Tuple
+# py_clob_client (≈1 s di import: eth_account, eth_keyfile, py_ecc...) si importa al primo uso
+from retries import (
+    CLOB_ORDER_POLICY, CLOB_READ_POLICY, CONNECT, FORBIDDEN, NETWORK, NOT_SENT, PROXY, REGIONAL, TIMEOUT,
+    CircuitOpenError, classify, engine as retry_engine,
+)
+from metrics import ORDERS, STAGE_SECONDS
 
+if TYPE_CHECKING:
+    from py_clob_client.clob_types import OrderArgs
+
+# Come py_clob_client.order_builder.constants
+BUY, SELL = "BUY", "SELL"
+
+
+CLOB_HOST = os.getenv("CLOB_HOST", "https://clob.polymarket.com")
+# Credenziali L2 derivate (senza POLYMARKET_API_*): cache cifrata tra un avvio e l'altro ("" = disattivata)
+CLOB_CREDS_CACHE = os.getenv(
+    "CLOB_CREDS_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".clob_creds.json")
+)
 
 # Paesi da provare per il proxy (come Replit): prima CH, poi gli altri
 PROXY_COUNTRIES = ["ch", "no", "se", "nl", "dk"]
 PROXY_COUNTRY_NAMES = {"ch": "Svizzera", "no": "Norvegia", "se": "Svezia", "nl": "Olanda", "dk": "Danimarca"}
+# Salute delle uscite per paese (proxy_pool), persistita tra gli avvii
+PROXY_POOL_STATE = os.getenv(
+    "PROXY_POOL_STATE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".proxy_pool.json")
+)
+
+# Cache dati di mercato (market_cache): TTL in secondi per orderbook/midpoint (0 = nessuna cache)
+MARKET_CACHE_TTL_ORDERBOOK = float(os.getenv("CLOB_CACHE_TTL_ORDERBOOK", "2"))
+MARKET_CACHE_TTL_MIDPOINT = float(os.getenv("CLOB_CACHE_TTL_MIDPOINT", "5"))
+MARKET_CACHE_MAX_ENTRIES = int(os.getenv("CLOB_CACHE_MAX_ENTRIES", "2048"))
+# Richieste batch (/midpoints, /books): token per richiesta e richieste in parallelo
+CLOB_BATCH_SIZE = int(os.getenv("CLOB_BATCH_SIZE", "100"))
+CLOB_BATCH_CONCURRENCY = int(os.getenv("CLOB_BATCH_CONCURRENCY", "4"))
+# Ordini in blocco (POST /orders): ordini per richiesta (limite CLOB 15) e processi di firma (0 = n. CPU)
+CLOB_ORDERS_BATCH_SIZE = int(os.getenv("CLOB_ORDERS_BATCH_SIZE", "15"))
+SIGNING_WORKERS = int(os.getenv("SIGNING_WORKERS", "0"))
+# Pipeline ordini (order_pipeline): ordini in attesa prima che submit() si blocchi e ordini per lotto di firma
+CLOB_PIPELINE_QUEUE = int(os.getenv("CLOB_PIPELINE_QUEUE", "1000"))
+CLOB_PIPELINE_SIGN_BATCH = int(os.getenv("CLOB_PIPELINE_SIGN_BATCH", "32"))
+# Letture singole leggere (tick size / neg risk / fee per token, poi in cache nel client): richieste in parallelo
+CLOB_META_CONCURRENCY = int(os.getenv("CLOB_META_CONCURRENCY", "16"))
+# Tick size / neg risk / fee per token usati per firmare (_order_options): secondi in cache tra una chiamata e l'altra
+CLOB_ORDER_OPTIONS_TTL = float(os.getenv("CLOB_ORDER_OPTIONS_TTL", "300"))
+# WebSocket canale market (market_stream): orderbook/midpoint dei token sottoscritti letti dal book locale
+CLOB_MARKET_WS_URL = os.getenv("CLOB_MARKET_WS_URL", "wss://ws-subscriptions-clob.polymarket.com/ws/market")
+# Ordini aperti (orders.OrderTracker): canale WebSocket user e ogni quanti secondi riconciliare con
+# GET /data/orders (ORDERS_POLL_SECONDS senza canale user: gli eseguiti si vedono solo dal REST)
+CLOB_USER_WS_URL = os.getenv("CLOB_USER_WS_URL", "wss://ws-subscriptions-clob.polymarket.com/ws/user")
+ORDERS_RECONCILE_SECONDS = float(os.getenv("ORDERS_RECONCILE_SECONDS", "60"))
+ORDERS_POLL_SECONDS = float(os.getenv("ORDERS_POLL_SECONDS", "5"))
+# Arbitraggio: tempo massimo (s) entro cui entrambe le gambe devono essere piazzate
+ARB_LEG_TIMEOUT = float(os.getenv("ARB_LEG_TIMEOUT", "20"))
 
 
 def _print_creds_for_env(creds) -> None:
@@ -49,6 +95,7 @@ def _apply_poly_address_override():
     funder = (os.getenv("POLY_SAFE_ADDRESS") or os.getenv("SAFE_ADDRESS") or "").strip()
     if not funder:
         return
+    from py_clob_client.headers import headers as _poly_headers
     _orig = _poly_headers.create_level_2_headers
 
     def _create_l2(signer, creds, request_args):
@@ -89,33 +136,41 @@ def _build_proxy_url(country: str, sticky_index: int = 0) -> Optional[str]:
     return f"http://{safe_user}:{safe_pwd}@{host}:{use_port}"
 
 
-def _patch_clob_client_proxy(proxy_url: str):
-    """Imposta il client HTTP CLOB per usare il proxy indicato (per piazzare ordine)."""
-    import httpx
-    import py_clob_client.http_helpers.helpers as _h
-    _h._http_client = httpx.Client(http2=True, proxy=proxy_url, timeout=30.0)
+_proxy_pool = None
+
+
+def _get_proxy_pool():
+    """Pool uscite per paese condiviso dagli executor (None se il proxy non è configurato)."""
+    global _proxy_pool
+    if _proxy_pool is None and _get_proxy_parts():
+        from proxy_pool import ProxyPool
+        _proxy_pool = ProxyPool(PROXY_COUNTRIES, _build_proxy_url, path=PROXY_POOL_STATE or None)
+        atexit.register(_proxy_pool.close)
+    return _proxy_pool
 
 
-def _get_saved_clob_client():
-    import py_clob_client.http_helpers.helpers as _h
-    return getattr(_h, "_http_client", None)
+def _promote_best_exit(pool) -> None:
+    """Uscita più affidabile nota del pool come uscita attiva (usata dagli executor senza proxy proprio)."""
+    best = pool.best_known()
+    if best is None or best == pool.active or pool.client(best) is None:
+        return
+    pool.active = best
+    print(f"  Proxy CLOB: uscita {PROXY_COUNTRY_NAMES.get(best, best)} (la più affidabile nel pool)")
 
 
-def _restore_clob_client(saved_client) -> None:
-    """Ripristina il client CLOB dopo i tentativi ordine con proxy per paese."""
-    import py_clob_client.http_helpers.helpers as _h
-    if saved_client is not None:
-        _h._http_client = saved_client
+def _routed(method):
+    """Le richieste py_clob_client del metodo escono dal client HTTP dell'executor (vedi _clob_http)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        from http_clients import use_clob_client
+        with use_clob_client(self._clob_http()):
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 def _is_request_exception(e: Exception) -> bool:
-    """True se è errore di connessione/rete (Request exception, status_code=None)."""
-    if isinstance(e, PolyApiException):
-        if getattr(e, "status_code", None) is None:
-            return True
-        return False
-    err = str(e).lower()
-    return "request exception" in err or "status_code=none" in err or "connection" in err or "timeout" in err
+    """True se è errore di connessione/rete/proxy (nessuna risposta HTTP dal CLOB)."""
+    return classify(e) in (CONNECT, NETWORK, TIMEOUT, PROXY)
 
 
 def _log_request_exception(e: Exception, context: str = "place_order") -> None:
@@ -123,7 +178,7 @@ def _log_request_exception(e: Exception, context: str = "place_order") -> None:
     print(f"\n  [DEBUG {context}]")
     print(f"    Tipo: {type(e).__name__}")
     print(f"    Messaggio: {str(e)}")
-    if isinstance(e, PolyApiException):
+    if hasattr(e, "status_code") and hasattr(e, "error_msg"):  # PolyApiException
         print(f"    status_code: {getattr(e, 'status_code', 'N/A')}")
         print(f"    error_msg: {getattr(e, 'error_msg', 'N/A')}")
     cause = getattr(e, "__cause__", None)
@@ -134,44 +189,110 @@ def _log_request_exception(e: Exception, context: str = "place_order") -> None:
         traceback.print_exc()
 
 
-def _clob_error_category(e: Exception) -> str:
-    """
-    Classifica l'errore CLOB per messaggi chiari e decisione retry.
-    Ritorna: "proxy_ruleset" (0x02), "regional_403" (403), "retryable", "other".
-    """
-    msg = str(e).lower()
-    cause = getattr(e, "__cause__", None)
-    while cause:
-        msg += " " + str(cause).lower()
-        cause = getattr(cause, "__cause__", None)
-    if "0x02" in msg or "ruleset" in msg:
-        return "proxy_ruleset"
-    if isinstance(e, PolyApiException) and getattr(e, "status_code", None) == 403:
-        return "regional_403"
-    if "403" in msg or "forbidden" in msg:
-        return "regional_403"
-    if "timeout" in msg or "connection" in msg or "temporarily" in msg:
-        return "retryable"
-    return "other"
-
-
-def _is_retryable_clob_error(e: Exception) -> bool:
-    """True se ha senso ritentare (no 403, no 0x02 proxy ruleset)."""
-    cat = _clob_error_category(e)
-    return cat in ("retryable", "other")
+def _is_regional_403(e: Exception) -> bool:
+    """403 per restrizione geografica (uscita proxy in un paese non consentito)."""
+    return classify(e) == REGIONAL
+
+
+def _parse_midpoint(result) -> Optional[float]:
+    """GET /midpoint: dict {"mid": "0.52"}, stringa o numero."""
+    if result is None:
+        return None
+    if isinstance(result, dict):
+        mid = result.get("mid") or result.get("price")
+        return float(mid) if mid is not None else None
+    return float(result)
+
+
+def _tick_size_str(tick) -> str:
+    """Tick size come chiave di ROUNDING_CONFIG ("0.01", "0.001", ...)."""
+    return f"{float(tick):g}"
 
 
 def _log_clob_error(context: str, token_id: str, e: Exception) -> None:
     """Stampa messaggio appropriato in base al tipo di errore."""
-    cat = _clob_error_category(e)
-    if cat == "proxy_ruleset":
-        print(f"Error {context} {token_id}: proxy SOCKS5 (0x02) — connessione non consentita dalle regole del proxy. Verifica provider.")
-    elif cat == "regional_403":
+    cat = classify(e)
+    if cat == PROXY:
+        print(f"Error {context} {token_id}: proxy ha rifiutato la connessione (es. SOCKS5 0x02, regole del proxy). Verifica provider.")
+    elif cat in (REGIONAL, FORBIDDEN):
         print(f"Error {context} {token_id}: 403 Forbidden — restrizione geografica o autenticazione. Usa proxy/VPN consentito.")
     else:
         print(f"Error {context} {token_id}: {e}")
 
 
+def _order_spec(order: "OrderArgs", options: Tuple[str, bool, int]) -> Tuple[tuple, float]:
+    """OrderSpec per signing.OrderSigner e prezzo usato (riportato entro [tick, 1 - tick])."""
+    tick, neg_risk, fee_rate = options
+    price = max(float(tick), min(1 - float(tick), float(order.price)))
+    side = BUY if str(order.side).upper() == "BUY" else SELL
+    return (order.token_id, price, float(order.size), side, fee_rate, order.nonce, order.expiration, tick, neg_risk), price
+
+
+def _sweep_price(book, side: str, size: float) -> Optional[float]:
+    """
+    Prezzo limite per eseguire subito `size` quote su un market_cache.CompactBook (BUY sugli ask,
+    SELL sui bid): il livello più lontano che serve, o l'ultimo se la liquidità non basta.
+    """
+    prices, sizes = (book.ask_prices, book.ask_sizes) if side == "BUY" else (book.bid_prices, book.bid_sizes)
+    total = 0.0
+    for price, level in zip(prices, sizes):
+        total += level
+        if total >= size:
+            return price
+    return prices[-1] if prices else None
+
+
+def _apply_order_reply(result: Dict, reply: Dict) -> None:
+    """Esito di un ordine dalla sua voce nella risposta di POST /orders (aggiorna result)."""
+    result["orderID"] = reply.get("orderID") or reply.get("orderId")
+    result["status"] = reply.get("status")
+    result["ok"] = bool(reply.get("success", True)) and not reply.get("errorMsg")
+    if not result["ok"]:
+        result["error"] = str(reply.get("errorMsg") or reply)
+
+
+@dataclass
+class LegResult:
+    """Una gamba di execute_arbitrage. Tempi in ms dall'avvio dell'arbitraggio."""
+    name: str
+    token_id: str
+    side: str
+    size: float
+    price: float
+    ok: bool = False
+    order_id: Optional[str] = None
+    status: Optional[str] = None
+    error: Optional[str] = None
+    sent_ms: float = 0.0
+    done_ms: float = 0.0
+    # "cancelled", "offset" (eseguito compensato con ordine opposto FAK), "partial" (compensato in parte), "failed"
+    unwind: Optional[str] = None
+    filled: float = 0.0     # quote eseguite prima dell'annullamento
+    exposure: float = 0.0   # quote eseguite rimaste scoperte dopo l'annullamento
+
+    @property
+    def latency_ms(self) -> float:
+        return self.done_ms - self.sent_ms
+
+
+@dataclass
+class ArbitrageReport:
+    """Esito di execute_arbitrage; bool(report) è True solo se entrambe le gambe sono piazzate."""
+    action: str
+    legs: List[LegResult] = field(default_factory=list)
+    ok: bool = False
+    elapsed_ms: float = 0.0
+
+    @property
+    def leg_skew_ms(self) -> Optional[float]:
+        """Distanza tra la conferma delle due gambe: la finestra in cui si è esposti su una sola."""
+        done = [l.done_ms for l in self.legs if l.done_ms]
+        return max(done) - min(done) if len(done) == 2 else None
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+
 class OrderExecutor:
     """Handles order execution on Polymarket"""
     
@@ -181,7 +302,10 @@ class OrderExecutor:
         api_secret: str,
         api_passphrase: str,
         private_key: str,
-        signature_type: int = 0
+        signature_type: int = 0,
+        proxy_url: Optional[str] = None,
+        http_client=None,
+        lazy_client: bool = False,
     ):
         """
         Initialize order executor
@@ -192,12 +316,70 @@ class OrderExecutor:
             api_passphrase: Polymarket API passphrase (for future use)
             private_key: Wallet private key (without 0x prefix)
             signature_type: 0=EOA, 1=Email/Magic, 2=Safe
+            proxy_url: Proxy riservato a questo executor (client HTTP e connessioni propri)
+            http_client: httpx.Client da usare per il CLOB (ha la precedenza su proxy_url)
+            lazy_client: ClobClient (import py_clob_client + credenziali L2) creato al primo uso
+                invece che qui (avvio rapido)
+        
+        Senza proxy_url/http_client si usa il client CLOB di default del processo, o l'uscita
+        per paese più affidabile del pool proxy se nota.
         """
+        if http_client is None and proxy_url:
+            from http_clients import registry
+            http_client = registry.get("clob", proxy_url)
+        self.http_client = http_client
+        # Copia locale dei book via WebSocket (subscribe_market_data); None = solo REST
+        self.market_stream = None
+        # Ordini aperti in locale (place/cancel + canale user, start_order_stream)
+        from orders import OrderTracker
+        self.orders = OrderTracker()
+        self.user_stream = None
         self.api_key = api_key
         self.api_secret = api_secret
         self.api_passphrase = api_passphrase
         self.private_key = private_key
         self.signature_type = signature_type
+        # Letture orderbook/midpoint in cache: meno traffico sul proxy (banda a GB)
+        from market_cache import MarketDataCache
+        self.market_cache = MarketDataCache(
+            max_entries=MARKET_CACHE_MAX_ENTRIES,
+            ttls={
+                "orderbook": MARKET_CACHE_TTL_ORDERBOOK,
+                "book": MARKET_CACHE_TTL_ORDERBOOK,
+                "midpoint": MARKET_CACHE_TTL_MIDPOINT,
+            },
+        )
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._creds_from_cache = False
+        if not lazy_client:
+            self._client = self._build_client()
+
+    @property
+    def client(self):
+        """ClobClient (creato qui al primo uso se lazy_client)."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    @client.setter
+    def client(self, value) -> None:
+        self._client = value
+
+    def _creds_context(self, client) -> Tuple[str, str, str, int, int]:
+        funder = getattr(client.builder, "funder", None) or ""
+        return (client.signer.address(), funder, client.host, client.chain_id, self.signature_type)
+
+    def _get_creds_cache(self):
+        if not CLOB_CREDS_CACHE or not self.private_key:
+            return None
+        from creds_cache import CredsCache
+        return CredsCache(CLOB_CREDS_CACHE, self.private_key)
+
+    def _build_client(self):
+        from py_clob_client.client import ClobClient
 
         # Con Safe (signature_type=2): L2 auth deve inviare POLY_ADDRESS=funder, altrimenti 401
         _apply_poly_address_override()
@@ -205,52 +387,131 @@ class OrderExecutor:
         # Initialize CLOB client with private key (come discountry/polymarket-trading-bot)
         # Per Safe (signature_type=2) serve l'indirizzo del wallet Polymarket (funder)
         funder = os.getenv("POLY_SAFE_ADDRESS", "").strip() or os.getenv("SAFE_ADDRESS", "").strip()
-        self.client = ClobClient(
-            host="https://clob.polymarket.com",
+        client = ClobClient(
+            host=CLOB_HOST,
             chain_id=137,  # Polygon mainnet
-            key=private_key,
-            signature_type=signature_type,
+            key=self.private_key,
+            signature_type=self.signature_type,
             **({"funder": funder} if funder else {}),
         )
         
         # L2 auth: necessaria per post_order. Come discountry: deriva credenziali dalla chiave
-        # se non sono già fornite (POLYMARKET_API_KEY/SECRET/PASSPHRASE).
-        if api_key and api_secret and api_passphrase:
+        # se non sono già fornite (POLYMARKET_API_KEY/SECRET/PASSPHRASE), poi le tiene nella
+        # cache cifrata (CLOB_CREDS_CACHE) per i prossimi avvii.
+        if self.api_key and self.api_secret and self.api_passphrase:
             try:
                 from py_clob_client.clob_types import ApiCreds
-                self.client.set_api_creds(ApiCreds(api_key=api_key, api_secret=api_secret, api_passphrase=api_passphrase))
+                client.set_api_creds(ApiCreds(api_key=self.api_key, api_secret=self.api_secret, api_passphrase=self.api_passphrase))
                 print("CLOB: using API credentials from .env")
                 if funder:
                     print(f"CLOB: API auth address = Polymarket (funder) {funder[:10]}...{funder[-6:]}")
             except Exception as e:
                 print(f"Warning: Could not set API credentials from env: {e}")
-                self._derive_and_set_api_creds()
-        else:
-            self._derive_and_set_api_creds()
+                self._derive_and_set_api_creds(client)
+        elif not self._load_cached_creds(client):
+            self._derive_and_set_api_creds(client)
         print("CLOB client initialized successfully")
         # Verifica allineamento con https://docs.polymarket.com/developers/CLOB/authentication
-        if signature_type == 2 and funder:
+        if self.signature_type == 2 and funder:
             print("  (L2 + signature_type=2 GNOSIS_SAFE, funder=proxy wallet da polymarket.com/settings)")
+        return client
+
+    def _load_cached_creds(self, client) -> bool:
+        cache = self._get_creds_cache()
+        if cache is None:
+            return False
+        try:
+            cached = cache.load(*self._creds_context(client))
+        except Exception as e:
+            print(f"  ⚠️  Cache credenziali CLOB non leggibile: {e}")
+            return False
+        if cached is None:
+            return False
+        from py_clob_client.clob_types import ApiCreds
+        client.set_api_creds(ApiCreds(**cached))
+        self._creds_from_cache = True
+        print("CLOB: L2 API credentials from local encrypted cache")
+        return True
+
+    def _refresh_api_creds(self) -> bool:
+        """
+        Dopo un 401 con credenziali prese dalla cache (es. revocate): cache svuotata e nuova
+        derivazione. Ritorna True se le credenziali sono state rigenerate.
+        """
+        if not self._creds_from_cache:
+            return False
+        self._creds_from_cache = False
+        cache = self._get_creds_cache()
+        if cache is not None:
+            cache.clear(*self._creds_context(self.client))
+        print("CLOB: credenziali in cache rifiutate (401), nuova derivazione...")
+        return self._derive_and_set_api_creds(self.client)
+
+    def _clob_http(self):
+        """Client HTTP per le richieste CLOB di questo executor (None = client di default del processo)."""
+        if self.http_client is not None:
+            return self.http_client
+        pool = _get_proxy_pool()
+        if pool is None:
+            return None
+        _promote_best_exit(pool)
+        return pool.client(pool.active) if pool.active else None
 
-    def _derive_and_set_api_creds(self) -> None:
+    @_routed
+    def _derive_and_set_api_creds(self, client) -> bool:
         """
         Deriva credenziali L2 via API CLOB (L1 = firma con private key).
         Su Polymarket non c'è una 'Trading API Key' in Settings: si creano/derivano così.
         """
         try:
-            creds = self.client.create_or_derive_api_creds()
-            self.client.set_api_creds(creds)
+            creds = client.create_or_derive_api_creds()
+            client.set_api_creds(creds)
             print("CLOB: L2 API credentials derived from private key (create_or_derive_api_creds)")
             # Salva in .env per le prossime run (opzionale)
             _print_creds_for_env(creds)
         except Exception as e:
             print(f"Warning: Could not derive API credentials: {e}")
             print("  Order placement will fail until POLYMARKET_API_KEY/SECRET/PASSPHRASE are set or derivation works.")
+            return False
+        cache = self._get_creds_cache()
+        if cache is not None and creds is not None:
+            try:
+                cache.save(
+                    {"api_key": creds.api_key, "api_secret": creds.api_secret, "api_passphrase": creds.api_passphrase},
+                    *self._creds_context(client),
+                )
+            except Exception as e:
+                print(f"  ⚠️  Cache credenziali CLOB non salvata: {e}")
+        return creds is not None
+
+    @_routed
+    def _fetch_orderbook(self, token_id: str):
+        return retry_engine.call("clob", self.client.get_order_book, token_id, policy=CLOB_READ_POLICY)
+
+    @_routed
+    def _fetch_midpoint(self, token_id: str) -> Optional[float]:
+        return _parse_midpoint(retry_engine.call("clob", self.client.get_midpoint, token_id, policy=CLOB_READ_POLICY))
+
+    def subscribe_market_data(self, token_ids: List[str]) -> None:
+        """
+        Sottoscrive i token al canale WebSocket market (avvia lo stream alla prima chiamata).
+        Finché il book locale di un token è sincronizzato, get_orderbook/get_midpoint_price/
+        get_midpoints lo leggono senza richieste HTTP; altrimenti REST come prima.
+        """
+        if self.market_stream is None:
+            from market_stream import MarketStream
+            self.market_stream = MarketStream(token_ids, url=CLOB_MARKET_WS_URL).start()
+        else:
+            self.market_stream.subscribe(token_ids)
+
+    def unsubscribe_market_data(self, token_ids: List[str]) -> None:
+        if self.market_stream is not None:
+            self.market_stream.unsubscribe(token_ids)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def get_orderbook(self, token_id: str) -> Optional[Dict]:
         """
-        Fetch orderbook for a token
+        Fetch orderbook for a token: book locale WebSocket se il token è sottoscritto e
+        sincronizzato, altrimenti REST (cache: CLOB_CACHE_TTL_ORDERBOOK secondi)
         
         Args:
             token_id: CLOB token ID
@@ -258,48 +519,301 @@ class OrderExecutor:
         Returns:
             Orderbook dictionary with bids and asks
         """
+        if self.market_stream is not None:
+            book = self.market_stream.orderbook(token_id)
+            if book is not None:
+                return book
         try:
-            orderbook = self.client.get_order_book(token_id)
-            return orderbook
+            return self.market_cache.get_or_fetch("orderbook", token_id, lambda: self._fetch_orderbook(token_id))
         except Exception as e:
-            print(f"Error fetching orderbook for {token_id}: {e}")
+            _log_clob_error("fetching orderbook for", token_id, e)
             return None
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def get_midpoint_price(self, token_id: str) -> Optional[float]:
         """
         Get current midpoint price from CLOB API (quote reale Polymarket).
         Usa GET /midpoint invece dell'orderbook (che può essere vuoto → 0.50).
+        In cache per CLOB_CACHE_TTL_MIDPOINT secondi; retry solo su errori di rete.
+        Token sottoscritti via WebSocket: (miglior bid + miglior ask) / 2 dal book locale.
         """
+        if self.market_stream is not None:
+            mid = self.market_stream.midpoint(token_id)
+            if mid is not None:
+                return mid
         try:
-            result = self.client.get_midpoint(token_id)
-            if result is None:
-                return None
-            # può essere dict {"mid": "0.52"} o stringa
-            if isinstance(result, dict):
-                mid = result.get("mid") or result.get("price")
-                return float(mid) if mid is not None else None
-            if isinstance(result, str):
-                return float(result)
-            return float(result)
+            return self.market_cache.get_or_fetch("midpoint", token_id, lambda: self._fetch_midpoint(token_id))
         except Exception as e:
-            print(f"Error fetching midpoint for {token_id}: {e}")
+            _log_clob_error("fetching midpoint for", token_id, e)
             return None
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def get_price(self, token_id: str) -> Optional[float]:
         """
         Get current midpoint price for a token (alias: usa CLOB midpoint API)
         """
         return self.get_midpoint_price(token_id)
+
+    @_routed
+    def _fetch_midpoints_chunk(self, token_ids: List[str]) -> Dict[str, float]:
+        from py_clob_client.clob_types import BookParams
+        params = [BookParams(token_id=t) for t in token_ids]
+        raw = retry_engine.call("clob", self.client.get_midpoints, params, policy=CLOB_READ_POLICY) or {}
+        out = {}
+        for token_id, value in raw.items():
+            mid = _parse_midpoint(value)
+            if mid is not None:
+                out[token_id] = mid
+        return out
+
+    @_routed
+    def _fetch_books_chunk(self, token_ids: List[str]) -> Dict:
+        # POST /books grezzo: niente oggetti OrderSummary per livello, si va diretti agli array
+        from market_cache import CompactBook
+        from py_clob_client.endpoints import GET_ORDER_BOOKS
+        from py_clob_client.http_helpers.helpers import post
+        raw = retry_engine.call(
+            "clob", post, f"{self.client.host}{GET_ORDER_BOOKS}",
+            data=[{"token_id": t} for t in token_ids], policy=CLOB_READ_POLICY,
+        ) or []
+        books = (CompactBook.from_raw(r) for r in raw if isinstance(r, dict))
+        return {b.token_id: b for b in books if b.token_id}
+
+    def _fetch_batch(self, kind: str, token_ids: List[str], fetch_chunk) -> Dict:
+        """
+        Token già in cache + quelli mancanti scaricati a chunk di CLOB_BATCH_SIZE,
+        con fino a CLOB_BATCH_CONCURRENCY richieste in parallelo. Un chunk in errore
+        lascia fuori solo i suoi token.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        out, missing = self.market_cache.get_many(kind, list(dict.fromkeys(token_ids)))
+        size = max(1, CLOB_BATCH_SIZE)
+        chunks = [missing[i:i + size] for i in range(0, len(missing), size)]
+        if not chunks:
+            return out
+        with ThreadPoolExecutor(max_workers=max(1, min(CLOB_BATCH_CONCURRENCY, len(chunks)))) as pool:
+            futures = [pool.submit(fetch_chunk, chunk) for chunk in chunks]
+            for chunk, fut in zip(chunks, futures):
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    _log_clob_error(f"fetching {kind} batch ({len(chunk)} token) from", chunk[0], e)
+                    continue
+                for token_id, value in result.items():
+                    self.market_cache.put(kind, token_id, value)
+                    out[token_id] = value
+        return out
+
+    def get_midpoints(self, token_ids: List[str]) -> Dict[str, float]:
+        """
+        Midpoint di molti token con POST /midpoints (una richiesta ogni CLOB_BATCH_SIZE token).
+        Ritorna {token_id: midpoint}; i token senza quota o in errore non compaiono.
+        I token con book locale WebSocket sincronizzato non vanno in richiesta.
+        """
+        live: Dict[str, float] = {}
+        if self.market_stream is not None:
+            for token_id in token_ids:
+                mid = self.market_stream.midpoint(token_id)
+                if mid is not None:
+                    live[token_id] = mid
+        rest = [t for t in token_ids if t not in live]
+        if rest:
+            live.update(self._fetch_batch("midpoint", rest, self._fetch_midpoints_chunk))
+        return live
+
+    def get_orderbooks(self, token_ids: List[str]) -> Dict:
+        """
+        Orderbook di molti token con POST /books, come {token_id: market_cache.CompactBook}
+        (prezzi/size in array, livello migliore per primo). I token in errore non compaiono.
+        """
+        return self._fetch_batch("book", token_ids, self._fetch_books_chunk)
     
+    def _order_options(self, token_ids: List[str]) -> Dict[str, object]:
+        """
+        (tick_size, neg_risk, fee_rate_bps) per token, per firmare senza passare da create_order.
+        In cache per token per CLOB_ORDER_OPTIONS_TTL secondi, condivisa da place_orders_bulk e
+        dalla pipeline ordini: i token già visti non costano richieste. Per i token nuovi o scaduti:
+        una richiesta /books ogni CLOB_BATCH_SIZE token (tick size e neg risk), più una /fee-rate
+        per token (se non già in cache nel client) e, per i token senza book (es. mercati
+        risolti), una /tick-size e una /neg-risk; le richieste singole vanno in parallelo.
+        Ritorna {token_id: tupla} o {token_id: messaggio d'errore} (gli errori non vanno in cache).
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        from http_clients import use_clob_client
+
+        cache = getattr(self, "_options_cache", None)
+        if cache is None:
+            cache = self._options_cache = {}   # token → (scadenza, (tick, neg_risk, fee))
+        now = time.monotonic()
+        out, missing = {}, []
+        for token_id in dict.fromkeys(token_ids):
+            cached = cache.get(token_id)
+            if cached is not None and cached[0] > now:
+                out[token_id] = cached[1]
+            else:
+                missing.append(token_id)
+        if not missing:
+            return out
+
+        books = self.get_orderbooks(missing)
+        http = self._clob_http()
+
+        def _resolve(token_id: str):
+            try:
+                book = books.get(token_id)
+                if book is not None:
+                    tick, neg_risk = _tick_size_str(book.tick_size), book.neg_risk
+                with use_clob_client(http):
+                    if book is None:
+                        tick, neg_risk = _tick_size_str(self.client.get_tick_size(token_id)), self.client.get_neg_risk(token_id)
+                    fee_rate = int(self.client.get_fee_rate_bps(token_id) or 0)
+                return token_id, (tick, bool(neg_risk), fee_rate)
+            except Exception as e:
+                return token_id, str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(CLOB_META_CONCURRENCY, len(missing)))) as pool:
+            for token_id, opt in pool.map(_resolve, missing):
+                if isinstance(opt, tuple):
+                    cache[token_id] = (now + CLOB_ORDER_OPTIONS_TTL, opt)
+                out[token_id] = opt
+        return out
+
+    def _get_order_signer(self):
+        signer = getattr(self, "_order_signer", None)
+        if signer is None:
+            from signing import OrderSigner
+            builder = self.client.builder
+            signer = self._order_signer = OrderSigner(
+                self.client.signer.private_key,
+                self.client.chain_id,
+                sig_type=builder.sig_type,
+                funder=builder.funder,
+                workers=SIGNING_WORKERS or None,
+            )
+            atexit.register(signer.close)
+        return signer
+
+    def order_pipeline(self):
+        """
+        Pipeline ordini condivisa (order_pipeline.OrderPipeline), avviata al primo uso: submit()
+        ritorna subito un Future mentre firma e invio procedono in parallelo su più ordini.
+        """
+        pipeline = getattr(self, "_order_pipeline", None)
+        if pipeline is None:
+            from order_pipeline import OrderPipeline
+            pipeline = self._order_pipeline = OrderPipeline(
+                self,
+                queue_size=CLOB_PIPELINE_QUEUE,
+                sign_batch=CLOB_PIPELINE_SIGN_BATCH,
+                post_batch=CLOB_ORDERS_BATCH_SIZE,
+                post_workers=CLOB_BATCH_CONCURRENCY,
+            ).start()
+            atexit.register(pipeline.close)
+        return pipeline
+
+    @_routed
+    def _post_orders_chunk(self, args: List) -> List[Dict]:
+        with STAGE_SECONDS.time(stage="order_post_batch"):
+            resp = retry_engine.call("clob", self.client.post_orders, args, policy=replace(CLOB_ORDER_POLICY, attempts=3))
+        if isinstance(resp, dict):
+            resp = resp.get("data") or resp.get("orders") or [resp]
+        return resp if isinstance(resp, list) else []
+
+    def place_orders_bulk(
+        self,
+        orders: List["OrderArgs"],
+        post_only: bool = False,
+        order_type: str = "GTC",
+    ) -> List[Dict]:
+        """
+        Piazza molti ordini limit: firma locale in parallelo (pool di processi, signing.OrderSigner)
+        e invio con POST /orders a blocchi di CLOB_ORDERS_BATCH_SIZE, fino a CLOB_BATCH_CONCURRENCY
+        richieste in parallelo. Niente fallback per paese proxy (solo place_limit_order).
+        
+        Args:
+            orders: OrderArgs (token_id, price, size, side "BUY"/"SELL"); prezzi fuori range
+                vengono riportati entro [tick, 1 - tick]
+            post_only: Rifiuta gli ordini che verrebbero eseguiti subito
+            order_type: "GTC" / "GTD" / "FOK" / "FAK"
+            
+        Returns:
+            Un dict per ordine, nello stesso ordine:
+            {"ok", "token_id", "orderID", "status", "error"}
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from py_clob_client.clob_types import PostOrdersArgs
+
+        results = [
+            {"ok": False, "token_id": o.token_id, "orderID": None, "status": None, "error": None}
+            for o in orders
+        ]
+        if not orders:
+            return results
+        t0 = time.monotonic()
+        options = self._order_options([o.token_id for o in orders])
+
+        specs, index, prices = [], [], {}
+        for i, o in enumerate(orders):
+            opt = options.get(o.token_id)
+            if not isinstance(opt, tuple):
+                results[i]["error"] = f"tick size/fee non disponibili: {opt}"
+                continue
+            spec, prices[i] = _order_spec(o, opt)
+            specs.append(spec)
+            index.append(i)
+
+        signed = []
+        for i, (ok, value) in zip(index, self._get_order_signer().sign(specs)):
+            if ok:
+                signed.append((i, PostOrdersArgs(order=value, orderType=order_type, postOnly=post_only)))
+            else:
+                results[i]["error"] = f"firma fallita: {value}"
+        t_signed = time.monotonic()
+
+        size = max(1, CLOB_ORDERS_BATCH_SIZE)
+        chunks = [signed[k:k + size] for k in range(0, len(signed), size)]
+        if chunks:
+            with ThreadPoolExecutor(max_workers=max(1, min(CLOB_BATCH_CONCURRENCY, len(chunks)))) as pool:
+                futures = [pool.submit(self._post_orders_chunk, [a for _, a in chunk]) for chunk in chunks]
+                for chunk, fut in zip(chunks, futures):
+                    try:
+                        replies = fut.result()
+                    except Exception as e:
+                        _log_clob_error(f"posting {len(chunk)} orders to", chunk[0][1].order.dict().get("tokenId", ""), e)
+                        replies, error = [], str(e)
+                    else:
+                        error = "risposta CLOB mancante"
+                    for n, (i, _) in enumerate(chunk):
+                        reply = replies[n] if n < len(replies) and isinstance(replies[n], dict) else None
+                        if reply is None:
+                            results[i]["error"] = error
+                            continue
+                        _apply_order_reply(results[i], reply)
+                        if results[i]["ok"]:
+                            o = orders[i]
+                            self.orders.on_placed(reply, o.token_id, str(o.side), prices[i], float(o.size))
+
+        placed = [r for r in results if r["ok"]]
+        for token_id in {r["token_id"] for r in placed}:
+            self.market_cache.invalidate(token_id)
+        ORDERS.inc(len(placed), outcome="placed")
+        ORDERS.inc(len(orders) - len(placed), outcome="failed")
+        print(
+            f"Bulk orders: {len(placed)}/{len(orders)} piazzati in {len(chunks)} richieste "
+            f"(book/fee + firma {(t_signed - t0) * 1000:.0f} ms, totale {(time.monotonic() - t0) * 1000:.0f} ms)",
+            flush=True,
+        )
+        return results
+    
+    @_routed
     def place_limit_order(
         self,
         token_id: str,
         side: str,
         size: float,
         price: float,
-        post_only: bool = True
+        post_only: bool = True,
+        deadline: Optional[float] = None,
     ) -> Optional[Dict]:
         """
         Place a limit order
@@ -310,10 +824,21 @@ class OrderExecutor:
             size: Order size in USDC
             price: Limit price
             post_only: If True, order will be rejected if it would fill immediately
+            deadline: time.monotonic() oltre cui non si fanno altri tentativi (retry/paesi proxy)
             
         Returns:
             Order response dictionary or None if failed
         """
+        t0 = time.perf_counter()
+        response = self._place_limit_order(token_id, side, size, price, deadline)
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage="order_post")
+        ORDERS.inc(outcome="placed" if response is not None else "failed")
+        return response
+
+    def _place_limit_order(self, token_id: str, side: str, size: float, price: float, deadline: Optional[float]) -> Optional[Dict]:
+        from py_clob_client.clob_types import OrderArgs
+        from py_clob_client.exceptions import PolyApiException
+
         try:
             # Convert side string to constant
             order_side = BUY if side.upper() == "BUY" else SELL
@@ -329,32 +854,17 @@ class OrderExecutor:
                 token_id=token_id
             )
             
-            # Retry con backoff esponenziale su "Request exception!" (rete/proxy)
-            max_retries = 5
-            backoff = [1, 2, 4, 8, 16]
+            # Retry (retries.CLOB_ORDER_POLICY): backoff con jitter solo su connessione fallita / 429,
+            # entro la deadline e il budget di retry del CLOB; a CLOB in guasto si fallisce subito
+            def _on_retry(e: Exception, attempt: int, wait: float) -> None:
+                _log_request_exception(e, "POST order")
+                print(f"  Errore connessione (tentativo {attempt}), riprovo tra {wait:.1f}s...")
 
-            def _do_post_order():
-                return self.client.create_and_post_order(order_args)
-
-            def _try_order_with_retry(attempt_label: str = ""):
-                last_e = None
-                for attempt in range(max_retries):
-                    try:
-                        return _do_post_order()
-                    except PolyApiException as e:
-                        last_e = e
-                        if _is_request_exception(e):
-                            _log_request_exception(e, "POST order")
-                            if attempt < max_retries - 1:
-                                wait = backoff[attempt]
-                                print(f"  Errore connessione (tentativo {attempt + 1}/{max_retries}), riprovo tra {wait}s...")
-                                time.sleep(wait)
-                                continue
-                            raise
-                        raise
-                if last_e:
-                    raise last_e
-                return None
+            def _try_order_with_retry(retries: int = CLOB_ORDER_POLICY.attempts):
+                return retry_engine.call(
+                    "clob", self.client.create_and_post_order, order_args,
+                    policy=replace(CLOB_ORDER_POLICY, attempts=retries), deadline=deadline, on_retry=_on_retry,
+                )
 
             # Debug: test GET verso CLOB con stesso proxy prima del POST (solo se POLYBOT_DEBUG_PROXY=1)
             if os.getenv("POLYBOT_DEBUG_PROXY"):
@@ -367,52 +877,74 @@ class OrderExecutor:
                     except Exception as _de:
                         print(f"  [DEBUG] Pre-POST GET CLOB: FAILED — {type(_de).__name__}: {_de}")
 
-            # Primo tentativo: stesso client/proxy usato per GET — niente patch
+            # Primo tentativo dal client dell'executor: proxy proprio, oppure l'uscita del pool più
+            # affidabile se nota (altrimenti quella di PROXY_URL)
+            pool = _get_proxy_pool() if self.http_client is None else None
+            first_exit = pool.active if pool is not None else None
+            t_attempt = time.monotonic()
             try:
                 response = _try_order_with_retry()
+                if first_exit:
+                    pool.record(first_exit, True, (time.monotonic() - t_attempt) * 1000)
                 if response is not None:
                     print(f"Order placed: {side} {size} @ {price} for token {token_id}")
+                    self.market_cache.invalidate(token_id)
+                    self.orders.on_placed(response, token_id, side, price, size)
                     return response
             except PolyApiException as e:
-                if getattr(e, "status_code", None) != 403:
-                    raise
-                err = (getattr(e, "error_msg", None) or "")
-                if isinstance(err, dict):
-                    err = err.get("error", str(err))
-                if "regional" not in str(err).lower():
+                regional = _is_regional_403(e)
+                if first_exit:
+                    # Errore applicativo (saldo, prezzo...): l'uscita ha risposto, quindi è sana
+                    exit_ok = not regional and not _is_request_exception(e)
+                    pool.record(first_exit, exit_ok, (time.monotonic() - t_attempt) * 1000 if exit_ok else None)
+                if not regional or pool is None:
                     raise
-            # 403 regional: prova con proxy per paese (user_cr.ch, user_cr.no, ...)
-            proxy_parts = _get_proxy_parts()
-            saved_client = _get_saved_clob_client()
-            try:
-                if proxy_parts:
-                    for attempt, country in enumerate(PROXY_COUNTRIES):
-                        proxy_url = _build_proxy_url(country, attempt)
-                        if not proxy_url:
-                            continue
-                        cname = PROXY_COUNTRY_NAMES.get(country, country)
-                        print(f"  Tentativo {attempt + 1}/{len(PROXY_COUNTRIES)}: ordine via proxy {cname}...")
-                        _patch_clob_client_proxy(proxy_url)
-                        try:
-                            response = _try_order_with_retry()
-                            if response is not None:
-                                print(f"Order placed: {side} {size} @ {price} for token {token_id} (via {cname})")
-                                return response
-                        except PolyApiException as e2:
-                            err2 = (getattr(e2, "error_msg", None) or "")
-                            if isinstance(err2, dict):
-                                err2 = err2.get("error", str(err2))
-                            if getattr(e2, "status_code", None) == 403 and "regional" in str(err2).lower():
-                                time.sleep(2)
-                                continue
-                            raise
-                    print("  403 regional: tutti i paesi proxy provati.")
+            if pool is None:
+                return None
+            # 403 regional: uscite per paese (user_cr.ch, user_cr.no, ...) dalla più sana, quelle in
+            # quarantena per ultime. Solo per questa chiamata: gli altri thread/executor non cambiano uscita.
+            from http_clients import use_clob_client
+            candidates = pool.ranked(exclude=[first_exit] if first_exit else ())
+            for attempt, country in enumerate(candidates):
+                if deadline is not None and time.monotonic() >= deadline:
+                    print("  Tempo massimo raggiunto: niente altri paesi proxy.")
                     return None
-            finally:
-                _restore_clob_client(saved_client)
+                client = pool.client(country)
+                if client is None:
+                    continue
+                cname = PROXY_COUNTRY_NAMES.get(country, country)
+                print(f"  Tentativo {attempt + 1}/{len(candidates)}: ordine via proxy {cname}...")
+                t_attempt = time.monotonic()
+                try:
+                    with use_clob_client(client):
+                        response = _try_order_with_retry(retries=2)
+                except PolyApiException as e2:
+                    # Un altro paese solo se l'ordine non è arrivato al CLOB (403 regional, connessione
+                    # mai stabilita): dopo un timeout o una connessione interrotta potrebbe essere nel book
+                    if _is_regional_403(e2) or classify(e2) in NOT_SENT:
+                        pool.record(country, False)
+                        continue
+                    if _is_request_exception(e2):
+                        pool.record(country, False)
+                        raise
+                    pool.record(country, True, (time.monotonic() - t_attempt) * 1000)
+                    raise
+                pool.record(country, True, (time.monotonic() - t_attempt) * 1000)
+                if response is not None:
+                    # Uscita funzionante: diventa quella attiva per i prossimi ordini
+                    pool.active = country
+                    print(f"Order placed: {side} {size} @ {price} for token {token_id} (via {cname})")
+                    self.market_cache.invalidate(token_id)
+                    self.orders.on_placed(response, token_id, side, price, size)
+                    return response
+            print("  403 regional: tutti i paesi proxy provati.")
+            print(f"  Pool proxy: {pool.summary()}")
+            return None
             
         except PolyApiException as e:
-            if getattr(e, "status_code", None) == 401:
+            if getattr(e, "status_code", None) == 401 and self._refresh_api_creds():
+                print("Error placing order: 401 Unauthorized — credenziali L2 rigenerate, riprova l'ordine.")
+            elif getattr(e, "status_code", None) == 401:
                 print("Error placing order: 401 Unauthorized — API key non valida o scaduta.")
                 print("  → Vai su polymarket.com → Settings → API Key e genera/usa la chiave per il TRADING (non la Builder Key).")
                 print("  → Aggiorna POLYMARKET_API_KEY, POLYMARKET_API_SECRET, POLYMARKET_API_PASSPHRASE in .env")
@@ -425,12 +957,16 @@ class OrderExecutor:
             else:
                 print(f"Error placing order: {e}")
             return None
+        except CircuitOpenError as e:
+            print(f"Ordine non inviato: {e}")
+            return None
         except Exception as e:
             print(f"Error placing order: {e}")
             import traceback
             traceback.print_exc()
             return None
     
+    @_routed
     def cancel_order(self, order_id: str) -> bool:
         """
         Cancel an open order
@@ -442,27 +978,100 @@ class OrderExecutor:
             True if successful, False otherwise
         """
         try:
-            self.client.cancel_order(order_id)
+            self.client.cancel(order_id)
+            self.orders.on_cancelled([order_id])
             print(f"Order cancelled: {order_id}")
             return True
         except Exception as e:
             print(f"Error cancelling order {order_id}: {e}")
             return False
-    
-    def get_open_orders(self) -> List[Dict]:
+
+    def _record_cancel(self, resp, order_ids: List[str]) -> Dict:
+        """Esito di DELETE /orders o /cancel-market-orders → vista locale; anche i non cancellati
+        (già eseguiti o già cancellati) non sono più aperti."""
+        if not isinstance(resp, dict):
+            resp = {}
+        canceled = [str(i) for i in resp.get("canceled") or ()]
+        not_canceled = resp.get("not_canceled") or {}
+        self.orders.on_cancelled(canceled + [str(i) for i in not_canceled] + list(order_ids))
+        return {"canceled": canceled, "not_canceled": not_canceled}
+
+    @_routed
+    def cancel_orders(self, order_ids: List[str]) -> Dict:
+        """
+        Cancella molti ordini con una sola richiesta (DELETE /orders).
+        Ritorna {"canceled": [id...], "not_canceled": {id: motivo}}.
         """
-        Get all open orders
+        order_ids = list(dict.fromkeys(str(i) for i in order_ids))
+        if not order_ids:
+            return {"canceled": [], "not_canceled": {}}
+        try:
+            resp = retry_engine.call("clob", self.client.cancel_orders, order_ids, policy=CLOB_READ_POLICY)
+        except Exception as e:
+            _log_clob_error(f"cancelling {len(order_ids)} orders for", order_ids[0], e)
+            return {"canceled": [], "not_canceled": {i: str(e) for i in order_ids}}
+        result = self._record_cancel(resp, order_ids)
+        print(f"Orders cancelled: {len(result['canceled'])}/{len(order_ids)}")
+        return result
+
+    @_routed
+    def cancel_orders_for_token(self, token_id: str, side: Optional[str] = None) -> Dict:
+        """
+        Cancella i nostri ordini su un token con una richiesta: tutti (DELETE /cancel-market-orders,
+        anche quelli non ancora visti in locale) o solo un lato (id dalla vista locale, DELETE /orders).
+        """
+        if side is not None:
+            return self.cancel_orders([o.id for o in self.orders.for_token(token_id, side)])
+        local = [o.id for o in self.orders.for_token(token_id)]
+        try:
+            resp = retry_engine.call("clob", self.client.cancel_market_orders, asset_id=token_id, policy=CLOB_READ_POLICY)
+        except Exception as e:
+            _log_clob_error("cancelling orders for", token_id, e)
+            return {"canceled": [], "not_canceled": {i: str(e) for i in local}}
+        result = self._record_cancel(resp, local)
+        print(f"Orders cancelled for token {token_id}: {len(result['canceled'])}")
+        return result
+
+    def cancel_orders_where(self, predicate) -> Dict:
+        """Cancella con una richiesta gli ordini aperti (orders.TrackedOrder) per cui predicate(order) è vero."""
+        return self.cancel_orders([o.id for o in self.orders.select(predicate)])
+
+    def start_order_stream(self) -> None:
+        """Aggiorna la vista degli ordini aperti dal canale WebSocket user (credenziali L2 del client)."""
+        if self.user_stream is not None or self.client.creds is None:
+            return
+        from orders import UserStream
+        self.user_stream = UserStream(self.orders, self.client.creds, url=CLOB_USER_WS_URL).start()
+
+    @_routed
+    def _fetch_open_orders(self) -> List[Dict]:
+        return retry_engine.call("clob", self.client.get_orders, policy=CLOB_READ_POLICY) or []
+
+    def get_open_orders(self, refresh: bool = False) -> List[Dict]:
+        """
+        Get all open orders (formato GET /data/orders)
+        
+        Dalla vista locale (orders.OrderTracker) finché è aggiornata: riconciliata con il REST
+        ogni ORDERS_RECONCILE_SECONDS se il canale user è connesso, ogni ORDERS_POLL_SECONDS
+        altrimenti, o subito con refresh=True.
         
         Returns:
             List of open order dictionaries
         """
+        stream = self.user_stream
+        max_age = ORDERS_RECONCILE_SECONDS if stream is not None and stream.connected.is_set() else ORDERS_POLL_SECONDS
+        if not refresh and not self.orders.needs_reconcile(max_age):
+            return [o.to_dict() for o in self.orders.all()]
+        started = time.monotonic()
         try:
-            orders = self.client.get_orders()
-            return orders if orders else []
+            orders = self._fetch_open_orders()
         except Exception as e:
             print(f"Error fetching open orders: {e}")
-            return []
+            return [o.to_dict() for o in self.orders.all()]
+        self.orders.reconcile(orders, started)
+        return [o.to_dict() for o in self.orders.all()]
     
+    @_routed
     def get_balance(self) -> float:
         """
         Get USDC balance (CLOB: get_balance_allowance con asset_type=COLLATERAL).
@@ -491,59 +1100,161 @@ class OrderExecutor:
             return raw / 1e6
         except Exception as e:
             print(f"Error fetching balance: {e}")
+            if getattr(e, "status_code", None) == 401:
+                self._refresh_api_creds()
             raise
     
+    def _run_leg(self, leg: LegResult, t0: float, deadline: float) -> LegResult:
+        leg.sent_ms = (time.monotonic() - t0) * 1000
+        try:
+            resp = self.place_limit_order(leg.token_id, leg.side, leg.size, leg.price, deadline=deadline)
+        except Exception as e:
+            resp = None
+            leg.error = str(e)
+        leg.done_ms = (time.monotonic() - t0) * 1000
+        if isinstance(resp, dict) and resp.get("success") is False:
+            leg.error = str(resp.get("errorMsg") or resp)
+        elif resp is not None:
+            leg.ok = True
+            if isinstance(resp, dict):
+                leg.order_id = resp.get("orderID") or resp.get("orderId")
+                leg.status = resp.get("status")
+        elif leg.error is None:
+            leg.error = "ordine non piazzato"
+        return leg
+
+    @_routed
+    def _size_matched(self, order_id: str) -> Optional[float]:
+        """Quote eseguite di un ordine (GET /data/order/{id}); None se non leggibile."""
+        try:
+            order = retry_engine.call("clob", self.client.get_order, order_id, policy=CLOB_READ_POLICY)
+        except Exception as e:
+            _log_clob_error("reading order", order_id, e)
+            return None
+        if isinstance(order, dict) and order.get("size_matched") is not None:
+            return float(order["size_matched"])
+        return None
+
+    @_routed
+    def _place_immediate(self, token_id: str, side: str, size: float) -> float:
+        """
+        Ordine FAK (fill-and-kill) al prezzo che attraversa il book fresco fino a `size` quote: si
+        esegue subito per la liquidità disponibile e il resto viene scartato, niente resta nel book.
+        Ritorna le quote eseguite.
+        """
+        from py_clob_client.clob_types import OrderArgs, OrderType
+
+        self.market_cache.invalidate(token_id)
+        book = self.get_orderbooks([token_id]).get(token_id)
+        price = _sweep_price(book, side, size) if book is not None else None
+        if price is None:
+            print(f"  Nessuna liquidità {side} su {token_id}: niente ordine FAK", flush=True)
+            return 0.0
+        try:
+            signed = self.client.create_order(OrderArgs(token_id=token_id, price=price, size=size, side=side))
+            # Ordine già firmato: ripeterlo è sicuro (stesso salt), quindi la policy degli ordini basta
+            resp = retry_engine.call("clob", self.client.post_order, signed, OrderType.FAK, policy=CLOB_ORDER_POLICY)
+        except Exception as e:
+            _log_clob_error("posting FAK order for", token_id, e)
+            return 0.0
+        finally:
+            self.market_cache.invalidate(token_id)
+        if not isinstance(resp, dict) or resp.get("success") is False or resp.get("errorMsg"):
+            print(f"  Ordine FAK {side} {token_id} non eseguito: {resp}", flush=True)
+            return 0.0
+        order_id = resp.get("orderID") or resp.get("orderId")
+        matched = self._size_matched(order_id) if order_id else None
+        if matched is None:
+            matched = size if str(resp.get("status") or "").lower() == "matched" else 0.0
+        print(f"Order FAK: {side} {matched:g}/{size:g} @ {price} for token {token_id}", flush=True)
+        return matched
+
+    def _unwind_leg(self, leg: LegResult) -> None:
+        """
+        Annulla la gamba rimasta sola. Se è ancora nel book (live/delayed) si cancella il resto;
+        le quote già eseguite (matched, o fill parziale prima del cancel) si compensano con un
+        ordine opposto FAK che si esegue subito. Quello che non si riesce a compensare resta in
+        leg.exposure.
+        """
+        cancelled = False
+        if leg.status != "matched" and leg.order_id:
+            cancelled = self.cancel_order(leg.order_id)
+        filled = self._size_matched(leg.order_id) if leg.order_id else None
+        if filled is None:
+            if leg.status != "matched":
+                # Esito sconosciuto: niente ordine opposto su quote che forse non abbiamo
+                leg.unwind, leg.exposure = "failed", leg.size
+                print(f"  ↩️  Gamba {leg.name}: quote eseguite non leggibili, controlla a mano ({leg.size:g} a rischio)", flush=True)
+                return
+            filled = leg.size
+        leg.filled = filled
+        if filled <= 0:
+            leg.unwind = "cancelled" if cancelled else "failed"
+        else:
+            opposite = "SELL" if leg.side.upper() == "BUY" else "BUY"
+            offset = self._place_immediate(leg.token_id, opposite, filled)
+            leg.exposure = max(0.0, filled - offset)
+            leg.unwind = "offset" if leg.exposure < 1e-9 else ("partial" if offset > 0 else "failed")
+        text = f"  ↩️  Gamba {leg.name} annullata ({leg.unwind}"
+        if filled > 0:
+            text += f", eseguite {filled:g}, scoperte {leg.exposure:g}"
+        print(text + ")", flush=True)
+
     def execute_arbitrage(
         self,
         opportunity,
         yes_size: float,
-        no_size: float
-    ) -> bool:
+        no_size: float,
+        timeout: float = ARB_LEG_TIMEOUT,
+    ) -> ArbitrageReport:
         """
         Execute an arbitrage opportunity
         
+        Le due gambe (YES e NO) vengono firmate e inviate in parallelo con una scadenza comune.
+        Se una fallisce (o non arriva entro `timeout`), l'altra viene annullata: cancel della parte
+        ancora nel book e ordine opposto FAK per le quote già eseguite (vedi _unwind_leg, le quote
+        non compensate sono in leg.exposure). Una gamba che si conclude dopo la scadenza viene
+        annullata appena termina.
+        
         Args:
             opportunity: ArbitrageOpportunity object
             yes_size: Size to trade for YES token
             no_size: Size to trade for NO token
+            timeout: Secondi entro cui entrambe le gambe devono essere piazzate
             
         Returns:
-            True if orders placed successfully, False otherwise
-        """
-        if opportunity.action == "buy_both":
-            # Buy both YES and NO tokens
-            yes_order = self.place_limit_order(
-                token_id=opportunity.yes_token_id,
-                side="BUY",
-                size=yes_size,
-                price=opportunity.yes_price
-            )
-            
-            no_order = self.place_limit_order(
-                token_id=opportunity.no_token_id,
-                side="BUY",
-                size=no_size,
-                price=opportunity.no_price
-            )
-            
-            return yes_order is not None and no_order is not None
-            
-        elif opportunity.action == "sell_both":
-            # Sell both YES and NO tokens
-            yes_order = self.place_limit_order(
-                token_id=opportunity.yes_token_id,
-                side="SELL",
-                size=yes_size,
-                price=opportunity.yes_price
-            )
-            
-            no_order = self.place_limit_order(
-                token_id=opportunity.no_token_id,
-                side="SELL",
-                size=no_size,
-                price=opportunity.no_price
-            )
-            
-            return yes_order is not None and no_order is not None
-        
-        return False
+            ArbitrageReport (True se entrambe le gambe sono piazzate)
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait
+
+        report = ArbitrageReport(action=opportunity.action)
+        side = {"buy_both": "BUY", "sell_both": "SELL"}.get(opportunity.action)
+        if side is None:
+            return report
+        report.legs = [
+            LegResult("YES", opportunity.yes_token_id, side, yes_size, opportunity.yes_price),
+            LegResult("NO", opportunity.no_token_id, side, no_size, opportunity.no_price),
+        ]
+        t0 = time.monotonic()
+        deadline = t0 + timeout
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="arb-leg")
+        futures = {pool.submit(self._run_leg, leg, t0, deadline): leg for leg in report.legs}
+        done, late = wait(futures, timeout=timeout)
+        pool.shutdown(wait=False)
+        report.elapsed_ms = (time.monotonic() - t0) * 1000
+        report.ok = not late and all(leg.ok for leg in report.legs)
+        if report.ok:
+            return report
+
+        for fut in late:
+            leg = futures[fut]
+            leg.error = f"timeout dopo {timeout:.0f}s"
+            # Si annulla quando (e se) l'ordine arriva comunque
+            fut.add_done_callback(lambda f: f.result().ok and self._unwind_leg(f.result()))
+        for fut in done:
+            leg = futures[fut]
+            if leg.ok:
+                self._unwind_leg(leg)
+        failed = ", ".join(f"{leg.name}: {leg.error}" for leg in report.legs if leg.error)
+        print(f"  ⚠️  Arbitraggio non completato ({failed})", flush=True)
+        return report
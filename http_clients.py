@@ -0,0 +1,256 @@
+"""
+Registro condiviso dei client HTTP/2 (httpx), uno per destinazione.
+
+Prima ogni fetch posizioni apriva e chiudeva un httpx.Client (TLS + HTTP/2 rifatti a ogni
+ciclo) e i client CLOB sostituiti via proxy non venivano mai chiusi (socket/fd persi nei
+worker di lunga durata). Qui:
+- un client per (destinazione, proxy): "data-api" diretto, "clob" via proxy, "clob" via
+  proxy di ogni paese → connessioni keep-alive riusate tra un ciclo e l'altro;
+- limiti keep-alive comuni;
+- statistiche di riuso: richieste vs connessioni TCP aperte (trace httpcore);
+- chiusura pulita (close / aclose_loop, e close automatico all'uscita);
+- instradamento per contesto delle richieste py_clob_client: la libreria usa un unico client
+  globale; al suo posto si installa _ClobRouter, che inoltra al client scelto con
+  use_clob_client() nel thread/task corrente (ogni OrderExecutor il suo proxy) oppure a quello
+  di default (install_clob_client). Nessuno swap globale durante le richieste.
+"""
+
+import asyncio
+import atexit
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+import httpx
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120.0)
+
+
+class _Stats:
+    __slots__ = ("requests", "connections", "errors")
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.errors = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        reused = max(0, self.requests - self.connections)
+        return {
+            "requests": self.requests,
+            "connections": self.connections,
+            "reused": reused,
+            "reuse_ratio": reused / self.requests if self.requests else 0.0,
+            "errors": self.errors,
+        }
+
+
+def _label(name: str, proxy: Optional[str]) -> str:
+    """Etichetta per le statistiche: mai credenziali del proxy nei log."""
+    if not proxy:
+        return name
+    from urllib.parse import urlparse
+    p = urlparse(proxy)
+    user = (p.username or "")
+    country = user.split("_cr.")[-1] if "_cr." in user else ""
+    return f"{name}@{p.hostname}{'/' + country if country else ''}"
+
+
+class HttpClientRegistry:
+    """Client httpx condivisi, uno per (destinazione, proxy)."""
+
+    def __init__(self, limits: httpx.Limits = DEFAULT_LIMITS, timeout: float = DEFAULT_TIMEOUT):
+        self.limits = limits
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, Optional[str]], httpx.Client] = {}
+        self._async_clients: Dict[Tuple[str, Optional[str], int], httpx.AsyncClient] = {}
+        self._stats: Dict[str, _Stats] = {}
+
+    def _stats_for(self, label: str) -> _Stats:
+        st = self._stats.get(label)
+        if st is None:
+            st = self._stats[label] = _Stats()
+        return st
+
+    def _sync_hooks(self, st: _Stats) -> Dict:
+        def _trace(event: str, info: Dict) -> None:
+            if event.endswith("connect_tcp.complete"):
+                st.connections += 1
+
+        def _on_request(request: httpx.Request) -> None:
+            request.extensions["trace"] = _trace
+
+        def _on_response(response: httpx.Response) -> None:
+            st.requests += 1
+            if response.status_code >= 500:
+                st.errors += 1
+
+        return {"request": [_on_request], "response": [_on_response]}
+
+    def _async_hooks(self, st: _Stats) -> Dict:
+        async def _trace(event: str, info: Dict) -> None:
+            if event.endswith("connect_tcp.complete"):
+                st.connections += 1
+
+        async def _on_request(request: httpx.Request) -> None:
+            request.extensions["trace"] = _trace
+
+        async def _on_response(response: httpx.Response) -> None:
+            st.requests += 1
+            if response.status_code >= 500:
+                st.errors += 1
+
+        return {"request": [_on_request], "response": [_on_response]}
+
+    def get(self, name: str, proxy: Optional[str] = None, limits: Optional[httpx.Limits] = None) -> httpx.Client:
+        """
+        Client sincrono per (name, proxy), creato alla prima richiesta e poi riusato.
+        limits vale solo alla creazione (default: limiti del registro).
+        """
+        key = (name, proxy or None)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None or client.is_closed:
+                st = self._stats_for(_label(name, proxy))
+                client = httpx.Client(
+                    http2=True,
+                    proxy=proxy or None,
+                    timeout=self.timeout,
+                    limits=limits or self.limits,
+                    event_hooks=self._sync_hooks(st),
+                )
+                self._clients[key] = client
+            return client
+
+    def get_async(self, name: str, proxy: Optional[str] = None) -> httpx.AsyncClient:
+        """Client asincrono per (name, proxy) legato alla event loop corrente (chiudere con aclose_loop)."""
+        key = (name, proxy or None, id(asyncio.get_running_loop()))
+        with self._lock:
+            client = self._async_clients.get(key)
+            if client is None or client.is_closed:
+                st = self._stats_for(_label(name, proxy))
+                client = httpx.AsyncClient(
+                    http2=True,
+                    proxy=proxy or None,
+                    timeout=self.timeout,
+                    limits=self.limits,
+                    event_hooks=self._async_hooks(st),
+                )
+                self._async_clients[key] = client
+            return client
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per destinazione: richieste, connessioni aperte, richieste su connessione riusata, errori 5xx."""
+        with self._lock:
+            return {label: st.as_dict() for label, st in self._stats.items()}
+
+    def close(self) -> None:
+        """Chiude tutti i client sincroni."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    async def aclose_loop(self) -> None:
+        """Chiude i client asincroni della event loop corrente."""
+        loop_id = id(asyncio.get_running_loop())
+        with self._lock:
+            keys = [k for k in self._async_clients if k[2] == loop_id]
+            clients = [self._async_clients.pop(k) for k in keys]
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+
+
+def format_stats(stats: Dict[str, Dict[str, float]]) -> str:
+    """Riga compatta per i log: "data-api 12 req/1 conn (92% riuso)"."""
+    parts = []
+    for label, st in sorted(stats.items()):
+        if st["requests"]:
+            parts.append(f"{label} {st['requests']} req/{st['connections']} conn ({st['reuse_ratio']:.0%} riuso)")
+    return ", ".join(parts)
+
+
+# Registro di processo usato da claims, check_cash, cycle, executor e multi_wallet
+registry = HttpClientRegistry()
+atexit.register(registry.close)
+
+
+# Client CLOB del contesto corrente (per thread / task asyncio); None = client di default
+_clob_client_var: ContextVar[Optional[httpx.Client]] = ContextVar("clob_http_client", default=None)
+
+
+class _ClobRouter:
+    """Sostituto di py_clob_client.http_helpers.helpers._http_client: inoltra al client del contesto."""
+
+    def __init__(self, default: Optional[httpx.Client]):
+        self.default = default
+
+    def current(self) -> httpx.Client:
+        client = _clob_client_var.get() or self.default
+        if client is None:
+            raise RuntimeError("nessun client HTTP CLOB configurato")
+        return client
+
+    def request(self, *args, **kwargs) -> httpx.Response:
+        return self.current().request(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self.current(), name)
+
+
+# Client di default impostato prima che py_clob_client sia importato (vedi install_clob_client)
+_pending_default: Optional[httpx.Client] = None
+
+
+def _clob_router() -> _ClobRouter:
+    import py_clob_client.http_helpers.helpers as _h
+    router = getattr(_h, "_http_client", None)
+    if not isinstance(router, _ClobRouter):
+        router = _h._http_client = _ClobRouter(_pending_default or router)
+    return router
+
+
+def preload_clob_client() -> None:
+    """Importa py_clob_client (≈1 s) e aggancia il router: per l'avvio rapido, in un thread in background."""
+    _clob_router()
+
+
+@contextmanager
+def use_clob_client(client: Optional[httpx.Client]) -> Iterator[None]:
+    """
+    Le richieste py_clob_client fatte in questo blocco (stesso thread o task) usano `client`
+    (None = client di default). Annidabile; non tocca gli altri thread.
+    """
+    _clob_router()
+    token = _clob_client_var.set(client)
+    try:
+        yield
+    finally:
+        _clob_client_var.reset(token)
+
+
+def install_clob_client(client: httpx.Client) -> Optional[httpx.Client]:
+    """
+    Imposta il client HTTP di default di py_clob_client e ritorna quello precedente.
+    Il precedente non viene chiuso: o è del registro (chiuso all'uscita) o è l'unico client
+    creato dalla libreria all'import, che può servire per ripristinare lo stato.
+    """
+    global _pending_default
+    pending, _pending_default = _pending_default, client
+    if "py_clob_client.http_helpers.helpers" not in sys.modules:
+        # Libreria non ancora importata (avvio rapido): il router userà questo client quando verrà agganciato
+        return pending
+    router = _clob_router()
+    previous, router.default = router.default, client
+    return previous
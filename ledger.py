@@ -0,0 +1,302 @@
+"""
+Registro locale dei claim inviati/confermati (per non richiedere due volte lo stesso conditionId).
+
+La Data API continua a riportare le posizioni come `redeemable` finché l'indexer non si
+aggiorna: senza memoria il ciclo successivo rimanda gli stessi conditionId al relayer
+(quota e gas sprecati). Qui:
+- ogni conditionId inviato viene registrato (tx hash, stato, timestamp, importo);
+- il ciclo salta i conditionId in attesa (pending) o confermati di recente;
+- gli stati pending si riconciliano con la chain tramite una sorgente pluggabile
+  (ClaimStateSource; JsonRpcClaimState usa eth_getTransactionReceipt);
+- su disco è un log append-only JSONL (una riga per cambio di stato, l'ultima vince),
+  compattato quando le righe superano il doppio delle voci vive; in memoria un dict
+  (owner, conditionId) → voce, quindi lookup O(1) anche con centinaia di migliaia di voci.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+PENDING = "pending"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+
+# Sotto questa soglia di righe il log non viene mai compattato
+COMPACT_MIN_LINES = 10_000
+
+_TX_HASH = re.compile(r"0x[0-9a-fA-F]{64}")
+
+
+def is_tx_hash(value) -> bool:
+    """True per un hash di transazione on-chain (0x + 32 byte esadecimali), non per l'ID del relayer."""
+    return isinstance(value, str) and _TX_HASH.fullmatch(value) is not None
+
+
+@dataclass
+class LedgerEntry:
+    condition_id: str
+    state: str
+    tx_hash: Optional[str] = None
+    ts: float = 0.0
+    amount: Optional[float] = None
+    owner: str = ""
+    # ID della transazione lato relayer (transactionID) quando l'hash on-chain non è ancora noto
+    relayer_id: Optional[str] = None
+
+    def to_record(self) -> Dict:
+        rec = {"c": self.condition_id, "s": self.state, "t": round(self.ts, 3)}
+        if self.tx_hash:
+            rec["h"] = self.tx_hash
+        if self.relayer_id:
+            rec["r"] = self.relayer_id
+        if self.amount is not None:
+            rec["a"] = self.amount
+        if self.owner:
+            rec["o"] = self.owner
+        return rec
+
+    @classmethod
+    def from_record(cls, rec: Dict) -> "LedgerEntry":
+        return cls(
+            condition_id=rec["c"],
+            state=rec["s"],
+            tx_hash=rec.get("h"),
+            ts=float(rec.get("t") or 0.0),
+            amount=rec.get("a"),
+            owner=rec.get("o") or "",
+            relayer_id=rec.get("r"),
+        )
+
+
+def _key(condition_id: str, owner: str = "") -> Tuple[str, str]:
+    return (owner or "").lower(), condition_id.strip().lower()
+
+
+class ClaimStateSource:
+    """
+    Stato on-chain dei claim per ClaimLedger.reconcile.
+    transaction_statuses ritorna per ogni hash: True (tx riuscita), False (revert), None (ancora sconosciuta).
+    """
+
+    def transaction_statuses(self, tx_hashes: List[str]) -> Dict[str, Optional[bool]]:
+        raise NotImplementedError
+
+
+class JsonRpcClaimState(ClaimStateSource):
+    """ClaimStateSource su un nodo JSON-RPC (batch di eth_getTransactionReceipt in una sola POST)."""
+
+    def __init__(self, rpc_url: str, client=None, batch_size: int = 100):
+        self.rpc_url = rpc_url
+        self.batch_size = max(1, batch_size)
+        self._client = client
+
+    def _http(self):
+        if self._client is None:
+            from http_clients import registry
+            self._client = registry.get("rpc")
+        return self._client
+
+    def transaction_statuses(self, tx_hashes: List[str]) -> Dict[str, Optional[bool]]:
+        out: Dict[str, Optional[bool]] = {}
+        for i in range(0, len(tx_hashes), self.batch_size):
+            chunk = tx_hashes[i:i + self.batch_size]
+            payload = [
+                {"jsonrpc": "2.0", "id": n, "method": "eth_getTransactionReceipt", "params": [h]}
+                for n, h in enumerate(chunk)
+            ]
+            r = self._http().post(self.rpc_url, json=payload)
+            r.raise_for_status()
+            replies = r.json()
+            if isinstance(replies, dict):
+                replies = [replies]
+            by_id = {rep.get("id"): rep for rep in replies}
+            for n, h in enumerate(chunk):
+                receipt = (by_id.get(n) or {}).get("result")
+                if not receipt:
+                    out[h] = None
+                else:
+                    out[h] = int(str(receipt.get("status") or "0x0"), 16) == 1
+        return out
+
+
+class ClaimLedger:
+    """
+    Registro dei claim per (owner, conditionId).
+    pending_ttl: dopo quanti secondi un invio senza conferma torna claimabile.
+    confirmed_ttl: per quanti secondi un claim confermato viene saltato (ritardo dell'indexer Data API).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        pending_ttl: float = 3600.0,
+        confirmed_ttl: float = 24 * 3600.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.pending_ttl = pending_ttl
+        self.confirmed_ttl = confirmed_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._index: Dict[Tuple[str, str], LedgerEntry] = {}
+        # Chiavi delle voci pending: la riconciliazione non scorre tutta la storia
+        self._pending: set = set()
+        self._lines = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, condition_id: str, owner: str = "") -> Optional[LedgerEntry]:
+        return self._index.get(_key(condition_id, owner))
+
+    def _skip(self, entry: Optional[LedgerEntry], now: float) -> bool:
+        if entry is None:
+            return False
+        if entry.state == PENDING:
+            return now - entry.ts < self.pending_ttl
+        if entry.state == CONFIRMED:
+            return now - entry.ts < self.confirmed_ttl
+        return False
+
+    def should_skip(self, condition_id: str, owner: str = "") -> bool:
+        """True se il conditionId è in attesa o confermato di recente."""
+        return self._skip(self.get(condition_id, owner), self._clock())
+
+    def filter_claimable(self, condition_ids: Iterable[str], owner: str = "") -> Tuple[List[str], List[str]]:
+        """Divide i conditionId in (da claimare, saltati perché pending/confermati di recente)."""
+        now = self._clock()
+        todo, skipped = [], []
+        for cid in condition_ids:
+            (skipped if self._skip(self._index.get(_key(cid, owner)), now) else todo).append(cid)
+        return todo, skipped
+
+    def record(
+        self,
+        condition_ids: Iterable[str],
+        state: str,
+        tx_hash: Optional[str] = None,
+        owner: str = "",
+        amounts: Optional[Dict[str, float]] = None,
+        relayer_id: Optional[str] = None,
+    ) -> None:
+        """
+        Registra lo stesso stato (e tx hash) per più conditionId: una sola scrittura su disco.
+        Solo un vero hash on-chain va in tx_hash (la riconciliazione cerca la sua receipt); un ID del
+        relayer passato come tx_hash finisce in relayer_id.
+        """
+        if tx_hash and not is_tx_hash(tx_hash):
+            relayer_id, tx_hash = relayer_id or tx_hash, None
+        now = self._clock()
+        entries = []
+        for cid in condition_ids:
+            prev = self._index.get(_key(cid, owner))
+            amount = (amounts or {}).get(cid)
+            if amount is None and prev is not None:
+                amount = prev.amount
+            entries.append(LedgerEntry(cid, state, tx_hash, now, amount, owner, relayer_id))
+        self._apply(entries)
+
+    def pending(self) -> List[LedgerEntry]:
+        """Voci in attesa di conferma."""
+        return [self._index[k] for k in list(self._pending)]
+
+    def reconcile(self, source: Optional[ClaimStateSource]) -> Dict[str, int]:
+        """
+        Aggiorna le voci pending: confermate/fallite secondo la chain (una query per tx hash),
+        scadute dopo pending_ttl se la chain non le conosce (o senza source).
+        Ritorna i conteggi {"confirmed", "failed", "expired"}.
+        """
+        counts = {CONFIRMED: 0, FAILED: 0, "expired": 0}
+        now = self._clock()
+        pending = self.pending()
+        if not pending:
+            return counts
+        statuses: Dict[str, Optional[bool]] = {}
+        hashes = sorted({e.tx_hash for e in pending if e.tx_hash})
+        if source is not None and hashes:
+            try:
+                statuses = source.transaction_statuses(hashes)
+            except Exception as e:
+                print(f"  ⚠️  Ledger: riconciliazione on-chain non riuscita: {e}", flush=True)
+        updates = []
+        for e in pending:
+            status = statuses.get(e.tx_hash) if e.tx_hash else None
+            if status is True:
+                updates.append(LedgerEntry(e.condition_id, CONFIRMED, e.tx_hash, now, e.amount, e.owner, e.relayer_id))
+                counts[CONFIRMED] += 1
+            elif status is False:
+                updates.append(LedgerEntry(e.condition_id, FAILED, e.tx_hash, now, e.amount, e.owner, e.relayer_id))
+                counts[FAILED] += 1
+            elif now - e.ts >= self.pending_ttl:
+                updates.append(LedgerEntry(e.condition_id, FAILED, e.tx_hash, now, e.amount, e.owner, e.relayer_id))
+                counts["expired"] += 1
+        self._apply(updates)
+        return counts
+
+    # --- persistenza ---
+
+    def _put(self, e: LedgerEntry) -> None:
+        key = _key(e.condition_id, e.owner)
+        self._index[key] = e
+        if e.state == PENDING:
+            self._pending.add(key)
+        else:
+            self._pending.discard(key)
+
+    def _apply(self, entries: List[LedgerEntry]) -> None:
+        if not entries:
+            return
+        with self._lock:
+            for e in entries:
+                self._put(e)
+            if not self.path:
+                return
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(e.to_record(), separators=(",", ":")) + "\n" for e in entries))
+                self._lines += len(entries)
+            except OSError as err:
+                print(f"  ⚠️  Ledger claim non salvato ({self.path}): {err}", flush=True)
+                return
+            if self._lines > max(COMPACT_MIN_LINES, 2 * len(self._index)):
+                self._compact()
+
+    def _compact(self) -> None:
+        """Riscrive il log con solo l'ultimo stato di ogni voce (scrittura atomica)."""
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for e in self._index.values():
+                    f.write(json.dumps(e.to_record(), separators=(",", ":")) + "\n")
+            os.replace(tmp, self.path)
+            self._lines = len(self._index)
+        except OSError as err:
+            print(f"  ⚠️  Ledger claim non compattato ({self.path}): {err}", flush=True)
+
+    def _load(self) -> None:
+        if not self.path or not os.path.isfile(self.path):
+            return
+        bad = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._lines += 1
+                    try:
+                        e = LedgerEntry.from_record(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        # Riga troncata (es. crash durante la scrittura): si ignora
+                        bad += 1
+                        continue
+                    self._put(e)
+        except OSError as err:
+            print(f"  ⚠️  Ledger claim non leggibile ({self.path}): {err}")
+        if bad:
+            print(f"  ⚠️  Ledger claim: {bad} righe non valide ignorate ({self.path})")
+            # Riscrive subito il log: le prossime righe non vanno accodate a una riga troncata
+            with self._lock:
+                self._compact()
@@ -0,0 +1,208 @@
+"""
+Cache dei dati di mercato CLOB (orderbook, midpoint) per OrderExecutor.
+
+Ogni lettura passava dal proxy residenziale (banda pagata a GB). Qui:
+- TTL per tipo di dato (orderbook, midpoint) con override per singolo token;
+- LRU: oltre max_entries si scarta la voce usata meno di recente;
+- coalescing: chiamanti concorrenti per la stessa (tipo, token) condividono un'unica
+  richiesta in corso invece di farne una ciascuno;
+- contatori hit/miss/coalesced/evictions;
+- invalidate() dopo un nostro ordine sul token (il book è cambiato).
+I risultati None (errore/dato mancante) non vengono messi in cache.
+
+CompactBook: orderbook delle richieste batch (/books) in array numerici (prezzo/size per lato,
+migliore livello per primo) invece di liste di dict/oggetti per livello.
+"""
+
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_TTLS = {"orderbook": 2.0, "book": 2.0, "midpoint": 5.0}
+
+
+@dataclass
+class CompactBook:
+    """Orderbook compatto: bid in prezzo decrescente, ask in prezzo crescente (indice 0 = migliore)."""
+    token_id: str
+    bid_prices: array
+    bid_sizes: array
+    ask_prices: array
+    ask_sizes: array
+    tick_size: float = 0.01
+    min_order_size: float = 0.0
+    neg_risk: bool = False
+    timestamp: str = ""
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bid_prices[0] if self.bid_prices else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.ask_prices[0] if self.ask_prices else None
+
+    @property
+    def mid(self) -> Optional[float]:
+        if not self.bid_prices or not self.ask_prices:
+            return None
+        return (self.bid_prices[0] + self.ask_prices[0]) / 2
+
+    @classmethod
+    def from_raw(cls, raw: Dict) -> "CompactBook":
+        """Da una voce della risposta CLOB /books (livelli {"price": "0.5", "size": "10"})."""
+        bids = sorted(((float(l["price"]), float(l["size"])) for l in raw.get("bids") or ()), reverse=True)
+        asks = sorted((float(l["price"]), float(l["size"])) for l in raw.get("asks") or ())
+        return cls(
+            token_id=str(raw.get("asset_id") or ""),
+            bid_prices=array("d", (p for p, _ in bids)),
+            bid_sizes=array("d", (s for _, s in bids)),
+            ask_prices=array("d", (p for p, _ in asks)),
+            ask_sizes=array("d", (s for _, s in asks)),
+            tick_size=float(raw.get("tick_size") or 0.01),
+            min_order_size=float(raw.get("min_order_size") or 0),
+            neg_risk=bool(raw.get("neg_risk")),
+            timestamp=str(raw.get("timestamp") or ""),
+        )
+
+
+class MarketDataCache:
+    """Cache thread-safe (tipo, token_id) → valore, con TTL, LRU e richieste condivise."""
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttls: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._token_ttls: Dict[str, float] = {}
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (tipo, token) → (scadenza, valore), in ordine di uso (LRU in testa)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def set_token_ttl(self, token_id: str, seconds: Optional[float]) -> None:
+        """TTL specifico per un token (es. mercati illiquidi più lunghi); None rimuove l'override."""
+        with self._lock:
+            if seconds is None:
+                self._token_ttls.pop(token_id, None)
+            else:
+                self._token_ttls[token_id] = float(seconds)
+
+    def _ttl(self, kind: str, token_id: str) -> float:
+        ttl = self._token_ttls.get(token_id)
+        return ttl if ttl is not None else self.ttls.get(kind, 0.0)
+
+    def get(self, kind: str, token_id: str) -> Optional[Any]:
+        """Valore in cache non scaduto (None altrimenti); non conta come hit/miss."""
+        with self._lock:
+            item = self._entries.get((kind, token_id))
+            if item is not None and item[0] > self._clock():
+                return item[1]
+            return None
+
+    def get_many(self, kind: str, token_ids: Iterable[str]) -> Tuple[Dict[str, Any], List[str]]:
+        """Per le richieste batch: (valori validi in cache, token da scaricare). Conta hit/miss."""
+        found, missing = {}, []
+        with self._lock:
+            now = self._clock()
+            for token_id in token_ids:
+                key = (kind, token_id)
+                item = self._entries.get(key)
+                if item is not None and item[0] > now:
+                    self._entries.move_to_end(key)
+                    found[token_id] = item[1]
+                else:
+                    missing.append(token_id)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def put(self, kind: str, token_id: str, value: Any) -> None:
+        """Inserisce un valore già noto (es. da una richiesta batch)."""
+        if value is None:
+            return
+        with self._lock:
+            self._store((kind, token_id), value)
+
+    def _store(self, key: Tuple[str, str], value: Any) -> None:
+        ttl = self._ttl(*key)
+        if ttl <= 0:
+            return
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_fetch(self, kind: str, token_id: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Valore in cache se valido, altrimenti fetch() (una sola richiesta anche con più thread
+        che chiedono lo stesso token). Le eccezioni di fetch arrivano a tutti i chiamanti in attesa.
+        """
+        key = (kind, token_id)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                if item[0] > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+                del self._entries[key]
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                self.misses += 1
+                fut = self._inflight[key] = Future()
+                owner = True
+        if not owner:
+            return fut.result()
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            if value is not None:
+                self._store(key, value)
+        fut.set_result(value)
+        return value
+
+    def invalidate(self, token_id: Optional[str] = None, kind: Optional[str] = None) -> int:
+        """Rimuove le voci del token (o di tutti i token) e/o del tipo indicato. Ritorna le voci rimosse."""
+        with self._lock:
+            keys = [
+                k for k in self._entries
+                if (token_id is None or k[1] == token_id) and (kind is None or k[0] == kind)
+            ]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,328 @@
+"""
+Stream dati di mercato dal canale WebSocket "market" del CLOB e copia locale degli orderbook.
+
+Ogni lettura di prezzo in OrderExecutor era un GET via proxy. Qui, per i token sottoscritti:
+- snapshot ("book") e variazioni ("price_change") applicati a un book L2 per token: per lato
+  due array('d') paralleli prezzo/size ordinati per prezzo crescente, aggiornati per bisezione
+  (size 0 = livello rimosso);
+- midpoint e migliori prezzi letti dagli array (microsecondi, nessuna richiesta di rete);
+- orderbook nello stesso formato del REST (OrderBookSummary), ricostruito solo quando il book cambia;
+- dopo una disconnessione i book non sono validi finché non arriva un nuovo snapshot
+  (le letture tornano al REST nel frattempo); riconnessione con backoff.
+ChannelStream (thread, keepalive, riconnessione) è condivisa con il canale user (orders.UserStream).
+
+Formati messaggi (Polymarket): "book" con bids/asks (o buys/sells); "price_change" con
+price_changes[{asset_id, price, size, side}] (o asset_id + changes[{price, size, side}]);
+"tick_size_change"; "last_trade_price" ignorato. Keepalive: testo "PING" → "PONG".
+"""
+
+import json
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Tuple
+
+MARKET_WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+
+
+class L2Book:
+    """Book L2 di un token. Non thread-safe da solo: MarketStream lo protegge con il suo lock."""
+
+    __slots__ = ("token_id", "bid_px", "bid_sz", "ask_px", "ask_sz", "tick_size", "timestamp",
+                 "market", "version", "ready", "_summary", "_summary_version")
+
+    def __init__(self, token_id: str):
+        self.token_id = token_id
+        self.bid_px, self.bid_sz = array("d"), array("d")
+        self.ask_px, self.ask_sz = array("d"), array("d")
+        self.tick_size = "0.01"
+        self.timestamp = ""
+        self.market = ""
+        self.version = 0
+        self.ready = False
+        self._summary = None
+        self._summary_version = -1
+
+    def _side(self, side: str) -> Tuple[array, array]:
+        return (self.bid_px, self.bid_sz) if side.upper() in ("BUY", "BID") else (self.ask_px, self.ask_sz)
+
+    def apply_snapshot(self, bids: Iterable[Dict], asks: Iterable[Dict]) -> None:
+        for levels, (px, sz) in ((bids, (self.bid_px, self.bid_sz)), (asks, (self.ask_px, self.ask_sz))):
+            pairs = sorted((float(l["price"]), float(l["size"])) for l in levels or ())
+            px[:] = array("d", (p for p, s in pairs if s > 0))
+            sz[:] = array("d", (s for p, s in pairs if s > 0))
+        self.ready = True
+        self.version += 1
+
+    def apply_delta(self, side: str, price: float, size: float) -> None:
+        """Nuova size aggregata del livello (0 = livello rimosso)."""
+        px, sz = self._side(side)
+        i = bisect_left(px, price)
+        if i < len(px) and px[i] == price:
+            if size > 0:
+                sz[i] = size
+            else:
+                del px[i]
+                del sz[i]
+        elif size > 0:
+            px.insert(i, price)
+            sz.insert(i, size)
+        self.version += 1
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bid_px[-1] if self.bid_px else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.ask_px[0] if self.ask_px else None
+
+    def midpoint(self) -> Optional[float]:
+        if not self.bid_px or not self.ask_px:
+            return None
+        return (self.bid_px[-1] + self.ask_px[0]) / 2
+
+    def summary(self):
+        """OrderBookSummary come GET /book (bids crescenti, asks decrescenti: migliore per ultimo)."""
+        if self._summary_version != self.version:
+            from py_clob_client.clob_types import OrderBookSummary, OrderSummary
+            self._summary = OrderBookSummary(
+                market=self.market,
+                asset_id=self.token_id,
+                timestamp=self.timestamp,
+                bids=[OrderSummary(price=f"{p:g}", size=f"{s:g}") for p, s in zip(self.bid_px, self.bid_sz)],
+                asks=[OrderSummary(price=f"{p:g}", size=f"{s:g}")
+                      for p, s in zip(reversed(self.ask_px), reversed(self.ask_sz))],
+                tick_size=self.tick_size,
+            )
+            self._summary_version = self.version
+        return self._summary
+
+
+class ChannelStream:
+    """
+    Connessione a un canale WebSocket del CLOB in un thread dedicato: keepalive "PING",
+    riconnessione con backoff, sottoscrizione ripetuta a ogni connessione.
+    Le sottoclassi definiscono _subscription(), handle_message(raw) e _on_disconnect().
+    connect: factory della connessione (default websockets.sync.client.connect), per i test.
+    """
+
+    name = "canale"
+
+    def __init__(self, url: str, ping_interval: float = 10.0, max_backoff: float = 30.0, connect=None):
+        self.url = url
+        self.ping_interval = ping_interval
+        self.max_backoff = max_backoff
+        self._connect = connect
+        self._ws = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = threading.Event()
+        self.messages = 0
+        self.reconnects = 0
+
+    def _subscription(self) -> Dict:
+        raise NotImplementedError
+
+    def handle_message(self, raw: str) -> None:
+        raise NotImplementedError
+
+    def _on_disconnect(self) -> None:
+        pass
+
+    def _send(self, msg: Dict) -> None:
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.send(json.dumps(msg))
+            except Exception:
+                pass  # alla riconnessione si risottoscrive l'insieme completo
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"ws-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _open(self):
+        if self._connect is not None:
+            return self._connect(self.url)
+        from websockets.sync.client import connect
+        return connect(self.url, open_timeout=10, max_size=None)
+
+    def _run(self) -> None:
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                with self._open() as ws:
+                    self._ws = ws
+                    ws.send(json.dumps(self._subscription()))
+                    self.connected.set()
+                    backoff = 0.5
+                    last_ping = time.monotonic()
+                    while not self._stop.is_set():
+                        try:
+                            raw = ws.recv(timeout=max(0.1, self.ping_interval - (time.monotonic() - last_ping)))
+                        except TimeoutError:
+                            raw = None
+                        if raw is not None:
+                            self.handle_message(raw if isinstance(raw, str) else raw.decode())
+                        if time.monotonic() - last_ping >= self.ping_interval:
+                            ws.send("PING")
+                            last_ping = time.monotonic()
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                print(f"  ⚠️  WebSocket {self.name} disconnesso ({type(e).__name__}: {e}); riconnessione tra {backoff:.1f}s", flush=True)
+            finally:
+                self._ws = None
+                self.connected.clear()
+                self._on_disconnect()
+            if self._stop.wait(backoff * random.uniform(0.5, 1.0)):
+                break
+            self.reconnects += 1
+            backoff = min(self.max_backoff, backoff * 2)
+
+
+class MarketStream(ChannelStream):
+    """Sottoscrizione al canale market per un insieme di token, con un book L2 locale per token."""
+
+    name = "market"
+
+    def __init__(
+        self,
+        token_ids: Iterable[str] = (),
+        url: str = MARKET_WS_URL,
+        ping_interval: float = 10.0,
+        max_backoff: float = 30.0,
+        connect=None,
+    ):
+        super().__init__(url, ping_interval=ping_interval, max_backoff=max_backoff, connect=connect)
+        self._lock = threading.Lock()
+        self._tokens = set(str(t) for t in token_ids)
+        self._books: Dict[str, L2Book] = {}
+        self.snapshots = 0
+        self.deltas = 0
+
+    # --- letture (thread-safe) ---
+
+    def subscribed(self, token_id: str) -> bool:
+        return token_id in self._tokens
+
+    def midpoint(self, token_id: str) -> Optional[float]:
+        """Midpoint dal book locale; None se il token non è sottoscritto/sincronizzato o un lato è vuoto."""
+        with self._lock:
+            book = self._books.get(token_id)
+            return book.midpoint() if book is not None and book.ready else None
+
+    def orderbook(self, token_id: str):
+        """OrderBookSummary dal book locale (None se non sincronizzato)."""
+        with self._lock:
+            book = self._books.get(token_id)
+            return book.summary() if book is not None and book.ready else None
+
+    def best(self, token_id: str) -> Tuple[Optional[float], Optional[float]]:
+        with self._lock:
+            book = self._books.get(token_id)
+            if book is None or not book.ready:
+                return None, None
+            return book.best_bid, book.best_ask
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            ready = sum(1 for b in self._books.values() if b.ready)
+        return {"tokens": len(self._tokens), "ready": ready, "messages": self.messages,
+                "snapshots": self.snapshots, "deltas": self.deltas, "reconnects": self.reconnects}
+
+    # --- messaggi ---
+
+    def _book_for(self, token_id: str) -> Optional[L2Book]:
+        if token_id not in self._tokens:
+            return None
+        book = self._books.get(token_id)
+        if book is None:
+            book = self._books[token_id] = L2Book(token_id)
+        return book
+
+    def handle_message(self, raw: str) -> None:
+        """Applica un messaggio del canale (oggetto o lista di eventi). Pubblico per il replay nei test."""
+        if not raw or raw in ("PONG", "PING"):
+            return
+        data = json.loads(raw)
+        events = data if isinstance(data, list) else [data]
+        with self._lock:
+            self.messages += 1
+            for ev in events:
+                if isinstance(ev, dict):
+                    self._apply_event(ev)
+
+    def _apply_event(self, ev: Dict) -> None:
+        kind = ev.get("event_type")
+        if kind == "book":
+            book = self._book_for(str(ev.get("asset_id") or ""))
+            if book is not None:
+                book.market = str(ev.get("market") or book.market)
+                book.timestamp = str(ev.get("timestamp") or "")
+                book.apply_snapshot(ev.get("bids", ev.get("buys")), ev.get("asks", ev.get("sells")))
+                self.snapshots += 1
+        elif kind == "price_change":
+            changes = ev.get("price_changes")
+            if changes is None:
+                changes = [dict(c, asset_id=ev.get("asset_id")) for c in ev.get("changes") or ()]
+            for ch in changes:
+                book = self._book_for(str(ch.get("asset_id") or ""))
+                # Variazioni prima dello snapshot: ignorate, lo snapshot le include già
+                if book is not None and book.ready:
+                    book.apply_delta(str(ch.get("side") or ""), float(ch["price"]), float(ch["size"]))
+                    book.timestamp = str(ev.get("timestamp") or book.timestamp)
+                    self.deltas += 1
+        elif kind == "tick_size_change":
+            book = self._book_for(str(ev.get("asset_id") or ""))
+            if book is not None and ev.get("new_tick_size"):
+                book.tick_size = str(ev["new_tick_size"])
+                book.version += 1
+
+    # --- sottoscrizioni ---
+
+    def subscribe(self, token_ids: Iterable[str]) -> None:
+        new = [str(t) for t in token_ids if str(t) not in self._tokens]
+        if not new:
+            return
+        with self._lock:
+            self._tokens.update(new)
+        self._send({"assets_ids": new, "operation": "subscribe"})
+
+    def unsubscribe(self, token_ids: Iterable[str]) -> None:
+        gone = [str(t) for t in token_ids if str(t) in self._tokens]
+        if not gone:
+            return
+        with self._lock:
+            for t in gone:
+                self._tokens.discard(t)
+                self._books.pop(t, None)
+        self._send({"assets_ids": gone, "operation": "unsubscribe"})
+
+    # --- connessione ---
+
+    def _subscription(self) -> Dict:
+        return {"assets_ids": sorted(self._tokens), "type": "market"}
+
+    def _on_disconnect(self) -> None:
+        # Fino al prossimo snapshot i book possono aver perso variazioni
+        with self._lock:
+            for book in self._books.values():
+                book.ready = False
@@ -0,0 +1,276 @@
+"""
+Metriche Prometheus (formato testo 0.0.4) del loop di claim e dell'executor, senza dipendenze.
+
+Finora c'erano solo i print nei log. Qui:
+- Counter / Gauge / Histogram con etichette: un dict e un lock per metrica, nessuna allocazione
+  oltre alla prima osservazione di ogni combinazione di etichette;
+- i dati già tenuti da altri moduli (retry/circuiti, client HTTP, pool proxy) si leggono solo a
+  ogni scrape tramite collector registrati con add_collector: nessun costo sul percorso caldo;
+- start_http_server(port): endpoint /metrics opzionale (METRICS_PORT in check_cash); senza
+  scrape il thread del server resta fermo in accept e il testo si genera solo su richiesta.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+Sample = Tuple[str, Dict[str, str], float]  # (nome, etichette, valore)
+
+
+def _fmt_value(v: float) -> str:
+    v = float(v)
+    if v == float("inf"):
+        return "+Inf"
+    return str(int(v)) if v.is_integer() and abs(v) < 1e15 else repr(v)
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[object, object] = {}
+        # Chiave = valore dell'etichetta (una sola) o tupla di valori; convertiti in stringa solo allo scrape
+        self._key = itemgetter(*self.labelnames) if self.labelnames else lambda labels: ()
+
+    def _labels(self, key) -> Dict[str, str]:
+        if len(self.labelnames) == 1:
+            key = (key,)
+        return dict(zip(self.labelnames, map(str, key)))
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, self._labels(k), float(v)) for k, v in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._functions: Dict[object, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def set_function(self, fn: Callable[[], float], **labels) -> None:
+        """Valore letto da fn() a ogni scrape (es. quota residua)."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = fn
+
+    def samples(self) -> List[Sample]:
+        out = super().samples()
+        with self._lock:
+            functions = list(self._functions.items())
+        for key, fn in functions:
+            try:
+                out.append((self.name, self._labels(key), float(fn())))
+            except Exception:
+                pass
+        return out
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 180.0)
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [conteggi per bucket (non cumulativi) + overflow, somma, numero]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            items = [(k, list(s[0]), s[1], s[2]) for k, s in self._values.items()]
+        out: List[Sample] = []
+        for key, counts, total, n in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                out.append((self.name + "_bucket", {**labels, "le": _fmt_value(bound)}, cumulative))
+            out.append((self.name + "_sum", labels, total))
+            out.append((self.name + "_count", labels, n))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]) -> None:
+        """fn() → [(nome, tipo, help, campioni)], chiamata solo a ogni scrape."""
+        with self._lock:
+            self._collectors.append(fn)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        families = [(m.name, m.kind, m.help, m.samples()) for m in metrics]
+        for fn in collectors:
+            try:
+                families.extend(fn())
+            except Exception as e:
+                families.append(("polybot_collector_errors", "gauge", f"collector fallito: {e}", [("polybot_collector_errors", {}, 1.0)]))
+        lines = []
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{n}{_fmt_labels(l)} {_fmt_value(v)}" for n, l, v in samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, help, labelnames))
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return registry.register(Gauge(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, help, labelnames, buckets))
+
+
+# --- metriche del bot ---
+
+CYCLE_SECONDS = histogram(
+    "polybot_cycle_duration_seconds", "Durata di un ciclo di claim (balance ∥ posizioni → claim)",
+    buckets=(0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+STAGE_SECONDS = histogram(
+    "polybot_stage_duration_seconds",
+    "Durata delle fasi: balance, positions, calldata, relayer, relayer_node, order_post, order_post_batch, order_sign",
+    ["stage"],
+)
+STAGE_TIMEOUTS = counter("polybot_stage_timeouts_total", "Fasi interrotte per timeout", ["stage"])
+CLAIMS = counter("polybot_claims_total", "Mercati claimati", ["via"])
+RELAYER_REQUESTS = counter("polybot_relayer_requests_total", "Richieste al relayer per esito (ok, error, rate_limited); i timeout sono anche in polybot_stage_timeouts_total", ["outcome"])
+ORDERS = counter("polybot_orders_total", "Ordini CLOB per esito (placed, failed)", ["outcome"])
+ORDER_PIPELINE_QUEUED = gauge("polybot_order_pipeline_queued", "Coda della pipeline ordini per stadio: ordini (build, post) o lotti in firma (sign)", ["stage"])
+PROXY_EXITS = counter("polybot_proxy_exit_outcomes_total", "Esiti dei tentativi per uscita proxy (paese)", ["country", "outcome"])
+POSITION_CHANGES = counter("polybot_position_changes_total", "Posizioni claimabili cambiate rispetto al ciclo precedente (added, removed, changed)", ["kind"])
+CLAIMABLE_USDC = gauge("polybot_claimable_usdc", "Valore (USDC) delle posizioni claimabili non ancora inviate, all'ultimo ciclo", ["wallet"])
+CLAIM_VALUE_LEFT = gauge("polybot_claim_value_left_usdc", "Valore (USDC) claimabile lasciato sul wallet all'ultimo ciclo, per motivo (below_min, deferred, failed)", ["wallet", "reason"])
+RELAYER_QUOTA = gauge("polybot_relayer_quota_remaining", "Richieste relayer disponibili ora", ["builder"])
+
+
+def _retry_families():
+    from retries import engine
+    stats = engine.stats()
+    calls, retries, refused, errors, circuit = [], [], [], [], []
+    for dest, st in sorted(stats.items()):
+        calls.append(("polybot_requests_total", {"destination": dest}, st["calls"]))
+        retries.append(("polybot_retries_total", {"destination": dest}, st["retries"]))
+        refused.append(("polybot_retries_refused_total", {"destination": dest, "reason": "budget"}, st["budget_exhausted"]))
+        refused.append(("polybot_retries_refused_total", {"destination": dest, "reason": "circuit_open"}, st["short_circuited"]))
+        for cls, n in sorted(st.get("errors", {}).items()):
+            errors.append(("polybot_request_errors_total", {"destination": dest, "class": cls}, n))
+        circuit.append(("polybot_circuit_open", {"destination": dest}, 0.0 if st["state"] == "closed" else 1.0))
+    return [
+        ("polybot_requests_total", "counter", "Tentativi di richiesta per destinazione (retry compresi)", calls),
+        ("polybot_retries_total", "counter", "Retry per destinazione", retries),
+        ("polybot_retries_refused_total", "counter", "Chiamate non ritentate: budget retry esaurito o circuito aperto", refused),
+        ("polybot_request_errors_total", "counter", "Errori per destinazione e classe (rate_limited = 429/425)", errors),
+        ("polybot_circuit_open", "gauge", "1 se il circuit breaker della destinazione non è chiuso", circuit),
+    ]
+
+
+def _http_families():
+    from http_clients import registry as http_registry
+    stats = http_registry.stats()
+    reqs = [("polybot_http_requests_total", {"client": k}, st["requests"]) for k, st in sorted(stats.items())]
+    conns = [("polybot_http_connections_opened_total", {"client": k}, st["connections"]) for k, st in sorted(stats.items())]
+    errors = [("polybot_http_server_errors_total", {"client": k}, st["errors"]) for k, st in sorted(stats.items())]
+    return [
+        ("polybot_http_requests_total", "counter", "Richieste HTTP per client condiviso", reqs),
+        ("polybot_http_connections_opened_total", "counter", "Connessioni TCP aperte per client condiviso", conns),
+        ("polybot_http_server_errors_total", "counter", "Risposte 5xx per client condiviso", errors),
+    ]
+
+
+registry.add_collector(_retry_families)
+registry.add_collector(_http_families)
+
+
+def start_http_server(port: int, addr: str = "0.0.0.0"):
+    """Serve /metrics su addr:port in un thread daemon. Ritorna il ThreadingHTTPServer (shutdown() per fermarlo)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            data = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
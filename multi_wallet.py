@@ -0,0 +1,369 @@
+"""
+Modalità multi-wallet: un solo processo per molti account (invece di un container per wallet).
+
+- le posizioni di tutti i wallet si scaricano in parallelo su un unico pool di connessioni
+  HTTP/2 verso la Data API;
+- quota Relayer separata per builder key (più wallet sullo stesso builder condividono la quota);
+  le richieste di una quota condivisa vanno ai batch di valore più alto tra i suoi wallet
+  (claim_planner), non al primo wallet del file;
+- i claim Magic (SIGNATURE_TYPE=1) passano tutti da un unico daemon Node (claim_proxy);
+- uno snapshot delle posizioni per wallet (positions.PositionSnapshot): si claima e si logga
+  solo ciò che è cambiato o non è ancora stato claimato.
+
+File di configurazione (JSON, percorso in CLAIM_WALLETS_FILE). I valori "env:NOME" vengono
+letti dalle variabili d'ambiente, così le chiavi non finiscono nel file:
+
+{
+  "builders": {
+    "main": {"key": "env:BUILDER_API_KEY", "secret": "env:BUILDER_SECRET",
+             "passphrase": "env:BUILDER_PASSPHRASE", "max_per_day": 100}
+  },
+  "wallets": [
+    {"name": "w1", "address": "0x...", "private_key": "env:PK_W1", "signature_type": 1, "builder": "main"}
+  ]
+}
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from claim_planner import ClaimPlan, allocate_requests, plan_claims, value_report
+from claims import (
+    POSITIONS_PAGE_SIZE,
+    REDEEM_GAS_PER_CALL,
+    REDEEM_MAX_BATCH_GAS,
+    REDEEM_MAX_PER_BATCH,
+    RedeemBatchReport,
+    build_redeem_tx,
+    execute_redeem_batches,
+    iter_redeemable_positions,
+    relayer_batch_submitter,
+)
+from ledger import CONFIRMED, FAILED, PENDING
+from metrics import CLAIM_VALUE_LEFT, CYCLE_SECONDS, POSITION_CHANGES, RELAYER_QUOTA, STAGE_SECONDS
+from positions import PositionDelta, PositionSnapshot
+from quota import RelayerQuota
+
+
+@dataclass
+class BuilderCreds:
+    """Credenziali Builder API (relayer) + quota giornaliera associata."""
+    name: str
+    key: str
+    secret: str
+    passphrase: str
+    max_per_day: int = 100
+    burst: Optional[int] = None
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.key and self.secret and self.passphrase)
+
+
+@dataclass
+class WalletConfig:
+    name: str
+    address: str
+    private_key: str
+    builder: str
+    signature_type: int = 0
+
+
+def _resolve(value) -> str:
+    """"env:NOME" → os.environ["NOME"]; altri valori invariati."""
+    if isinstance(value, str) and value.startswith("env:"):
+        return os.getenv(value[4:], "").strip()
+    return str(value).strip() if value is not None else ""
+
+
+def load_wallets_config(path: str) -> Tuple[Dict[str, BuilderCreds], List[WalletConfig]]:
+    """Legge il file multi-wallet. Solleva ValueError se un wallet è incompleto."""
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+
+    builders = {}
+    for name, b in (raw.get("builders") or {}).items():
+        builders[name] = BuilderCreds(
+            name=name,
+            key=_resolve(b.get("key")),
+            secret=_resolve(b.get("secret")),
+            passphrase=_resolve(b.get("passphrase")),
+            max_per_day=int(b.get("max_per_day") or 100),
+            burst=int(b["burst"]) if b.get("burst") else None,
+        )
+
+    wallets = []
+    for i, w in enumerate(raw.get("wallets") or []):
+        name = str(w.get("name") or f"wallet{i + 1}")
+        pk = _resolve(w.get("private_key"))
+        if pk and not pk.startswith("0x"):
+            pk = "0x" + pk
+        signature_type = int(w.get("signature_type", 0))
+        address = _resolve(w.get("address"))
+        if not address and pk and signature_type == 0:
+            from addresses import address_from_private_key
+            address = address_from_private_key(pk)
+        builder = str(w.get("builder") or next(iter(builders), ""))
+        if not address:
+            raise ValueError(f"{name}: address mancante (obbligatorio per Safe/Magic)")
+        if builder not in builders:
+            raise ValueError(f"{name}: builder '{builder}' non definito")
+        wallets.append(WalletConfig(name=name, address=address, private_key=pk, builder=builder, signature_type=signature_type))
+    return builders, wallets
+
+
+def quota_state_path(base_path: str, builder_key: str) -> str:
+    """File stato quota per builder key (la chiave non compare nel nome file)."""
+    root, ext = os.path.splitext(base_path)
+    digest = hashlib.sha256(builder_key.encode()).hexdigest()[:12]
+    return f"{root}.{digest}{ext or '.json'}"
+
+
+class MultiWalletEngine:
+    """Un ciclo di claim per tutti i wallet del file di configurazione."""
+
+    def __init__(
+        self,
+        builders: Dict[str, BuilderCreds],
+        wallets: List[WalletConfig],
+        quota_state: Optional[str] = None,
+        ledger=None,
+        claim_state=None,
+        max_concurrency: int = 16,
+        page_size: int = POSITIONS_PAGE_SIZE,
+        max_per_batch: Optional[int] = None,
+        gas_per_redeem: int = REDEEM_GAS_PER_CALL,
+        max_batch_gas: int = REDEEM_MAX_BATCH_GAS,
+        min_value: float = 0.0,
+        min_batch_value: float = 0.0,
+    ):
+        import httpx
+        from http_clients import registry
+
+        self.builders = builders
+        self.wallets = wallets
+        self.max_concurrency = max(1, max_concurrency)
+        self.page_size = page_size
+        self.max_per_batch = max_per_batch
+        self.gas_per_redeem = gas_per_redeem
+        self.max_batch_gas = max_batch_gas
+        self.min_value = min_value
+        self.min_batch_value = min_batch_value
+        self.snapshots: Dict[str, PositionSnapshot] = {w.name: PositionSnapshot() for w in wallets}
+        # Ledger condiviso (chiave owner+conditionId): claim in attesa/confermati non si rimandano
+        self.ledger = ledger
+        self.claim_state = claim_state
+        # Un solo pool di connessioni verso la Data API per tutti i wallet (client del registro condiviso)
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        self.http = registry.get("data-api", limits=limits)
+        # Quota per builder key: builder con la stessa key condividono lo stesso oggetto
+        self.quotas: Dict[str, RelayerQuota] = {}
+        by_key: Dict[str, RelayerQuota] = {}
+        for name, b in builders.items():
+            if b.key not in by_key:
+                path = quota_state_path(quota_state, b.key) if quota_state else None
+                by_key[b.key] = RelayerQuota(b.max_per_day, burst=b.burst, path=path)
+            self.quotas[name] = by_key[b.key]
+            RELAYER_QUOTA.set_function(self.quotas[name].available, builder=name)
+        self._daemon = None
+
+    def _claim_proxy(self):
+        if self._daemon is None:
+            from claim_proxy import ClaimProxyDaemon
+            self._daemon = ClaimProxyDaemon()
+        return self._daemon
+
+    def _fetch_wallet(self, wallet: WalletConfig) -> PositionDelta:
+        snapshot = self.snapshots[wallet.name]
+        snapshot.begin()
+        try:
+            for pos in iter_redeemable_positions(
+                wallet.address, page_size=self.page_size, client=self.http, pages=snapshot.pages
+            ):
+                snapshot.observe(pos)
+        except BaseException:
+            snapshot.abort()
+            raise
+        return snapshot.commit()
+
+    def fetch_all(self) -> Dict[str, PositionDelta]:
+        """
+        Aggiorna lo snapshot di ogni wallet (fetch concorrenti) e ritorna i delta rispetto al ciclo
+        precedente. Un wallet in errore non blocca gli altri.
+        """
+        out = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, max(1, len(self.wallets)))) as pool:
+            futures = {pool.submit(self._fetch_wallet, w): w for w in self.wallets}
+            for fut, w in futures.items():
+                try:
+                    out[w.name] = fut.result()
+                except Exception as e:
+                    print(f"  [{w.name}] ❌ Errore fetch posizioni: {e}", flush=True)
+        return out
+
+    def _claim_wallet(self, wallet: WalletConfig, condition_ids: List[str], max_requests: int) -> RedeemBatchReport:
+        b = self.builders[wallet.builder]
+        if wallet.signature_type == 1:
+            creds = {"privateKey": wallet.private_key, "key": b.key, "secret": b.secret, "passphrase": b.passphrase}
+            daemon = self._claim_proxy()
+            submit = lambda chunk: daemon.submit(chunk, creds)
+            stage = "relayer_node"
+        else:
+            txs = {cid: build_redeem_tx(cid) for cid in condition_ids}
+            submit = relayer_batch_submitter(txs, wallet.private_key, b.key, b.secret, b.passphrase)
+            stage = "relayer"
+        quota = self.quotas[wallet.builder]
+
+        ledger = self.ledger
+        amounts = self.snapshots[wallet.name].value
+
+        def _spend_and_submit(chunk):
+            with STAGE_SECONDS.time(stage=stage):
+                res = submit(chunk)
+            # Quota addebitata solo se la richiesta è partita (non per configurazione/Node mancante)
+            if res.get("sent", True):
+                quota.spend()
+            if ledger is not None and res.get("ok"):
+                ledger.record(chunk, PENDING, res.get("transactionHash"), owner=wallet.address, amounts=amounts,
+                              relayer_id=res.get("transactionID"))
+            return res
+
+        return execute_redeem_batches(
+            condition_ids,
+            _spend_and_submit,
+            max_per_batch=self.max_per_batch or REDEEM_MAX_PER_BATCH,
+            gas_per_redeem=self.gas_per_redeem,
+            max_batch_gas=self.max_batch_gas,
+            max_requests=max_requests,
+        )
+
+    def _plan(self, condition_ids: List[str], values: Dict[str, float]) -> ClaimPlan:
+        return plan_claims(
+            condition_ids,
+            values,
+            min_value=self.min_value,
+            min_batch_value=self.min_batch_value,
+            max_per_batch=self.max_per_batch or REDEEM_MAX_PER_BATCH,
+            gas_per_redeem=self.gas_per_redeem,
+            max_batch_gas=self.max_batch_gas,
+        )
+
+    @staticmethod
+    def _set_value_left(wallet: WalletConfig, plan: ClaimPlan, deferred: Iterable[str] = (), failed: Iterable[str] = ()) -> None:
+        CLAIM_VALUE_LEFT.set(plan.value(plan.below_min), wallet=wallet.address, reason="below_min")
+        CLAIM_VALUE_LEFT.set(plan.value(deferred), wallet=wallet.address, reason="deferred")
+        CLAIM_VALUE_LEFT.set(plan.value(failed), wallet=wallet.address, reason="failed")
+
+    def run_cycle(self) -> int:
+        """
+        Fetch di tutti i wallet, poi claim wallet per wallet nei limiti della quota del proprio builder.
+        Ritorna i secondi da attendere (0 = intervallo di default), come check_cash.run_one_cycle.
+        """
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Multi-wallet: {len(self.wallets)} wallet", flush=True)
+        with CYCLE_SECONDS.time():
+            return self._run_cycle()
+
+    def _run_cycle(self) -> int:
+        if self.ledger is not None:
+            counts = self.ledger.reconcile(self.claim_state)
+            if any(counts.values()):
+                print(f"  Ledger: {counts[CONFIRMED]} confermati, {counts[FAILED]} falliti, {counts['expired']} scaduti", flush=True)
+        with STAGE_SECONDS.time(stage="positions"):
+            deltas = self.fetch_all()
+        found = {}
+        for w in self.wallets:
+            delta = deltas.get(w.name)
+            if delta is None:
+                continue
+            snapshot = self.snapshots[w.name]
+            for kind in ("added", "removed", "changed"):
+                if getattr(delta, kind):
+                    POSITION_CHANGES.inc(len(getattr(delta, kind)), kind=kind)
+            if not delta.empty:
+                print(f"  [{w.name}] Posizioni claimabili: {len(snapshot)} ({delta.summary()})", flush=True)
+            found[w.name] = snapshot.open_ids()
+        if self.ledger is not None:
+            for w in self.wallets:
+                if found.get(w.name):
+                    found[w.name], in_flight = self.ledger.filter_claimable(found[w.name], owner=w.address)
+                    if in_flight:
+                        # Confermati on-chain: chiusi nello snapshot finché l'indexer non li toglie
+                        confirmed = []
+                        for cid in in_flight:
+                            entry = self.ledger.get(cid, owner=w.address)
+                            if entry is not None and entry.state == CONFIRMED:
+                                confirmed.append(cid)
+                        self.snapshots[w.name].close(confirmed)
+                        print(f"  [{w.name}] {len(in_flight)} mercati già inviati/confermati (ledger), saltati", flush=True)
+        pending = [w for w in self.wallets if found.get(w.name)]
+        print(f"  Claim disponibili: {sum(len(found[w.name]) for w in pending)} mercati su {len(pending)} wallet", flush=True)
+
+        waits = []
+        ready = []
+        for w in pending:
+            if not self.builders[w.builder].complete or not w.private_key:
+                print(f"  [{w.name}] Claim non eseguiti: credenziali builder/private key mancanti", flush=True)
+                continue
+            ready.append(w)
+        plans = {w.name: self._plan(found[w.name], self.snapshots[w.name].value) for w in ready}
+
+        # Wallet con la stessa quota (builder key): richieste ai batch di valore più alto tra tutti
+        groups: Dict[int, List[WalletConfig]] = {}
+        for w in ready:
+            groups.setdefault(id(self.quotas[w.builder]), []).append(w)
+        for group in groups.values():
+            quota = self.quotas[group[0].builder]
+            tokens = quota.available()
+            if tokens <= 0:
+                waits.append(quota.seconds_until_available())
+                for w in group:
+                    print(f"  [{w.name}] {len(found[w.name])} claim in attesa: quota builder '{w.builder}' esaurita", flush=True)
+                continue
+            allocation = allocate_requests({w.name: plans[w.name] for w in group}, tokens)
+            group.sort(key=lambda w: max(plans[w.name].batch_values, default=0.0), reverse=True)
+            spare = 0  # richieste assegnate e non usate dai wallet precedenti
+            for w in group:
+                plan = plans[w.name]
+                available = quota.available()
+                max_requests = min(allocation[w.name] + spare, available)
+                self.snapshots[w.name].close(plan.below_min)
+                if not plan.order or max_requests <= 0:
+                    self._set_value_left(w, plan, deferred=plan.order)
+                    if not plan.order:
+                        print(f"  [{w.name}] {len(plan.below_min)} claim sotto soglia ({plan.value(plan.below_min):.2f} USDC), non inviati", flush=True)
+                    elif available <= 0:
+                        waits.append(quota.seconds_until_available())
+                        print(f"  [{w.name}] {len(plan.order)} claim in attesa: quota builder '{w.builder}' esaurita", flush=True)
+                    else:
+                        print(f"  [{w.name}] {len(plan.order)} claim rimandati: quota '{w.builder}' usata per mercati di valore più alto", flush=True)
+                    continue
+                report = self._claim_wallet(w, plan.order, max_requests)
+                spare = max(0, max_requests - report.requests)
+                if self.ledger is None:
+                    self.snapshots[w.name].close(report.claimed)
+                values = value_report(plan, report)
+                self._set_value_left(w, plan, report.skipped, report.failed)
+                print(
+                    f"  [{w.name}] ✓ {len(report.claimed)}/{len(found[w.name])} claim, {report.requests} richieste relayer"
+                    + (f", {len(report.failed)} falliti" if report.failed else "")
+                    + f" — {values.summary()}"
+                    + (f" — {report.errors[-1][:120]}" if report.errors and not report.claimed else ""),
+                    flush=True,
+                )
+                if report.rate_limited:
+                    waits.append(quota.on_rate_limited(report.reset_seconds))
+                    spare = 0
+                elif report.skipped:
+                    waits.append(quota.seconds_until_available())
+        positive = [w for w in waits if w > 0]
+        return int(min(positive)) + 1 if positive else 0
+
+    def close(self) -> None:
+        # self.http è del registro http_clients (chiuso all'uscita del processo)
+        if self._daemon is not None:
+            self._daemon.close()
@@ -0,0 +1,268 @@
+"""
+Pipeline ordini per flussi ad alta frequenza: costruzione → firma → invio in stadi sovrapposti.
+
+place_limit_order firma l'ordine (EIP-712, CPU) e lo invia (rete) sullo stesso thread: con
+centinaia di ordini al secondo si procede un ordine alla volta e firma e I/O non si sovrappongono
+mai; place_orders_bulk lavora a raffiche (prima firma tutto, poi invia tutto) e il chiamante
+aspetta la raffica intera. Qui ogni stadio ha i suoi thread e le code tra stadi sono limitate:
+- submit() accoda l'ordine e ritorna subito un Future; a coda piena si blocca (backpressure verso
+  la strategia invece di memoria che cresce senza limite);
+- costruzione: un thread raccoglie gli ordini già in coda in lotti (fino a `sign_batch`), con
+  tick size / neg risk / fee per token dalla cache di OrderExecutor._order_options (richieste solo
+  per i token nuovi o scaduti);
+- firma: ogni lotto va a un processo del pool di signing.OrderSigner (chiave caricata una volta
+  per processo) senza aspettarne l'esito: fino a `max_signing` lotti in firma insieme;
+- invio: gli ordini firmati, nell'ordine di arrivo, passano a una seconda coda limitata da cui
+  `post_workers` thread fanno POST /orders a blocchi di `post_batch` (OrderExecutor._post_orders_chunk).
+Ogni Future riceve un dict come place_orders_bulk: {"ok", "token_id", "orderID", "status", "error"}.
+Come place_orders_bulk niente fallback per paese proxy (solo place_limit_order).
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from executor import _apply_order_reply, _log_clob_error, _order_spec
+from metrics import ORDER_PIPELINE_QUEUED, ORDERS, STAGE_SECONDS
+
+if TYPE_CHECKING:
+    from py_clob_client.clob_types import OrderArgs
+
+_STOP = object()
+
+
+@dataclass
+class _Order:
+    args: "OrderArgs"
+    post_only: bool
+    order_type: str
+    future: Future
+    result: Dict
+    price: float = 0.0
+
+
+class OrderPipeline:
+    """Costruzione, firma e invio ordini su thread separati, con code limitate tra gli stadi."""
+
+    def __init__(
+        self,
+        executor,
+        queue_size: int = 1000,
+        sign_batch: int = 32,
+        max_signing: Optional[int] = None,
+        post_batch: int = 15,
+        post_workers: int = 4,
+    ):
+        self.executor = executor
+        self.sign_batch = max(1, sign_batch)
+        self.post_batch = max(1, post_batch)
+        self.post_workers = max(1, post_workers)
+        self._signer = executor._get_order_signer()
+        self._intake: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        # lotti in firma: tiene occupati tutti i processi del pool più un lotto ciascuno in attesa
+        self._signing: queue.Queue = queue.Queue(maxsize=max(1, max_signing or self._signer.workers * 2))
+        self._post: queue.Queue = queue.Queue(maxsize=self.post_batch * self.post_workers * 2)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> "OrderPipeline":
+        with self._lock:
+            if self._threads:
+                return self
+            self._signer.warm()
+            targets = [("orders-build", self._build_loop), ("orders-sign", self._collect_loop)]
+            targets += [(f"orders-post-{i}", self._post_loop) for i in range(self.post_workers)]
+            self._threads = [threading.Thread(target=fn, name=name, daemon=True) for name, fn in targets]
+            for thread in self._threads:
+                thread.start()
+        ORDER_PIPELINE_QUEUED.set_function(self._intake.qsize, stage="build")
+        ORDER_PIPELINE_QUEUED.set_function(self._signing.qsize, stage="sign")
+        ORDER_PIPELINE_QUEUED.set_function(self._post.qsize, stage="post")
+        return self
+
+    def submit(
+        self,
+        order: "OrderArgs",
+        post_only: bool = False,
+        order_type: str = "GTC",
+        timeout: Optional[float] = None,
+    ) -> Future:
+        """
+        Accoda un ordine (OrderArgs come place_orders_bulk). Con la coda piena aspetta fino a
+        `timeout` secondi (None = senza limite), poi queue.Full.
+        """
+        future: Future = Future()
+        result = {"ok": False, "token_id": order.token_id, "orderID": None, "status": None, "error": None}
+        item = _Order(order, post_only, order_type, future, result)
+        # Stesso lock di close(): nessun ordine può finire in coda dopo lo stop (resterebbe senza esito).
+        # A coda piena il lock resta preso: gli altri submit() aspettano il lock con lo stesso timeout.
+        if not self._lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise queue.Full
+        try:
+            if self._closed:
+                raise RuntimeError("pipeline ordini chiusa")
+            self._intake.put(item, timeout=timeout)
+        finally:
+            self._lock.release()
+        return future
+
+    def place_many(self, orders: List["OrderArgs"], post_only: bool = False, order_type: str = "GTC") -> List[Dict]:
+        """Come place_orders_bulk ma attraverso la pipeline (gli ordini si sovrappongono a quelli già in corso)."""
+        futures = [self.submit(o, post_only, order_type) for o in orders]
+        return [f.result() for f in futures]
+
+    def close(self, wait: bool = True) -> None:
+        """Niente più submit(); gli ordini già accodati vengono comunque firmati e inviati."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if not self._threads:
+                return
+            self._intake.put(_STOP)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self) -> "OrderPipeline":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- stadi ---
+
+    @staticmethod
+    def _next_batch(q: queue.Queue, size: int) -> Tuple[List, bool]:
+        """Aspetta il primo elemento, poi prende quelli già in coda fino a `size`. True = arrivato lo stop."""
+        item = q.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        while len(batch) < size:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    # Ogni stadio gestisce gli errori per lotto: un'eccezione chiude con errore gli ordini del lotto
+    # (_fail) e il thread continua; se uscisse, i Future resterebbero aperti e a code piene submit()
+    # si bloccherebbe per sempre.
+
+    def _build_loop(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch(self._intake, self.sign_batch)
+            if not batch:
+                continue
+            try:
+                self._build(batch)
+            except Exception as e:
+                self._fail(batch, f"preparazione ordini fallita: {e}")
+        self._signing.put(_STOP)
+
+    def _build(self, batch: List[_Order]) -> None:
+        try:
+            options = self.executor._order_options([o.args.token_id for o in batch])
+        except Exception as e:
+            options = {o.args.token_id: str(e) for o in batch}
+        orders, specs = [], []
+        for o in batch:
+            opt = options.get(o.args.token_id)
+            if not isinstance(opt, tuple):
+                self._finish(o, f"tick size/fee non disponibili: {opt}")
+                continue
+            spec, o.price = _order_spec(o.args, opt)
+            specs.append(spec)
+            orders.append(o)
+        if orders:
+            future = self._signer.submit(specs)
+            # coda piena = tutti i processi di firma occupati: il thread aspetta e l'intake si riempie
+            self._signing.put((orders, specs, future, time.perf_counter()))
+
+    def _collect_loop(self) -> None:
+        while True:
+            item = self._signing.get()
+            if item is _STOP:
+                break
+            orders = item[0]
+            try:
+                self._collect(*item)
+            except Exception as e:
+                self._fail(orders, f"firma fallita: {e}")
+        for _ in range(self.post_workers):
+            self._post.put(_STOP)
+
+    def _collect(self, orders: List[_Order], specs: List[tuple], future, t0: float) -> None:
+        from py_clob_client.clob_types import PostOrdersArgs
+
+        signed = self._signer.collect(future, specs)
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage="order_sign")
+        ready = []
+        for o, (ok, value) in zip(orders, signed):
+            if ok:
+                ready.append((o, PostOrdersArgs(order=value, orderType=o.order_type, postOnly=o.post_only)))
+            else:
+                self._finish(o, f"firma fallita: {value}")
+        for o in orders[len(signed):]:
+            self._finish(o, "firma fallita: esito mancante")
+        for item in ready:
+            self._post.put(item)
+
+    def _post_loop(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch(self._post, self.post_batch)
+            if not batch:
+                continue
+            try:
+                self._send(batch)
+            except Exception as e:
+                self._fail([o for o, _ in batch], f"invio fallito: {e}")
+
+    def _send(self, batch: List[Tuple[_Order, object]]) -> None:
+        try:
+            replies, error = self.executor._post_orders_chunk([a for _, a in batch]), "risposta CLOB mancante"
+        except Exception as e:
+            _log_clob_error(f"posting {len(batch)} orders to", batch[0][0].args.token_id, e)
+            replies, error = [], str(e)
+        for n, (o, _) in enumerate(batch):
+            reply = replies[n] if n < len(replies) and isinstance(replies[n], dict) else None
+            if reply is None:
+                self._finish(o, error)
+                continue
+            _apply_order_reply(o.result, reply)
+            if o.result["ok"]:
+                args = o.args
+                try:
+                    self.executor.orders.on_placed(reply, args.token_id, str(args.side), o.price, float(args.size))
+                    self.executor.market_cache.invalidate(args.token_id)
+                except Exception as e:
+                    # L'ordine è nel book: l'esito resta ok, manca solo l'aggiornamento della vista locale
+                    print(f"⚠️  Pipeline ordini: ordine {o.result['orderID']} piazzato, vista locale non aggiornata: {e}", flush=True)
+            self._finish(o)
+
+    @staticmethod
+    def _finish(o: _Order, error: Optional[str] = None) -> None:
+        if o.future.done():
+            return
+        if error is not None:
+            o.result["error"] = error
+        ORDERS.inc(outcome="placed" if o.result["ok"] else "failed")
+        o.future.set_result(o.result)
+
+    @classmethod
+    def _fail(cls, orders: List[_Order], error: str) -> None:
+        """Errore inatteso in uno stadio: gli ordini del lotto ancora senza esito falliscono con `error`."""
+        print(f"⚠️  Pipeline ordini: {error}", flush=True)
+        for o in orders:
+            o.result["ok"] = False
+            cls._finish(o, error)
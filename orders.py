@@ -0,0 +1,231 @@
+"""
+Vista locale dei nostri ordini aperti sul CLOB.
+
+get_open_orders scaricava ogni volta tutta la lista (GET /data/orders, autenticato, via proxy) e
+ogni cancel era una richiesta. Qui OrderTracker tiene gli ordini aperti indicizzati per id, token
+e (token, lato), aggiornati da:
+- risposte di place/cancel di questo processo;
+- canale WebSocket "user" (UserStream: eventi order PLACEMENT/UPDATE/CANCELLATION, anche per
+  ordini piazzati altrove o eseguiti);
+- riconciliazione periodica con il REST (reconcile), che resta la fonte di verità.
+Gli ordini piazzati/cancellati mentre la GET di riconciliazione è in volo non vengono persi né
+resuscitati. Una disconnessione del canale user rende la vista da riconciliare subito.
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from market_stream import ChannelStream
+
+USER_WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/user"
+
+# Stati di un ordine ancora nel book (risposte POST /order e GET /data/orders)
+OPEN_STATUSES = {"LIVE", "DELAYED"}
+
+
+@dataclass
+class TrackedOrder:
+    """Ordine aperto. updated: time.monotonic() dell'ultima modifica locale."""
+    id: str
+    token_id: str
+    side: str
+    price: float
+    original_size: float
+    size_matched: float = 0.0
+    market: str = ""
+    status: str = "LIVE"
+    updated: float = 0.0
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.original_size - self.size_matched)
+
+    def to_dict(self) -> Dict:
+        """Stesso formato degli elementi di GET /data/orders."""
+        return {
+            "id": self.id, "status": self.status, "market": self.market, "asset_id": self.token_id,
+            "side": self.side, "price": f"{self.price:g}", "original_size": f"{self.original_size:g}",
+            "size_matched": f"{self.size_matched:g}",
+        }
+
+    @classmethod
+    def from_rest(cls, rec: Dict, now: float) -> "TrackedOrder":
+        return cls(
+            id=str(rec.get("id")), token_id=str(rec.get("asset_id") or ""), side=str(rec.get("side") or "").upper(),
+            price=float(rec.get("price") or 0), original_size=float(rec.get("original_size") or 0),
+            size_matched=float(rec.get("size_matched") or 0), market=str(rec.get("market") or ""),
+            status=str(rec.get("status") or "LIVE").upper(), updated=now,
+        )
+
+
+class OrderTracker:
+    """Ordini aperti indicizzati. Thread-safe; letture O(1) per id, O(ordini del token) per token."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._orders: Dict[str, TrackedOrder] = {}
+        self._by_token: Dict[str, Set[str]] = {}
+        self._by_side: Dict[Tuple[str, str], Set[str]] = {}
+        # id chiusi localmente → istante: la riconciliazione non li riporta in vita
+        self._closed: Dict[str, float] = {}
+        self.reconciled_at: Optional[float] = None
+        self.dirty = True
+
+    # --- indici ---
+
+    def _add(self, order: TrackedOrder) -> None:
+        self._drop(order.id)
+        self._orders[order.id] = order
+        self._by_token.setdefault(order.token_id, set()).add(order.id)
+        self._by_side.setdefault((order.token_id, order.side), set()).add(order.id)
+
+    def _drop(self, order_id: str) -> Optional[TrackedOrder]:
+        order = self._orders.pop(order_id, None)
+        if order is not None:
+            for index, key in ((self._by_token, order.token_id), (self._by_side, (order.token_id, order.side))):
+                ids = index.get(key)
+                if ids is not None:
+                    ids.discard(order_id)
+                    if not ids:
+                        del index[key]
+        return order
+
+    def _close(self, order_id: str, now: float) -> None:
+        self._drop(order_id)
+        self._closed[order_id] = now
+
+    # --- letture ---
+
+    def get(self, order_id: str) -> Optional[TrackedOrder]:
+        with self._lock:
+            return self._orders.get(order_id)
+
+    def for_token(self, token_id: str, side: Optional[str] = None) -> List[TrackedOrder]:
+        with self._lock:
+            ids = self._by_token.get(token_id, ()) if side is None else self._by_side.get((token_id, side.upper()), ())
+            return [self._orders[i] for i in ids]
+
+    def select(self, predicate: Callable[[TrackedOrder], bool]) -> List[TrackedOrder]:
+        with self._lock:
+            orders = list(self._orders.values())
+        return [o for o in orders if predicate(o)]
+
+    def all(self) -> List[TrackedOrder]:
+        with self._lock:
+            return list(self._orders.values())
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def needs_reconcile(self, max_age: float) -> bool:
+        return self.dirty or self.reconciled_at is None or self._clock() - self.reconciled_at >= max_age
+
+    def mark_dirty(self) -> None:
+        self.dirty = True
+
+    # --- aggiornamenti ---
+
+    def on_placed(self, response, token_id: str, side: str, price: float, size: float) -> None:
+        """Risposta di POST /order (o elemento di POST /orders): traccia l'ordine se è rimasto nel book."""
+        if not isinstance(response, dict):
+            return
+        order_id = response.get("orderID") or response.get("orderId")
+        if not order_id or response.get("success") is False:
+            return
+        status = str(response.get("status") or "").upper()
+        with self._lock:
+            now = self._clock()
+            if status in OPEN_STATUSES:
+                self._add(TrackedOrder(str(order_id), str(token_id), side.upper(), float(price), float(size),
+                                       status=status, updated=now))
+            else:
+                self._close(str(order_id), now)
+
+    def on_cancelled(self, order_ids: Iterable[str]) -> None:
+        with self._lock:
+            now = self._clock()
+            for order_id in order_ids:
+                self._close(str(order_id), now)
+
+    def apply_user_event(self, ev: Dict) -> None:
+        """Evento "order" del canale user (PLACEMENT / UPDATE / CANCELLATION); i "trade" arrivano anche come UPDATE."""
+        if ev.get("event_type") != "order" or not ev.get("id"):
+            return
+        kind = str(ev.get("type") or "").upper()
+        order_id = str(ev["id"])
+        with self._lock:
+            now = self._clock()
+            if kind == "CANCELLATION":
+                self._close(order_id, now)
+                return
+            order = self._orders.get(order_id)
+            if order is None:
+                if order_id in self._closed:
+                    return
+                order = TrackedOrder.from_rest(ev, now)
+                self._add(order)
+            order.size_matched = float(ev.get("size_matched") or order.size_matched)
+            order.updated = now
+            if order.remaining <= 0:
+                self._close(order_id, now)
+
+    def reconcile(self, rest_orders: List[Dict], started: float) -> None:
+        """
+        Sostituisce la vista con la lista REST scaricata a partire da `started` (time.monotonic()).
+        Le modifiche locali successive a `started` hanno la precedenza sulla lista.
+        """
+        with self._lock:
+            now = self._clock()
+            fresh = {}
+            for rec in rest_orders:
+                order = TrackedOrder.from_rest(rec, now)
+                if order.status not in OPEN_STATUSES or self._closed.get(order.id, -1.0) >= started:
+                    continue
+                fresh[order.id] = order
+            keep = [o for o in self._orders.values() if o.updated >= started and o.id not in fresh]
+            self._orders.clear()
+            self._by_token.clear()
+            self._by_side.clear()
+            for order in list(fresh.values()) + keep:
+                self._add(order)
+            self._closed = {i: t for i, t in self._closed.items() if t >= started}
+            self.reconciled_at = now
+            self.dirty = False
+
+
+class UserStream(ChannelStream):
+    """Canale user (autenticato con le credenziali L2): eventi dei nostri ordini verso un OrderTracker."""
+
+    name = "user"
+
+    def __init__(self, tracker: OrderTracker, creds, url: str = USER_WS_URL, markets: Iterable[str] = (), **kw):
+        super().__init__(url, **kw)
+        self.tracker = tracker
+        self.creds = creds
+        self.markets = list(markets)
+        self.events = 0
+
+    def _subscription(self) -> Dict:
+        return {
+            "auth": {"apiKey": self.creds.api_key, "secret": self.creds.api_secret, "passphrase": self.creds.api_passphrase},
+            "markets": self.markets,
+            "type": "user",
+        }
+
+    def handle_message(self, raw: str) -> None:
+        if not raw or raw in ("PONG", "PING"):
+            return
+        data = json.loads(raw)
+        self.messages += 1
+        for ev in data if isinstance(data, list) else [data]:
+            if isinstance(ev, dict):
+                self.events += 1
+                self.tracker.apply_user_event(ev)
+
+    def _on_disconnect(self) -> None:
+        # Eventi persi durante la disconnessione: prossima lettura dal REST
+        self.tracker.mark_dirty()
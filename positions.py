@@ -0,0 +1,137 @@
+"""
+Snapshot delle posizioni claimabili tra un ciclo e l'altro: il ciclo lavora sulla differenza.
+
+La Data API restituisce a ogni richiesta l'elenco completo delle posizioni redeemable, comprese
+quelle già claimate che l'indexer non ha ancora tolto e quelle perdenti a 0 che restano lì per
+settimane: ri-elaborarle tutte a ogni ciclo (calldata, stampa, piano claim) costa CPU e righe di
+log senza che cambi nulla. Qui:
+- le posizioni sono indicizzate per (conditionId, asset) con un'impronta (size, currentValue,
+  redeemable); ogni ciclo produce un PositionDelta (aggiunte, sparite, cambiate) e il valore per
+  conditionId si aggiorna solo per i mercati toccati;
+- i conditionId "aperti" (da claimare) entrano quando una loro posizione è nuova o cambia ed
+  escono con `close()`: claim confermato, sotto soglia di valore, o tutte le posizioni sparite.
+  Quelli rimandati (quota), falliti o in attesa di conferma restano aperti per il ciclo dopo;
+- `pages` è la cache delle pagine per le richieste condizionali (claims: If-None-Match /
+  If-Modified-Since se la Data API manda ETag / Last-Modified): un 304 riusa la pagina già letta.
+Se il fetch si interrompe (timeout, errore) `abort()` non conta come sparite le posizioni non viste.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from claim_planner import position_value
+
+Key = Tuple[str, str]
+
+
+def _fingerprint(pos: Dict[str, Any]) -> Tuple:
+    return (pos.get("size"), pos.get("currentValue"), pos.get("redeemable"))
+
+
+@dataclass
+class PositionDelta:
+    """Differenza tra il fetch corrente e quello precedente."""
+    added: List[Dict[str, Any]] = field(default_factory=list)
+    removed: List[Dict[str, Any]] = field(default_factory=list)
+    changed: List[Dict[str, Any]] = field(default_factory=list)
+    unchanged: int = 0
+    # conditionId di cui non resta nessuna posizione
+    gone: List[str] = field(default_factory=list)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        return (f"+{len(self.added)} nuove, -{len(self.removed)} sparite, {len(self.changed)} cambiate, "
+                f"{self.unchanged} invariate")
+
+
+class PositionSnapshot:
+    """Posizioni dell'ultimo fetch completo di un wallet (un solo ciclo alla volta)."""
+
+    def __init__(self):
+        self.positions: Dict[Key, Dict[str, Any]] = {}
+        self.value: Dict[str, float] = {}          # conditionId → USDC attesi (somma currentValue)
+        self.pages: Dict[Tuple, Tuple] = {}        # cache pagine Data API per richieste condizionali
+        self._prints: Dict[Key, Tuple] = {}
+        self._keys: Dict[str, Set[Key]] = {}       # conditionId → posizioni
+        self._open: Dict[str, None] = {}           # insieme ordinato (ordine di apertura)
+        self._seen: Optional[Set[Key]] = None
+        self._delta = PositionDelta()
+        self._dirty: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def begin(self) -> None:
+        self._seen = set()
+        self._delta = PositionDelta()
+        self._dirty = set()
+
+    def observe(self, pos: Dict[str, Any]) -> Optional[str]:
+        """Una posizione del fetch in corso. Ritorna il conditionId se la posizione è nuova o cambiata."""
+        cid = (pos.get("conditionId") or pos.get("condition_id") or "").strip()
+        if not cid:
+            return None
+        key = (cid, str(pos.get("asset") or pos.get("tokenId") or ""))
+        self._seen.add(key)
+        fingerprint = _fingerprint(pos)
+        prev = self._prints.get(key)
+        if prev == fingerprint:
+            self._delta.unchanged += 1
+            return None
+        (self._delta.added if prev is None else self._delta.changed).append(pos)
+        self.positions[key] = pos
+        self._prints[key] = fingerprint
+        self._keys.setdefault(cid, set()).add(key)
+        self._dirty.add(cid)
+        self._open[cid] = None
+        return cid
+
+    def commit(self) -> PositionDelta:
+        """Fine di un fetch completo: le posizioni non viste sono sparite. Ritorna il delta."""
+        seen, delta = self._seen, self._delta
+        if len(seen) < len(self.positions):
+            for key in [k for k in self.positions if k not in seen]:
+                cid = key[0]
+                delta.removed.append(self.positions.pop(key))
+                del self._prints[key]
+                keys = self._keys[cid]
+                keys.discard(key)
+                if keys:
+                    self._dirty.add(cid)
+                else:
+                    del self._keys[cid]
+                    self.value.pop(cid, None)
+                    self._open.pop(cid, None)
+                    self._dirty.discard(cid)
+                    delta.gone.append(cid)
+        self._refresh_values()
+        self._seen = None
+        return delta
+
+    def abort(self) -> PositionDelta:
+        """Fetch interrotto: si tengono aggiunte e modifiche viste, nessuna posizione conta come sparita."""
+        self._refresh_values()
+        self._seen = None
+        return self._delta
+
+    def _refresh_values(self) -> None:
+        positions = self.positions
+        for cid in self._dirty:
+            self.value[cid] = sum(position_value(positions[k]) for k in self._keys[cid])
+        self._dirty = set()
+
+    def open_ids(self) -> List[str]:
+        """conditionId da claimare, nell'ordine in cui sono comparsi."""
+        return list(self._open)
+
+    def close(self, condition_ids: Iterable[str]) -> None:
+        """Niente più claim per questi conditionId finché una loro posizione non cambia."""
+        for cid in condition_ids:
+            self._open.pop(cid, None)
+
+    def positions_for(self, condition_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        positions, keys = self.positions, self._keys
+        return [positions[k] for cid in condition_ids for k in keys.get(cid, ())]
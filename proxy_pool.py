@@ -0,0 +1,217 @@
+"""
+Pool di uscite proxy per paese (DataImpulse user_cr.<paese>) con punteggio di salute.
+
+Su 403 regional place_limit_order provava i paesi sempre nello stesso ordine, con un client
+nuovo e 2 s di pausa a ogni fallimento, dimenticando tutto a fine ordine. Qui per ogni paese:
+- client HTTP caldo (registro condiviso http_clients: connessioni riusate tra gli ordini);
+- successi/fallimenti con decadimento esponenziale (half_life): gli errori vecchi pesano sempre meno;
+- latenze recenti (p50/p95);
+- quarantena dopo un fallimento, con durata che raddoppia a ogni fallimento consecutivo
+  (base_quarantine … max_quarantine) e si azzera al primo successo;
+- stato salvato su file JSON tra un avvio e l'altro: subito quando un'uscita entra o esce dalla
+  quarantena, altrimenti al massimo ogni save_interval secondi (niente scrittura su disco a ogni
+  ordine riuscito); close() salva quanto resta.
+ranked() ordina le uscite: prima quelle fuori quarantena per tasso di successo e latenza,
+poi quelle in quarantena (le prime a uscirne per prime). best_known() è l'uscita da usare
+subito per il primo tentativo: fuori quarantena e con successi recenti.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, List, Optional
+
+from metrics import PROXY_EXITS
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class ExitHealth:
+    """Salute di un'uscita (paese). Tempi in secondi epoch (persistiti tra un avvio e l'altro)."""
+    country: str
+    successes: float = 0.0
+    failures: float = 0.0
+    streak: int = 0  # fallimenti consecutivi
+    quarantined_until: float = 0.0
+    updated: float = 0.0
+    latencies_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=50))
+
+    def success_rate(self) -> float:
+        # Laplace: uscita mai provata = 0.5 (dopo quelle note buone, prima di quelle note cattive)
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def p50(self) -> Optional[float]:
+        return _percentile(list(self.latencies_ms), 0.5)
+
+    def p95(self) -> Optional[float]:
+        return _percentile(list(self.latencies_ms), 0.95)
+
+    def to_record(self) -> Dict:
+        return {
+            "s": round(self.successes, 4), "f": round(self.failures, 4), "k": self.streak,
+            "q": self.quarantined_until, "u": self.updated, "l": [round(x, 1) for x in self.latencies_ms],
+        }
+
+    @classmethod
+    def from_record(cls, country: str, rec: Dict) -> "ExitHealth":
+        h = cls(country, float(rec.get("s", 0)), float(rec.get("f", 0)), int(rec.get("k", 0)),
+                float(rec.get("q", 0)), float(rec.get("u", 0)))
+        h.latencies_ms.extend(float(x) for x in rec.get("l") or ())
+        return h
+
+
+class ProxyPool:
+    """
+    Uscite proxy per paese con punteggio. Thread-safe.
+    url_for(country) → URL proxy (None = paese non configurabile).
+    path: file JSON dello stato (None = solo in memoria).
+    """
+
+    def __init__(
+        self,
+        countries: Iterable[str],
+        url_for: Callable[[str], Optional[str]],
+        path: Optional[str] = None,
+        half_life: float = 6 * 3600,
+        base_quarantine: float = 60.0,
+        max_quarantine: float = 3600.0,
+        save_interval: float = 30.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.countries = list(countries)
+        self.url_for = url_for
+        self.path = path
+        self.half_life = half_life
+        self.base_quarantine = base_quarantine
+        self.max_quarantine = max_quarantine
+        self.save_interval = save_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = 0.0
+        self.exits: Dict[str, ExitHealth] = {c: ExitHealth(c) for c in self.countries}
+        # Uscita usata dagli executor senza proxy proprio (None = client di default da PROXY_URL)
+        self.active: Optional[str] = None
+        self._load()
+
+    def _decay(self, h: ExitHealth, now: float) -> None:
+        if h.updated and now > h.updated and self.half_life > 0:
+            k = 0.5 ** ((now - h.updated) / self.half_life)
+            h.successes *= k
+            h.failures *= k
+        h.updated = now
+
+    def _rank_key(self, h: ExitHealth, now: float):
+        quarantined = h.quarantined_until > now
+        p95 = h.p95()
+        return (quarantined, h.quarantined_until if quarantined else 0.0,
+                -round(h.success_rate(), 2), p95 if p95 is not None else float("inf"))
+
+    def ranked(self, exclude: Iterable[str] = ()) -> List[str]:
+        """Paesi dal più sano al meno sano (in quarantena in fondo); a parità vale l'ordine di configurazione."""
+        skip = set(exclude)
+        now = self._clock()
+        with self._lock:
+            for h in self.exits.values():
+                self._decay(h, now)
+            ordered = sorted((h for h in self.exits.values() if h.country not in skip),
+                             key=lambda h: self._rank_key(h, now))
+            return [h.country for h in ordered]
+
+    def best_known(self) -> Optional[str]:
+        """Uscita fuori quarantena con successi recenti (la migliore), altrimenti None."""
+        ranked = self.ranked()
+        if not ranked:
+            return None
+        h = self.exits[ranked[0]]
+        if h.quarantined_until <= self._clock() and h.successes >= 0.5 and h.successes > h.failures:
+            return h.country
+        return None
+
+    def client(self, country: str):
+        """Client httpx caldo per il paese (None se il proxy non è configurato)."""
+        url = self.url_for(country)
+        if not url:
+            return None
+        from http_clients import registry
+        return registry.get("clob", url)
+
+    def record(self, country: str, ok: bool, latency_ms: Optional[float] = None) -> None:
+        """Esito di un tentativo via `country` (ok=False: 403 regional o errore di rete dell'uscita)."""
+        now = self._clock()
+        with self._lock:
+            h = self.exits.setdefault(country, ExitHealth(country))
+            self._decay(h, now)
+            # entra/esce dalla quarantena: l'ordine delle uscite cambia, si salva subito
+            changed = not ok or h.streak > 0
+            if ok:
+                h.successes += 1
+                h.streak = 0
+                h.quarantined_until = 0.0
+                if latency_ms is not None:
+                    h.latencies_ms.append(latency_ms)
+            else:
+                h.failures += 1
+                h.streak += 1
+                h.quarantined_until = now + min(self.max_quarantine, self.base_quarantine * 2 ** (h.streak - 1))
+            self._dirty = True
+            due = changed or now - self._saved_at >= self.save_interval
+        PROXY_EXITS.inc(country=country, outcome="ok" if ok else "fail")
+        if due:
+            self.save()
+
+    def summary(self) -> str:
+        now = self._clock()
+        parts = []
+        for country in self.ranked():
+            h = self.exits[country]
+            p50, p95 = h.p50(), h.p95()
+            lat = f"p50 {p50:.0f}/p95 {p95:.0f} ms" if p50 is not None else "latenza n/d"
+            q = f", quarantena {h.quarantined_until - now:.0f}s" if h.quarantined_until > now else ""
+            parts.append(f"{country} {h.success_rate():.0%} {lat}{q}")
+        return " | ".join(parts)
+
+    # --- stato su file ---
+
+    def _load(self) -> None:
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            for country, rec in (state.get("exits") or {}).items():
+                if country in self.exits:
+                    self.exits[country] = ExitHealth.from_record(country, rec)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"  ⚠️  Stato pool proxy non leggibile ({self.path}): {e}")
+
+    def close(self) -> None:
+        """Salva gli esiti non ancora scritti (a fine processo)."""
+        if self._dirty:
+            self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            state = {"exits": {c: h.to_record() for c, h in self.exits.items()}}
+            self._dirty = False
+            self._saved_at = self._clock()
+        tmp = self.path + ".tmp"
+        with self._save_lock:
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(state, f)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"  ⚠️  Stato pool proxy non salvato ({self.path}): {e}")
@@ -0,0 +1,163 @@
+"""
+Quota Relayer: finestra mobile di 24h modellata come token bucket, persistita su disco.
+
+Il relayer concede N richieste ogni 24h (finestra mobile). Qui:
+- ogni richiesta spesa viene registrata (timestamp): una richiesta "rientra" esattamente
+  24h dopo, come lato server;
+- un token bucket (burst + ricarica N/24h) evita di bruciare tutta la quota in un'ora
+  lasciando il resto della giornata senza claim;
+- dopo un 429 si rispetta esattamente il reset comunicato dal server (blocked_until).
+Lo stato è salvato in JSON (scrittura atomica), così sopravvive ai riavvii del worker.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+class RelayerQuota:
+    """Quota richieste Relayer (per builder key)."""
+
+    def __init__(
+        self,
+        max_per_day: int = 100,
+        window_seconds: int = SECONDS_PER_DAY,
+        burst: Optional[int] = None,
+        path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.capacity = max(1, int(max_per_day))
+        self.window = float(window_seconds)
+        self.burst = max(1, int(burst if burst else max(1, self.capacity // 4)))
+        self.rate = self.capacity / self.window  # token al secondo
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._spent = deque()
+        now = clock()
+        self._tokens = float(self.burst)
+        self._tokens_at = now
+        self.blocked_until = 0.0
+        self._load()
+
+    # --- stato interno (chiamare con lock) ---
+
+    def _prune(self, now: float) -> None:
+        while self._spent and self._spent[0] <= now - self.window:
+            self._spent.popleft()
+
+    def _refill(self, now: float) -> None:
+        if now > self._tokens_at:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._tokens_at) * self.rate)
+            self._tokens_at = now
+
+    def _available(self, now: float) -> int:
+        if now < self.blocked_until:
+            return 0
+        self._prune(now)
+        self._refill(now)
+        return max(0, min(self.capacity - len(self._spent), int(self._tokens)))
+
+    # --- API ---
+
+    def used(self) -> int:
+        """Richieste spese nelle ultime 24h."""
+        with self._lock:
+            self._prune(self._clock())
+            return len(self._spent)
+
+    def available(self) -> int:
+        """Richieste spendibili adesso (0 se bloccati da un 429)."""
+        with self._lock:
+            return self._available(self._clock())
+
+    def seconds_until_available(self) -> float:
+        """Secondi al prossimo token spendibile (0 se disponibile ora)."""
+        with self._lock:
+            now = self._clock()
+            if self._available(now) > 0:
+                return 0.0
+            waits = [self.blocked_until - now]
+            if len(self._spent) >= self.capacity:
+                waits.append(self._spent[0] + self.window - now)
+            if self._tokens < 1:
+                waits.append((1 - self._tokens) / self.rate)
+            return max(0.0, max(waits))
+
+    def spend(self, n: int = 1) -> None:
+        """Registra n richieste inviate al relayer."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens = max(0.0, self._tokens - n)
+            self._spent.extend([now] * n)
+            self._save()
+
+    def on_rate_limited(self, reset_seconds: Optional[int] = None) -> float:
+        """
+        429 dal relayer: blocca fino al reset indicato dal server. Senza reset noto si attende
+        l'uscita dalla finestra della richiesta più vecchia (o l'intervallo medio tra token).
+        Ritorna i secondi di blocco.
+        """
+        with self._lock:
+            now = self._clock()
+            self._prune(now)
+            if reset_seconds and reset_seconds > 0:
+                # Il server è la fonte di verità: allo scadere la quota è di nuovo piena
+                until = now + reset_seconds
+                self._spent.clear()
+                self._tokens = float(self.burst)
+            else:
+                until = self._spent[0] + self.window if self._spent else now + 1 / self.rate
+                self._tokens = 1.0
+            self.blocked_until = max(self.blocked_until, until)
+            # Nessuna ricarica durante il blocco: i token sono disponibili esattamente a blocked_until
+            self._tokens_at = self.blocked_until
+            self._save()
+            return self.blocked_until - now
+
+    @property
+    def blocked_seconds(self) -> float:
+        """Secondi rimanenti di blocco dopo un 429 (0 se non bloccati)."""
+        return max(0.0, self.blocked_until - self._clock())
+
+    # --- persistenza ---
+
+    def _load(self) -> None:
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            now = self._clock()
+            self._spent = deque(sorted(float(t) for t in state.get("spent", []) if float(t) > now - self.window))
+            self.blocked_until = float(state.get("blocked_until") or 0.0)
+            tokens = state.get("tokens")
+            if tokens is not None and math.isfinite(float(tokens)):
+                self._tokens = min(float(self.burst), max(0.0, float(tokens)))
+                self._tokens_at = float(state.get("tokens_at") or now)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"  ⚠️  Stato quota non leggibile ({self.path}): {e}")
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        state = {
+            "spent": list(self._spent),
+            "blocked_until": self.blocked_until,
+            "tokens": self._tokens,
+            "tokens_at": self._tokens_at,
+        }
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"  ⚠️  Stato quota non salvato ({self.path}): {e}")
@@ -0,0 +1,218 @@
+"""
+Rilevamento claim da eventi on-chain (CTF): ConditionResolution e PayoutRedemption.
+
+Il polling della Data API (ogni CLAIM_LOOP_WAIT_SECONDS) lascia le vincite ferme fino a un
+intervallo intero dopo la risoluzione. Qui si seguono i log del contratto CTF con eth_getLogs:
+- un cursore (ultimo blocco elaborato) salvato su disco, così dopo un riavvio si riparte
+  da dove ci si era fermati;
+- si leggono solo blocchi con `confirmations` conferme (niente log da riorganizzazioni);
+- intervalli di blocchi limitati (max_block_range), dimezzati se il nodo rifiuta la query;
+- ConditionResolution ∩ conditionId posseduti (con outcome vincente) → claim immediato;
+- PayoutRedemption del wallet → conferma dei claim nel ledger.
+La Data API resta il controllo lento di riserva.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from claims import CTF_ADDRESS
+
+# keccak256("ConditionResolution(bytes32,address,bytes32,uint256,uint256[])")
+CONDITION_RESOLUTION_TOPIC = "0xb44d84d3289691f71497564b85d4233648d9dbae8cbdbb4329f301c3a0185894"
+# keccak256("PayoutRedemption(address,address,bytes32,bytes32,uint256[],uint256)")
+PAYOUT_REDEMPTION_TOPIC = "0x2682012a4a4f1973119f1c9b90745d1bd91fa2bab387344f044cb3586864d18d"
+
+
+class RpcError(RuntimeError):
+    """Errore JSON-RPC (campo "error" nella risposta)."""
+
+
+@dataclass
+class Resolution:
+    """Una condizione risolta: payouts[i] > 0 se l'outcome i paga."""
+    condition_id: str
+    payouts: List[int]
+    block: int
+
+    def pays(self, outcome_index: int) -> bool:
+        return 0 <= outcome_index < len(self.payouts) and self.payouts[outcome_index] > 0
+
+
+@dataclass
+class Redemption:
+    """Un redeem eseguito dal wallet osservato."""
+    condition_id: str
+    tx_hash: str
+    payout: int
+    block: int
+
+
+@dataclass
+class LogBatch:
+    """Esito di ResolutionWatcher.poll: eventi dei blocchi (from_block, to_block]."""
+    resolutions: List[Resolution] = field(default_factory=list)
+    redemptions: List[Redemption] = field(default_factory=list)
+    from_block: int = 0
+    to_block: int = 0
+
+
+def _words(data: str) -> List[int]:
+    raw = data[2:] if data.startswith("0x") else data
+    return [int(raw[i:i + 64], 16) for i in range(0, len(raw), 64)]
+
+
+def _topic_address(address: str) -> str:
+    return "0x" + address.lower().replace("0x", "").rjust(64, "0")
+
+
+def parse_resolution(log: Dict) -> Resolution:
+    """ConditionResolution: topics = [sig, conditionId, oracle, questionId], data = (outcomeSlotCount, uint[] payouts)."""
+    words = _words(log.get("data") or "0x")
+    # words: [outcomeSlotCount, offset array, lunghezza, payout_0, ...]
+    n = words[2] if len(words) > 2 else 0
+    return Resolution(
+        condition_id=log["topics"][1].lower(),
+        payouts=words[3:3 + n],
+        block=int(log["blockNumber"], 16),
+    )
+
+
+def parse_redemption(log: Dict) -> Redemption:
+    """PayoutRedemption: topics = [sig, redeemer, collateral, parentCollectionId], data = (conditionId, uint[] indexSets, payout)."""
+    raw = (log.get("data") or "0x")[2:]
+    return Redemption(
+        condition_id="0x" + raw[:64].lower(),
+        tx_hash=log.get("transactionHash") or "",
+        payout=int(raw[128:192], 16) if len(raw) >= 192 else 0,
+        block=int(log["blockNumber"], 16),
+    )
+
+
+def match_claimable(resolutions: Iterable[Resolution], held: Dict[str, Set[int]]) -> List[str]:
+    """conditionId risolti in cui si possiede almeno un outcome vincente (held: conditionId → outcomeIndex)."""
+    out = []
+    for r in resolutions:
+        outcomes = held.get(r.condition_id)
+        if outcomes and any(r.pays(i) for i in outcomes) and r.condition_id not in out:
+            out.append(r.condition_id)
+    return out
+
+
+class ResolutionWatcher:
+    """
+    Cursore eth_getLogs sul contratto CTF (asincrono, per la event loop di check_cash).
+    owner: wallet di cui seguire i PayoutRedemption (None = solo risoluzioni).
+    checkpoint_path: file JSON con l'ultimo blocco elaborato (None = solo in memoria).
+    """
+
+    def __init__(
+        self,
+        rpc_url: str,
+        owner: Optional[str] = None,
+        ctf_address: str = CTF_ADDRESS,
+        checkpoint_path: Optional[str] = None,
+        confirmations: int = 3,
+        max_block_range: int = 2000,
+        client=None,
+    ):
+        self.rpc_url = rpc_url
+        self.owner = owner
+        self.ctf_address = ctf_address
+        self.checkpoint_path = checkpoint_path
+        self.confirmations = max(0, confirmations)
+        self.max_block_range = max(1, max_block_range)
+        self._client = client
+        self._rpc_id = 0
+        self.cursor: Optional[int] = self._load()
+
+    def _http(self):
+        if self._client is None:
+            from http_clients import registry
+            self._client = registry.get_async("rpc")
+        return self._client
+
+    async def _rpc(self, method: str, params: list):
+        self._rpc_id += 1
+        r = await self._http().post(
+            self.rpc_url, json={"jsonrpc": "2.0", "id": self._rpc_id, "method": method, "params": params}
+        )
+        r.raise_for_status()
+        reply = r.json()
+        if reply.get("error"):
+            err = reply["error"]
+            raise RpcError(f"{method}: {err.get('message') if isinstance(err, dict) else err}")
+        return reply.get("result")
+
+    async def head(self) -> int:
+        """Ultimo blocco con le conferme richieste."""
+        return max(0, int(await self._rpc("eth_blockNumber", []), 16) - self.confirmations)
+
+    async def _get_logs(self, topics: list, from_block: int, to_block: int) -> List[Dict]:
+        """eth_getLogs su [from_block, to_block]; se il nodo rifiuta l'intervallo lo si divide a metà."""
+        try:
+            return await self._rpc("eth_getLogs", [{
+                "address": self.ctf_address,
+                "fromBlock": hex(from_block),
+                "toBlock": hex(to_block),
+                "topics": topics,
+            }]) or []
+        except RpcError:
+            if from_block >= to_block:
+                raise
+            mid = (from_block + to_block) // 2
+            return await self._get_logs(topics, from_block, mid) + await self._get_logs(topics, mid + 1, to_block)
+
+    async def poll(self) -> LogBatch:
+        """
+        Eventi dei blocchi nuovi (dall'ultimo cursore alla testa confermata), poi avanza e salva il cursore.
+        Al primo avvio senza checkpoint si parte dalla testa corrente (lo storico lo copre la Data API).
+        """
+        head = await self.head()
+        if self.cursor is None:
+            self.cursor = head
+            self._save()
+            return LogBatch(from_block=head, to_block=head)
+        batch = LogBatch(from_block=self.cursor, to_block=self.cursor)
+        start = self.cursor + 1
+        while start <= head:
+            end = min(head, start + self.max_block_range - 1)
+            for log in await self._get_logs([CONDITION_RESOLUTION_TOPIC], start, end):
+                batch.resolutions.append(parse_resolution(log))
+            if self.owner:
+                for log in await self._get_logs([PAYOUT_REDEMPTION_TOPIC, _topic_address(self.owner)], start, end):
+                    batch.redemptions.append(parse_redemption(log))
+            batch.to_block = end
+            start = end + 1
+        # Il cursore avanza solo a poll completato: dopo un errore le finestre si rileggono
+        # (eventi duplicati innocui: il ledger scarta i claim già inviati)
+        self.cursor = batch.to_block
+        self._save()
+        return batch
+
+    # --- checkpoint ---
+
+    def _load(self) -> Optional[int]:
+        if not self.checkpoint_path or not os.path.isfile(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("ctf", "").lower() != self.ctf_address.lower():
+                return None
+            return int(state["block"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"  ⚠️  Checkpoint eventi non leggibile ({self.checkpoint_path}): {e}")
+            return None
+
+    def _save(self) -> None:
+        if not self.checkpoint_path or self.cursor is None:
+            return
+        tmp = self.checkpoint_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"ctf": self.ctf_address, "block": self.cursor}, f)
+            os.replace(tmp, self.checkpoint_path)
+        except OSError as e:
+            print(f"  ⚠️  Checkpoint eventi non salvato ({self.checkpoint_path}): {e}")
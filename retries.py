@@ -0,0 +1,414 @@
+"""
+Motore di retry condiviso (ordini CLOB, letture di mercato, Data API), sincrono e asyncio.
+
+Prima: un ciclo a mano con time.sleep(backoff[i]) in place_limit_order, tenacity sulle letture
+e una classificazione degli errori per stringhe (str(e) + catena delle cause) a ogni eccezione.
+Qui:
+- classify(): classe d'errore da dati strutturati (status HTTP, tipo di eccezione httpx),
+  calcolata una volta e memorizzata sull'eccezione;
+- RetryPolicy: tentativi, backoff esponenziale con jitter pieno, classi da ritentare;
+- per destinazione ("clob", "data-api", ...):
+  - RetryBudget: i retry sono al massimo una frazione delle richieste recenti (+ un minimo),
+    così un guasto non moltiplica il traffico;
+  - CircuitBreaker: dopo N errori da guasto (5xx, 429, timeout) consecutivi la destinazione
+    è "aperta" per cooldown secondi e le chiamate falliscono subito (CircuitOpenError);
+    poi una sola richiesta di prova decide se richiudere;
+- RetryEngine.call() / acall(): stessa logica, attesa con time.sleep o asyncio.sleep; l'attesa
+  rispetta una deadline opzionale e non avviene mai con lock presi.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, FrozenSet, Optional
+
+import httpx
+
+# Classi d'errore
+CONNECT = "connect"            # connessione mai stabilita (rifiutata, timeout di connessione): richiesta non inviata
+NETWORK = "network"            # connessione interrotta: la richiesta può essere già arrivata
+TIMEOUT = "timeout"
+PROXY = "proxy"                # il proxy rifiuta la connessione (es. SOCKS 0x02 ruleset, 407): richiesta non inviata
+RATE_LIMITED = "rate_limited"  # 429 / 425
+SERVER = "server"              # 5xx
+REGIONAL = "regional"          # 403 per restrizione geografica
+FORBIDDEN = "forbidden"        # altri 403
+AUTH = "auth"                  # 401
+CLIENT = "client"              # altri 4xx (ordine non valido, saldo, ...)
+OTHER = "other"
+
+RETRYABLE: FrozenSet[str] = frozenset({CONNECT, NETWORK, TIMEOUT, RATE_LIMITED, SERVER})
+# Errori prima dell'invio: la destinazione non ha ricevuto nulla, si può ripetere anche un POST
+NOT_SENT: FrozenSet[str] = frozenset({CONNECT, PROXY})
+# Per il circuit breaker: guasto della destinazione, oppure errore che non la riguarda (rete/proxy
+# del nostro lato). Le altre risposte d'errore (4xx) dimostrano che la destinazione risponde.
+OUTAGE: FrozenSet[str] = frozenset({TIMEOUT, RATE_LIMITED, SERVER})
+NEUTRAL: FrozenSet[str] = frozenset({CONNECT, NETWORK, PROXY, OTHER})
+
+_STATUS_CLASS: Dict[int, str] = {401: AUTH, 403: FORBIDDEN, 407: PROXY, 408: TIMEOUT, 425: RATE_LIMITED, 429: RATE_LIMITED}
+_STATUS_CLASS.update({code: SERVER for code in range(500, 600)})
+
+
+def _status_class(status: int, detail: Any = None) -> str:
+    cls = _STATUS_CLASS.get(status)
+    if cls is None:
+        return CLIENT if 400 <= status < 500 else OTHER
+    if cls == FORBIDDEN:
+        if isinstance(detail, dict):
+            detail = detail.get("error", "")
+        # "Trading restricted in your region, please refer to available regions"
+        if "region" in str(detail or "").lower():
+            return REGIONAL
+    return cls
+
+
+def _transport_class(e: BaseException) -> Optional[str]:
+    if isinstance(e, httpx.ProxyError):
+        return PROXY
+    if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, ConnectionRefusedError)):
+        return CONNECT
+    if isinstance(e, httpx.TimeoutException):
+        return TIMEOUT
+    if isinstance(e, (httpx.TransportError, ConnectionError)):
+        return NETWORK
+    if isinstance(e, TimeoutError):
+        return TIMEOUT
+    return None
+
+
+def classify(e: BaseException) -> str:
+    """Classe d'errore (costanti del modulo). Il risultato resta memorizzato sull'eccezione."""
+    cached = getattr(e, "_error_class", None)
+    if cached is not None:
+        return cached
+    cls = _transport_class(e)
+    if cls is None:
+        if isinstance(e, httpx.HTTPStatusError):
+            cls = _status_class(e.response.status_code, e.response.text)
+        elif hasattr(e, "status_code") and hasattr(e, "error_msg"):
+            # PolyApiException: status_code None = errore di trasporto (httpx.RequestError nel __context__)
+            if e.status_code is None:
+                inner = e.__cause__ or e.__context__
+                cls = (_transport_class(inner) if inner is not None else None) or NETWORK
+            else:
+                cls = _status_class(int(e.status_code), e.error_msg)
+        else:
+            cls = OTHER
+    try:
+        e._error_class = cls
+    except AttributeError:
+        pass
+    return cls
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 10.0
+    retry_on: FrozenSet[str] = RETRYABLE
+
+    def delay(self, retry_index: int, rng: random.Random) -> float:
+        """Jitter pieno: uniforme in [0, min(max_delay, base_delay * 2^i)]."""
+        return rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry_index)))
+
+
+class CircuitOpenError(Exception):
+    """Destinazione con circuit breaker aperto: la chiamata non è stata fatta."""
+
+    def __init__(self, destination: str, retry_in: float):
+        super().__init__(f"{destination}: circuito aperto (guasto rilevato), riprova tra {retry_in:.0f}s")
+        self.destination = destination
+        self.retry_in = retry_in
+        self._error_class = OTHER
+
+
+class CircuitBreaker:
+    """closed → open (dopo failure_threshold guasti consecutivi) → half-open (una prova) → closed/open."""
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self._clock() - self.opened_at >= self.cooldown else "open"
+
+    def retry_in(self) -> float:
+        return 0.0 if self.opened_at is None else max(0.0, self.cooldown - (self._clock() - self.opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def on_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def on_failure(self) -> None:
+        """Errore da guasto della destinazione (5xx, 429, timeout)."""
+        if self._probing:
+            self._probing = False
+            self.opened_at = self._clock()
+            self.opens += 1
+            return
+        self.failures += 1
+        if self.opened_at is None and self.failures >= self.failure_threshold:
+            self.opened_at = self._clock()
+            self.opens += 1
+
+    def on_neutral(self) -> None:
+        """Errore che non dice nulla sulla destinazione (rete/proxy): libera solo la prova in corso."""
+        self._probing = False
+
+
+class RetryBudget:
+    """Retry consentiti nella finestra: min_retries + ratio × richieste nella finestra."""
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 3, window: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._clock = clock
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+
+    def _trim(self, now: float) -> None:
+        for q in (self._requests, self._retries):
+            while q and now - q[0] > self.window:
+                q.popleft()
+
+    def on_request(self) -> None:
+        now = self._clock()
+        self._trim(now)
+        self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        now = self._clock()
+        self._trim(now)
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+            return False
+        self._retries.append(now)
+        return True
+
+
+class _Destination:
+    def __init__(self, name: str, breaker: CircuitBreaker, budget: RetryBudget):
+        self.name = name
+        self.breaker = breaker
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.budget_exhausted = 0
+        self.short_circuited = 0
+        self.errors: Dict[str, int] = {}
+
+
+class RetryEngine:
+    """Retry con budget e circuit breaker per destinazione. Thread-safe; acall per asyncio."""
+
+    def __init__(
+        self,
+        policy: RetryPolicy = RetryPolicy(),
+        failure_threshold: int = 5,
+        cooldown: float = 30.0,
+        budget_ratio: float = 0.2,
+        budget_min: int = 3,
+        budget_window: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ):
+        self.policy = policy
+        self._breaker_args = (failure_threshold, cooldown)
+        self._budget_args = (budget_ratio, budget_min, budget_window)
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._destinations: Dict[str, _Destination] = {}
+
+    def destination(self, name: str) -> _Destination:
+        with self._lock:
+            d = self._destinations.get(name)
+            if d is None:
+                d = self._destinations[name] = _Destination(
+                    name,
+                    CircuitBreaker(*self._breaker_args, clock=self._clock),
+                    RetryBudget(*self._budget_args, clock=self._clock),
+                )
+            return d
+
+    def _before_attempt(self, d: _Destination) -> None:
+        with d.lock:
+            if not d.breaker.allow():
+                d.short_circuited += 1
+                raise CircuitOpenError(d.name, d.breaker.retry_in())
+            d.calls += 1
+            d.budget.on_request()
+
+    def _on_abort(self, d: _Destination) -> None:
+        """Tentativo interrotto senza esito (cancel, KeyboardInterrupt): libera la prova half-open."""
+        with d.lock:
+            d.breaker.on_neutral()
+
+    def _on_success(self, d: _Destination) -> None:
+        with d.lock:
+            d.breaker.on_success()
+
+    def _on_error(self, d: _Destination, policy: RetryPolicy, e: BaseException, attempt: int,
+                  deadline: Optional[float]) -> Optional[float]:
+        """Registra l'errore; ritorna i secondi da attendere prima del prossimo tentativo, o None (rilanciare)."""
+        cls = classify(e)
+        with d.lock:
+            d.errors[cls] = d.errors.get(cls, 0) + 1
+            if cls in OUTAGE:
+                d.breaker.on_failure()
+            elif cls in NEUTRAL:
+                d.breaker.on_neutral()
+            else:
+                d.breaker.on_success()
+            if cls not in policy.retry_on or attempt + 1 >= policy.attempts:
+                return None
+            if d.breaker.state != "closed":
+                return None
+            wait = policy.delay(attempt, self._rng)
+            if deadline is not None and self._clock() + wait >= deadline:
+                return None
+            if not d.budget.try_spend():
+                d.budget_exhausted += 1
+                return None
+            d.retries += 1
+            return wait
+
+    def call(
+        self,
+        destination: str,
+        fn: Callable[..., Any],
+        *args,
+        policy: Optional[RetryPolicy] = None,
+        deadline: Optional[float] = None,
+        on_retry: Optional[Callable[[BaseException, int, float], None]] = None,
+        **kwargs,
+    ) -> Any:
+        """
+        fn(*args, **kwargs) con retry secondo policy. deadline: istante (clock del motore) oltre cui
+        non si attende un altro tentativo. on_retry(errore, tentativo, attesa) prima di ogni attesa.
+        Rilancia l'ultimo errore, o CircuitOpenError se la destinazione è in guasto.
+        """
+        policy = policy or self.policy
+        d = self.destination(destination)
+        attempt = 0
+        while True:
+            self._before_attempt(d)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                wait = self._on_error(d, policy, e, attempt, deadline)
+                if wait is None:
+                    raise
+                if on_retry is not None:
+                    on_retry(e, attempt + 1, wait)
+                time.sleep(wait)
+                attempt += 1
+                continue
+            except BaseException:
+                # KeyboardInterrupt, SystemExit
+                self._on_abort(d)
+                raise
+            self._on_success(d)
+            return result
+
+    async def acall(
+        self,
+        destination: str,
+        fn: Callable[..., Awaitable[Any]],
+        *args,
+        policy: Optional[RetryPolicy] = None,
+        deadline: Optional[float] = None,
+        on_retry: Optional[Callable[[BaseException, int, float], None]] = None,
+        **kwargs,
+    ) -> Any:
+        """Come call() per una coroutine function; l'attesa tra i tentativi non blocca la event loop."""
+        policy = policy or self.policy
+        d = self.destination(destination)
+        attempt = 0
+        while True:
+            self._before_attempt(d)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                wait = self._on_error(d, policy, e, attempt, deadline)
+                if wait is None:
+                    raise
+                if on_retry is not None:
+                    on_retry(e, attempt + 1, wait)
+                await asyncio.sleep(wait)
+                attempt += 1
+                continue
+            except BaseException:
+                # CancelledError (timeout di asyncio.wait_for), KeyboardInterrupt, SystemExit
+                self._on_abort(d)
+                raise
+            self._on_success(d)
+            return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            dests = list(self._destinations.values())
+        out = {}
+        for d in dests:
+            with d.lock:
+                out[d.name] = {
+                    "calls": d.calls, "retries": d.retries, "budget_exhausted": d.budget_exhausted,
+                    "short_circuited": d.short_circuited, "state": d.breaker.state, "opens": d.breaker.opens,
+                    "errors": dict(d.errors),
+                }
+        return out
+
+
+def format_stats(stats: Dict[str, Dict[str, Any]]) -> str:
+    """Riga compatta per i log (solo destinazioni con retry, blocchi o circuito non chiuso)."""
+    parts = []
+    for name, st in sorted(stats.items()):
+        if st["retries"] or st["budget_exhausted"] or st["short_circuited"] or st["state"] != "closed":
+            parts.append(
+                f"{name} {st['retries']} retry/{st['calls']} chiamate, budget esaurito {st['budget_exhausted']}, "
+                f"bloccate {st['short_circuited']}, circuito {st['state']}"
+            )
+    return ", ".join(parts)
+
+
+# Politiche per tipo di chiamata
+# Letture (book, midpoint, tick size, Data API): idempotenti, si ritenta su rete/timeout/429/5xx
+CLOB_READ_POLICY = RetryPolicy(attempts=3, base_delay=1.0, max_delay=10.0)
+DATA_API_POLICY = RetryPolicy(attempts=3, base_delay=0.5, max_delay=5.0)
+# Ordini: solo errori in cui il CLOB non ha ricevuto/elaborato l'ordine (connessione mai stabilita,
+# proxy che rifiuta, 429). Niente retry su timeout/5xx né su connessione interrotta (ReadError,
+# RemoteProtocolError...): l'ordine potrebbe essere già nel book e create_and_post_order lo rifirma
+# con un nuovo salt → doppio ordine.
+CLOB_ORDER_POLICY = RetryPolicy(attempts=5, base_delay=1.0, max_delay=16.0, retry_on=NOT_SENT | {RATE_LIMITED})
+
+# Motore di processo condiviso da executor e claims
+engine = RetryEngine(
+    failure_threshold=int(os.getenv("RETRY_BREAKER_THRESHOLD", "5")),
+    cooldown=float(os.getenv("RETRY_BREAKER_COOLDOWN", "30")),
+    budget_ratio=float(os.getenv("RETRY_BUDGET_RATIO", "0.2")),
+)
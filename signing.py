@@ -0,0 +1,165 @@
+"""
+Firma ordini CLOB (EIP-712) in parallelo su un pool di processi.
+
+La firma di un ordine è CPU-bound (keccak + secp256k1 in Python): con centinaia di ordini
+(es. vendita di tutte le posizioni) i thread non aiutano per via del GIL. Qui:
+- ogni processo del pool costruisce una sola volta Signer/OrderBuilder (initializer);
+- gli ordini viaggiano tra processi come tuple e tornano come dict (SignedOrder.dict()),
+  pronti per order_to_json / POST /orders;
+- sotto min_parallel ordini si firma nel processo corrente (avviare il pool costa di più);
+- submit()/collect(): firma non bloccante di un lotto (order_pipeline tiene più lotti in firma
+  mentre invia quelli già firmati).
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# (token_id, price, size, side, fee_rate_bps, nonce, expiration, tick_size, neg_risk)
+OrderSpec = Tuple[str, float, float, str, int, int, int, str, bool]
+
+_worker_builder = None
+
+
+class SignedOrderDict:
+    """SignedOrder già serializzato: espone .dict() come py_order_utils.SignedOrder (per order_to_json)."""
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Dict):
+        self._data = data
+
+    def dict(self) -> Dict:
+        return self._data
+
+
+def _make_builder(private_key: str, chain_id: int, sig_type: Optional[int], funder: Optional[str]):
+    from py_clob_client.order_builder.builder import OrderBuilder
+    from py_clob_client.signer import Signer
+    return OrderBuilder(Signer(private_key, chain_id), sig_type=sig_type, funder=funder)
+
+
+def _init_worker(private_key: str, chain_id: int, sig_type: Optional[int], funder: Optional[str]) -> None:
+    global _worker_builder
+    _worker_builder = _make_builder(private_key, chain_id, sig_type, funder)
+
+
+def _sign_one(builder, spec: OrderSpec) -> Dict:
+    from py_clob_client.clob_types import CreateOrderOptions, OrderArgs
+    token_id, price, size, side, fee_rate_bps, nonce, expiration, tick_size, neg_risk = spec
+    args = OrderArgs(
+        token_id=token_id, price=price, size=size, side=side,
+        fee_rate_bps=fee_rate_bps, nonce=nonce, expiration=expiration,
+    )
+    return builder.create_order(args, CreateOrderOptions(tick_size=tick_size, neg_risk=neg_risk)).dict()
+
+
+def _ping(_=None) -> int:
+    return os.getpid()
+
+
+def _sign_chunk(specs: Sequence[OrderSpec]) -> List[Tuple[bool, object]]:
+    out = []
+    for spec in specs:
+        try:
+            out.append((True, _sign_one(_worker_builder, spec)))
+        except Exception as e:
+            out.append((False, str(e)))
+    return out
+
+
+class OrderSigner:
+    """
+    Firma lotti di ordini per un wallet. Il pool di processi si crea alla prima firma parallela
+    e resta attivo (chiudere con close()).
+    """
+
+    def __init__(
+        self,
+        private_key: str,
+        chain_id: int = 137,
+        sig_type: Optional[int] = None,
+        funder: Optional[str] = None,
+        workers: Optional[int] = None,
+        min_parallel: int = 16,
+    ):
+        self._args = (private_key, chain_id, sig_type, funder)
+        self.workers = max(1, workers or (os.cpu_count() or 2))
+        self.min_parallel = min_parallel
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._local = None
+
+    def _pool_get(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # forkserver: l'executor gira anche in thread (asyncio.to_thread), fork diretto non è sicuro
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                    initializer=_init_worker,
+                    initargs=self._args,
+                )
+            return self._pool
+
+    def warm(self) -> None:
+        """Avvia i processi del pool (import py_clob_client + chiave) prima del primo lotto da firmare."""
+        if self.workers > 1:
+            list(self._pool_get().map(_ping, range(self.workers)))
+
+    def _sign_local(self, specs: Sequence[OrderSpec]) -> List[Tuple[bool, object]]:
+        if self._local is None:
+            self._local = _make_builder(*self._args)
+        results = []
+        for spec in specs:
+            try:
+                results.append((True, _sign_one(self._local, spec)))
+            except Exception as e:
+                results.append((False, str(e)))
+        return results
+
+    def sign(self, specs: Sequence[OrderSpec]) -> List[Tuple[bool, object]]:
+        """
+        Firma gli ordini e ritorna, nello stesso ordine, (True, SignedOrderDict) o (False, errore).
+        """
+        if len(specs) < self.min_parallel or self.workers == 1:
+            results = self._sign_local(specs)
+        else:
+            # Due chunk per processo: overhead IPC basso, carico comunque bilanciato
+            n = max(1, -(-len(specs) // (self.workers * 2)))
+            chunks = [specs[i:i + n] for i in range(0, len(specs), n)]
+            try:
+                results = [r for part in self._pool_get().map(_sign_chunk, chunks) for r in part]
+            except BrokenProcessPool as e:
+                print(f"⚠️  Pool di firma interrotto ({e}): firmo nel processo corrente", flush=True)
+                self.close()
+                results = self._sign_local(specs)
+        return [(ok, SignedOrderDict(v) if ok else v) for ok, v in results]
+
+    def submit(self, specs: Sequence[OrderSpec]) -> Future:
+        """
+        Firma non bloccante: il lotto va a un solo processo del pool, così più lotti firmano in
+        parallelo. Esito con collect(). Con un solo worker si firma subito nel thread chiamante.
+        """
+        if self.workers == 1:
+            future = Future()
+            future.set_result(self._sign_local(specs))
+            return future
+        return self._pool_get().submit(_sign_chunk, specs)
+
+    def collect(self, future: Future, specs: Sequence[OrderSpec]) -> List[Tuple[bool, object]]:
+        """Esito di submit() come sign(); se il pool si è rotto il lotto si firma nel processo corrente."""
+        try:
+            results = future.result()
+        except BrokenProcessPool as e:
+            print(f"⚠️  Pool di firma interrotto ({e}): firmo nel processo corrente", flush=True)
+            self.close()
+            results = self._sign_local(specs)
+        return [(ok, SignedOrderDict(v) if ok else v) for ok, v in results]
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None